@@ -0,0 +1,48 @@
+"""add media blob content hash
+
+Revision ID: 3b992e421663
+Revises: f8bdfb53f7d8
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "3b992e421663"
+down_revision = "f8bdfb53f7d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("media_blobs")}
+    indexes = {index["name"] for index in inspector.get_indexes("media_blobs")}
+
+    if "content_hash" not in columns:
+        op.add_column("media_blobs", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    if "size_bytes" not in columns:
+        op.add_column("media_blobs", sa.Column("size_bytes", sa.BigInteger(), nullable=True))
+    if "ix_media_blobs_content_hash" not in indexes:
+        op.create_index("ix_media_blobs_content_hash", "media_blobs", ["content_hash"])
+    op.alter_column("media_blobs", "data", existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("media_blobs")}
+    indexes = {index["name"] for index in inspector.get_indexes("media_blobs")}
+
+    # Fails while rows exist whose bytes live only in the blob store.
+    op.alter_column("media_blobs", "data", existing_type=sa.LargeBinary(), nullable=False)
+    if "ix_media_blobs_content_hash" in indexes:
+        op.drop_index("ix_media_blobs_content_hash", table_name="media_blobs")
+    if "size_bytes" in columns:
+        op.drop_column("media_blobs", "size_bytes")
+    if "content_hash" in columns:
+        op.drop_column("media_blobs", "content_hash")
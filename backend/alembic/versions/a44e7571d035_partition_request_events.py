@@ -0,0 +1,122 @@
+"""partition request_events by day
+
+Revision ID: a44e7571d035
+Revises: e5cbfdcdc7b6
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from datetime import datetime, time, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a44e7571d035"
+down_revision = "e5cbfdcdc7b6"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_request_events_created_at", "created_at"),
+    ("ix_request_events_client_ip_created_at", "client_ip, created_at"),
+    ("ix_request_events_path_created_at", "path, created_at"),
+    ("ix_request_events_status_code_created_at", "status_code, created_at"),
+    ("ix_request_events_user_id_created_at", "user_id, created_at"),
+    ("ix_request_events_request_id", "request_id"),
+)
+# The maintenance task keeps partitions ahead from here on; this only covers the first week.
+PREMAKE_DAYS = 7
+
+
+def _is_partitioned(bind) -> bool:
+    return (
+        bind.execute(
+            sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('request_events')")
+        ).first()
+        is not None
+    )
+
+
+def _day_start(day) -> str:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc).isoformat()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Partitioning is Postgres-only; SQLite keeps the plain table and row-by-row retention.
+    if bind.dialect.name != "postgresql" or _is_partitioned(bind):
+        return
+    inspector = sa.inspect(bind)
+    has_existing = inspector.has_table("request_events")
+
+    if has_existing:
+        op.execute("ALTER TABLE request_events RENAME TO request_events_legacy")
+        op.execute("ALTER INDEX IF EXISTS request_events_pkey RENAME TO request_events_legacy_pkey")
+        for name, _ in INDEXES:
+            op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy")
+    else:
+        op.execute("CREATE SEQUENCE IF NOT EXISTS request_events_id_seq")
+
+    # The partition key has to be part of the primary key.
+    op.execute(
+        """
+        CREATE TABLE request_events (
+            id INTEGER NOT NULL DEFAULT nextval('request_events_id_seq'),
+            request_id VARCHAR(128),
+            method VARCHAR(16) NOT NULL,
+            path VARCHAR(512) NOT NULL,
+            route VARCHAR(512),
+            status_code INTEGER NOT NULL,
+            duration_ms INTEGER NOT NULL,
+            client_ip VARCHAR(64),
+            user_id INTEGER REFERENCES users (id),
+            user_agent VARCHAR(512),
+            referer VARCHAR(512),
+            query_string VARCHAR(1024),
+            is_error BOOLEAN NOT NULL DEFAULT false,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE request_events_id_seq OWNED BY request_events.id")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON request_events ({columns})")
+
+    today = datetime.now(timezone.utc).date()
+    first_day = today
+    if has_existing:
+        # Existing rows stay where they are: the old table becomes one partition
+        # covering everything up to tomorrow and is dropped whole once it ages out.
+        first_day = today + timedelta(days=1)
+        op.execute(
+            "ALTER TABLE request_events ATTACH PARTITION request_events_legacy "
+            f"FOR VALUES FROM (MINVALUE) TO ('{_day_start(first_day)}')"
+        )
+    for offset in range(PREMAKE_DAYS):
+        day = first_day + timedelta(days=offset)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS request_events_p{day:%Y%m%d} PARTITION OF request_events "
+            f"FOR VALUES FROM ('{_day_start(day)}') TO ('{_day_start(day + timedelta(days=1))}')"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not _is_partitioned(bind):
+        return
+
+    op.execute("ALTER TABLE request_events RENAME TO request_events_partitioned")
+    op.execute("ALTER INDEX IF EXISTS request_events_pkey RENAME TO request_events_partitioned_pkey")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned")
+
+    op.execute("CREATE TABLE request_events (LIKE request_events_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO request_events SELECT * FROM request_events_partitioned")
+    op.execute("ALTER TABLE request_events ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE request_events ADD FOREIGN KEY (user_id) REFERENCES users (id)")
+    op.execute("ALTER SEQUENCE request_events_id_seq OWNED BY request_events.id")
+    op.execute("DROP TABLE request_events_partitioned")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON request_events ({columns})")
@@ -0,0 +1,29 @@
+"""add group messages keyset index
+
+Revision ID: a9b0c1d2e3f4
+Revises: f8b9c0d1e2f3
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a9b0c1d2e3f4"
+down_revision = "f8b9c0d1e2f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_group_messages_group_created_id "
+            "ON group_messages (group_id, created_at, id)"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_group_messages_group_created_id")
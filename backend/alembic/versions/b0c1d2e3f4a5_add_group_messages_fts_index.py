@@ -0,0 +1,37 @@
+"""add group messages full-text search index
+
+Revision ID: b0c1d2e3f4a5
+Revises: a9b0c1d2e3f4
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b0c1d2e3f4a5"
+down_revision = "a9b0c1d2e3f4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    # app.core.search renders exactly this expression (config 'simple'); a
+    # different config there needs a new migration rebuilding this index.
+    op.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_group_messages_content_fts "
+            "ON group_messages USING GIN (to_tsvector('simple', coalesce(content, '')))"
+        )
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_group_messages_content_fts")
@@ -0,0 +1,85 @@
+"""add request analytics rollups
+
+Revision ID: e5cbfdcdc7b6
+Revises: f181beeb6c39
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e5cbfdcdc7b6"
+down_revision = "f181beeb6c39"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("request_route_rollups"):
+        op.create_table(
+            "request_route_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("granularity", sa.String(length=8), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("method", sa.String(length=16), nullable=False),
+            sa.Column("route", sa.String(length=512), nullable=False),
+            sa.Column("requests", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("errors_4xx", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("errors_5xx", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("duration_ms_sum", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.UniqueConstraint(
+                "granularity", "bucket_start", "method", "route", name="uq_request_route_rollups_bucket"
+            ),
+        )
+
+    if not inspector.has_table("request_latency_rollups"):
+        op.create_table(
+            "request_latency_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("granularity", sa.String(length=8), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("route", sa.String(length=512), nullable=False),
+            sa.Column("bin", sa.Integer(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+            sa.UniqueConstraint(
+                "granularity", "bucket_start", "route", "bin", name="uq_request_latency_rollups_bucket"
+            ),
+        )
+
+    if not inspector.has_table("request_ip_rollups"):
+        op.create_table(
+            "request_ip_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("client_ip", sa.String(length=64), nullable=False),
+            sa.Column("requests", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("errors_4xx", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("errors_5xx", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("duration_ms_sum", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=False),
+            sa.UniqueConstraint("bucket_start", "client_ip", name="uq_request_ip_rollups_bucket"),
+        )
+
+    if not inspector.has_table("request_ip_user_rollups"):
+        op.create_table(
+            "request_ip_user_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("client_ip", sa.String(length=64), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.UniqueConstraint(
+                "bucket_start", "client_ip", "user_id", name="uq_request_ip_user_rollups_bucket"
+            ),
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS request_ip_user_rollups")
+    op.execute("DROP TABLE IF EXISTS request_ip_rollups")
+    op.execute("DROP TABLE IF EXISTS request_latency_rollups")
+    op.execute("DROP TABLE IF EXISTS request_route_rollups")
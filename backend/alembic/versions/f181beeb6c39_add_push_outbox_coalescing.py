@@ -0,0 +1,57 @@
+"""add push outbox coalescing
+
+Revision ID: f181beeb6c39
+Revises: ff374619308c
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f181beeb6c39"
+down_revision = "ff374619308c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("push_outbox")}
+
+    if "collapse_key" not in columns:
+        op.add_column("push_outbox", sa.Column("collapse_key", sa.String(length=128), nullable=True))
+    if "coalesced_count" not in columns:
+        op.add_column(
+            "push_outbox",
+            sa.Column("coalesced_count", sa.Integer(), nullable=False, server_default="1"),
+        )
+
+    op.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_push_outbox_collapse_key_created_at "
+            "ON push_outbox (collapse_key, created_at)"
+        )
+    )
+    op.execute(
+        sa.text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_push_outbox_pending_collapse "
+            "ON push_outbox (collapse_key, token) "
+            "WHERE status = 'pending' AND collapse_key IS NOT NULL"
+        )
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("push_outbox")}
+
+    op.execute("DROP INDEX IF EXISTS uq_push_outbox_pending_collapse")
+    op.execute("DROP INDEX IF EXISTS ix_push_outbox_collapse_key_created_at")
+    if "coalesced_count" in columns:
+        op.drop_column("push_outbox", "coalesced_count")
+    if "collapse_key" in columns:
+        op.drop_column("push_outbox", "collapse_key")
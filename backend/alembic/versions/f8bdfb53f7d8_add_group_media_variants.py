@@ -0,0 +1,35 @@
+"""add group media variants
+
+Revision ID: f8bdfb53f7d8
+Revises: b0c1d2e3f4a5
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "f8bdfb53f7d8"
+down_revision = "b0c1d2e3f4a5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("group_media")}
+
+    if "variants" not in columns:
+        op.add_column("group_media", sa.Column("variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("group_media")}
+
+    if "variants" in columns:
+        op.drop_column("group_media", "variants")
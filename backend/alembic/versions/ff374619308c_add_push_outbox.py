@@ -0,0 +1,57 @@
+"""add push outbox
+
+Revision ID: ff374619308c
+Revises: 3b992e421663
+Create Date: 2026-10-19 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "ff374619308c"
+down_revision = "3b992e421663"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("push_outbox"):
+        op.create_table(
+            "push_outbox",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("token", sa.String(length=255), nullable=False),
+            sa.Column("title", sa.String(length=255), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("data", sa.JSON(), nullable=True),
+            sa.Column("status", sa.String(length=16), nullable=False, server_default="pending"),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column("ticket_id", sa.String(length=64), nullable=True),
+            sa.Column("error", sa.String(length=255), nullable=True),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        )
+
+    op.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_push_outbox_status_next_attempt_at "
+            "ON push_outbox (status, next_attempt_at)"
+        )
+    )
+    op.execute(
+        sa.text(
+            "CREATE INDEX IF NOT EXISTS ix_push_outbox_status_sent_at ON push_outbox (status, sent_at)"
+        )
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_push_outbox_status_sent_at")
+    op.execute("DROP INDEX IF EXISTS ix_push_outbox_status_next_attempt_at")
+    op.execute("DROP TABLE IF EXISTS push_outbox")
@@ -1,11 +1,26 @@
+import asyncio
+import os
+from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import case, func
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core import security
+from app.core.analytics import bucket_start, latency_percentiles
+from app.core.config import settings
+from app.core.profiler import (
+    PROFILE_TOKEN_HEADER,
+    ProfileResult,
+    SamplingProfiler,
+    profile_lock,
+    profile_store,
+)
+from app.models.request_rollup import ROLLUP_HOUR, ROLLUP_MINUTE
 from app.models.user import UserRole, VerificationStatus
 
 router = APIRouter()
@@ -156,6 +171,71 @@ def update_user_role(
     return user
 
 
+def _latency_bins(
+    db: Session,
+    *,
+    granularity: str,
+    since: datetime,
+    group_by=None,
+    routes: list[str] | None = None,
+) -> dict[Any, dict[int, int]]:
+    """Merged latency sketches from the rollups, keyed by ``group_by`` (or ``None``)."""
+    Latency = models.RequestLatencyRollup
+    keys = [group_by] if group_by is not None else []
+    query = db.query(*keys, Latency.bin, func.sum(Latency.count)).filter(
+        Latency.granularity == granularity,
+        Latency.bucket_start >= since,
+    )
+    if routes is not None:
+        query = query.filter(Latency.route.in_(routes))
+    bins: dict[Any, dict[int, int]] = defaultdict(dict)
+    for row in query.group_by(*keys, Latency.bin):
+        key = row[0] if group_by is not None else None
+        bins[key][int(row[-2])] = int(row[-1] or 0)
+    return bins
+
+
+def _ip_usage(db: Session, *, since: datetime, limit: int) -> list[schemas.AnalyticsIpUsage]:
+    Ip = models.RequestIpRollup
+    rows = (
+        db.query(
+            Ip.client_ip.label("ip_address"),
+            func.sum(Ip.requests).label("requests"),
+            func.sum(Ip.errors_4xx).label("errors_4xx"),
+            func.sum(Ip.errors_5xx).label("errors_5xx"),
+            func.sum(Ip.duration_ms_sum).label("duration_ms_sum"),
+            func.max(Ip.last_seen_at).label("last_seen_at"),
+        )
+        .filter(Ip.bucket_start >= since)
+        .group_by(Ip.client_ip)
+        .order_by(func.sum(Ip.requests).desc())
+        .limit(limit)
+        .all()
+    )
+    ip_addresses = [row.ip_address for row in rows]
+    unique_users: dict[str, int] = {}
+    if ip_addresses:
+        IpUser = models.RequestIpUserRollup
+        unique_users = dict(
+            db.query(IpUser.client_ip, func.count(func.distinct(IpUser.user_id)))
+            .filter(IpUser.bucket_start >= since, IpUser.client_ip.in_(ip_addresses))
+            .group_by(IpUser.client_ip)
+            .all()
+        )
+    return [
+        schemas.AnalyticsIpUsage(
+            ip_address=row.ip_address,
+            requests=int(row.requests or 0),
+            unique_users=int(unique_users.get(row.ip_address) or 0),
+            errors_4xx=int(row.errors_4xx or 0),
+            errors_5xx=int(row.errors_5xx or 0),
+            avg_latency_ms=float(row.duration_ms_sum) / row.requests if row.requests else None,
+            last_seen_at=row.last_seen_at,
+        )
+        for row in rows
+    ]
+
+
 @router.get("/analytics/overview", response_model=schemas.AnalyticsOverview)
 def analytics_overview(
     *,
@@ -164,57 +244,57 @@ def analytics_overview(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_admin_user),
 ) -> Any:
-    since = datetime.now(timezone.utc) - timedelta(days=days)
+    # Reads the hourly rollups, so the cost depends on routes x hours, not traffic.
+    since = bucket_start(datetime.now(timezone.utc) - timedelta(days=days), ROLLUP_HOUR)
+    Route = models.RequestRouteRollup
+    in_window = (Route.granularity == ROLLUP_HOUR, Route.bucket_start >= since)
 
-    total_requests, unique_ips, total_4xx, total_5xx, avg_latency_ms = (
+    total_requests, total_4xx, total_5xx, duration_ms_sum = (
         db.query(
-            func.count(models.RequestEvent.id),
-            func.count(func.distinct(models.RequestEvent.client_ip)),
-            func.sum(case((models.RequestEvent.status_code.between(400, 499), 1), else_=0)),
-            func.sum(case((models.RequestEvent.status_code >= 500, 1), else_=0)),
-            func.avg(models.RequestEvent.duration_ms),
+            func.sum(Route.requests),
+            func.sum(Route.errors_4xx),
+            func.sum(Route.errors_5xx),
+            func.sum(Route.duration_ms_sum),
         )
-        .filter(models.RequestEvent.created_at >= since)
+        .filter(*in_window)
         .one()
     )
+    unique_ips = (
+        db.query(func.count(func.distinct(models.RequestIpRollup.client_ip)))
+        .filter(models.RequestIpRollup.bucket_start >= since)
+        .scalar()
+    )
 
     total_requests = int(total_requests or 0)
     unique_ips = int(unique_ips or 0)
     total_4xx = int(total_4xx or 0)
     total_5xx = int(total_5xx or 0)
-    avg_latency = float(avg_latency_ms) if avg_latency_ms is not None else None
+    avg_latency = float(duration_ms_sum) / total_requests if total_requests else None
     error_rate = float((total_4xx + total_5xx) / total_requests) if total_requests else 0.0
+    p50, p95, p99 = latency_percentiles(
+        _latency_bins(db, granularity=ROLLUP_HOUR, since=since).get(None, {})
+    )
 
     top_paths = (
         db.query(
-            models.RequestEvent.path.label("path"),
-            func.count(models.RequestEvent.id).label("requests"),
-            func.sum(case((models.RequestEvent.status_code.between(400, 499), 1), else_=0)).label("errors_4xx"),
-            func.sum(case((models.RequestEvent.status_code >= 500, 1), else_=0)).label("errors_5xx"),
-            func.avg(models.RequestEvent.duration_ms).label("avg_latency_ms"),
+            Route.route.label("path"),
+            func.sum(Route.requests).label("requests"),
+            func.sum(Route.errors_4xx).label("errors_4xx"),
+            func.sum(Route.errors_5xx).label("errors_5xx"),
+            func.sum(Route.duration_ms_sum).label("duration_ms_sum"),
         )
-        .filter(models.RequestEvent.created_at >= since)
-        .group_by(models.RequestEvent.path)
-        .order_by(func.count(models.RequestEvent.id).desc())
+        .filter(*in_window)
+        .group_by(Route.route)
+        .order_by(func.sum(Route.requests).desc())
         .limit(limit)
         .all()
     )
-
-    top_ips = (
-        db.query(
-            models.RequestEvent.client_ip.label("ip_address"),
-            func.count(models.RequestEvent.id).label("requests"),
-            func.count(func.distinct(models.RequestEvent.user_id)).label("unique_users"),
-            func.sum(case((models.RequestEvent.status_code.between(400, 499), 1), else_=0)).label("errors_4xx"),
-            func.sum(case((models.RequestEvent.status_code >= 500, 1), else_=0)).label("errors_5xx"),
-            func.avg(models.RequestEvent.duration_ms).label("avg_latency_ms"),
-            func.max(models.RequestEvent.created_at).label("last_seen_at"),
-        )
-        .filter(models.RequestEvent.created_at >= since, models.RequestEvent.client_ip.is_not(None))
-        .group_by(models.RequestEvent.client_ip)
-        .order_by(func.count(models.RequestEvent.id).desc())
-        .limit(limit)
-        .all()
+    path_bins = _latency_bins(
+        db,
+        granularity=ROLLUP_HOUR,
+        since=since,
+        group_by=models.RequestLatencyRollup.route,
+        routes=[row.path for row in top_paths],
     )
 
     active_refresh_sessions = (
@@ -226,6 +306,22 @@ def analytics_overview(
         .scalar()
     )
 
+    top_path_items = []
+    for row in top_paths:
+        path_p50, path_p95, path_p99 = latency_percentiles(path_bins.get(row.path, {}))
+        top_path_items.append(
+            schemas.AnalyticsTopPath(
+                path=row.path,
+                requests=int(row.requests or 0),
+                errors_4xx=int(row.errors_4xx or 0),
+                errors_5xx=int(row.errors_5xx or 0),
+                avg_latency_ms=float(row.duration_ms_sum) / row.requests if row.requests else None,
+                p50_latency_ms=path_p50,
+                p95_latency_ms=path_p95,
+                p99_latency_ms=path_p99,
+            )
+        )
+
     return schemas.AnalyticsOverview(
         window_days=days,
         total_requests=total_requests,
@@ -234,30 +330,12 @@ def analytics_overview(
         total_5xx=total_5xx,
         error_rate=error_rate,
         avg_latency_ms=avg_latency,
+        p50_latency_ms=p50,
+        p95_latency_ms=p95,
+        p99_latency_ms=p99,
         active_refresh_sessions=int(active_refresh_sessions or 0),
-        top_paths=[
-            schemas.AnalyticsTopPath(
-                path=row.path,
-                requests=int(row.requests or 0),
-                errors_4xx=int(row.errors_4xx or 0),
-                errors_5xx=int(row.errors_5xx or 0),
-                avg_latency_ms=float(row.avg_latency_ms) if row.avg_latency_ms is not None else None,
-            )
-            for row in top_paths
-        ],
-        top_ips=[
-            schemas.AnalyticsIpUsage(
-                ip_address=row.ip_address,
-                requests=int(row.requests or 0),
-                unique_users=int(row.unique_users or 0),
-                errors_4xx=int(row.errors_4xx or 0),
-                errors_5xx=int(row.errors_5xx or 0),
-                avg_latency_ms=float(row.avg_latency_ms) if row.avg_latency_ms is not None else None,
-                last_seen_at=row.last_seen_at,
-            )
-            for row in top_ips
-            if row.ip_address
-        ],
+        top_paths=top_path_items,
+        top_ips=_ip_usage(db, since=since, limit=limit),
     )
 
 
@@ -269,35 +347,141 @@ def analytics_ip_usage(
     db: Session = Depends(deps.get_db),
     current_user: models.User = Depends(deps.get_current_admin_user),
 ) -> Any:
-    since = datetime.now(timezone.utc) - timedelta(days=days)
+    since = bucket_start(datetime.now(timezone.utc) - timedelta(days=days), ROLLUP_HOUR)
+    return _ip_usage(db, since=since, limit=limit)
 
-    rows = (
-        db.query(
-            models.RequestEvent.client_ip.label("ip_address"),
-            func.count(models.RequestEvent.id).label("requests"),
-            func.count(func.distinct(models.RequestEvent.user_id)).label("unique_users"),
-            func.sum(case((models.RequestEvent.status_code.between(400, 499), 1), else_=0)).label("errors_4xx"),
-            func.sum(case((models.RequestEvent.status_code >= 500, 1), else_=0)).label("errors_5xx"),
-            func.avg(models.RequestEvent.duration_ms).label("avg_latency_ms"),
-            func.max(models.RequestEvent.created_at).label("last_seen_at"),
+
+@router.get("/analytics/timeseries", response_model=List[schemas.AnalyticsTimeseriesPoint])
+def analytics_timeseries(
+    *,
+    granularity: str = Query(default=ROLLUP_HOUR, pattern="^(minute|hour)$"),
+    hours: int = Query(default=24, ge=1, le=24 * 90),
+    route: str | None = Query(default=None, max_length=512),
+    db: Session = Depends(deps.get_db),
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    if granularity == ROLLUP_MINUTE and hours > settings.REQUEST_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "Minute rollups are kept for "
+                f"{settings.REQUEST_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS} hours."
+            ),
         )
-        .filter(models.RequestEvent.created_at >= since, models.RequestEvent.client_ip.is_not(None))
-        .group_by(models.RequestEvent.client_ip)
-        .order_by(func.count(models.RequestEvent.id).desc())
-        .limit(limit)
-        .all()
+    since = bucket_start(datetime.now(timezone.utc) - timedelta(hours=hours), granularity)
+    Route = models.RequestRouteRollup
+    query = db.query(
+        Route.bucket_start.label("bucket_start"),
+        func.sum(Route.requests).label("requests"),
+        func.sum(Route.errors_4xx).label("errors_4xx"),
+        func.sum(Route.errors_5xx).label("errors_5xx"),
+        func.sum(Route.duration_ms_sum).label("duration_ms_sum"),
+    ).filter(Route.granularity == granularity, Route.bucket_start >= since)
+    if route:
+        query = query.filter(Route.route == route)
+    rows = query.group_by(Route.bucket_start).order_by(Route.bucket_start).all()
+    bucket_bins = _latency_bins(
+        db,
+        granularity=granularity,
+        since=since,
+        group_by=models.RequestLatencyRollup.bucket_start,
+        routes=[route] if route else None,
     )
 
-    return [
-        schemas.AnalyticsIpUsage(
-            ip_address=row.ip_address,
-            requests=int(row.requests or 0),
-            unique_users=int(row.unique_users or 0),
-            errors_4xx=int(row.errors_4xx or 0),
-            errors_5xx=int(row.errors_5xx or 0),
-            avg_latency_ms=float(row.avg_latency_ms) if row.avg_latency_ms is not None else None,
-            last_seen_at=row.last_seen_at,
+    points = []
+    for row in rows:
+        p50, p95, p99 = latency_percentiles(bucket_bins.get(row.bucket_start, {}))
+        points.append(
+            schemas.AnalyticsTimeseriesPoint(
+                bucket_start=row.bucket_start,
+                requests=int(row.requests or 0),
+                errors_4xx=int(row.errors_4xx or 0),
+                errors_5xx=int(row.errors_5xx or 0),
+                avg_latency_ms=float(row.duration_ms_sum) / row.requests if row.requests else None,
+                p50_latency_ms=p50,
+                p95_latency_ms=p95,
+                p99_latency_ms=p99,
+            )
         )
-        for row in rows
-        if row.ip_address
-    ]
+    return points
+
+
+def _require_profiler() -> None:
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+
+
+def _profile_response(result: ProfileResult, *, output: str, name: str) -> Any:
+    headers = {
+        "X-Profile-Pid": str(os.getpid()),
+        "X-Profile-Samples": str(result.samples),
+        "Cache-Control": "no-store",
+    }
+    if output == "speedscope":
+        headers["Content-Disposition"] = f'attachment; filename="{name}.speedscope.json"'
+        return JSONResponse(result.speedscope(name=name), headers=headers)
+    return PlainTextResponse(result.collapsed(), headers=headers)
+
+
+@router.get("/profile")
+async def profile_worker(
+    *,
+    seconds: float = Query(default=10, gt=0),
+    interval_ms: float | None = Query(default=None, ge=1, le=1000),
+    output: str = Query(default="collapsed", alias="format", pattern="^(collapsed|speedscope)$"),
+    include_idle: bool = False,
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    """Sample every thread of the worker serving this request for ``seconds``."""
+    _require_profiler()
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}",
+        )
+    if not profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    try:
+        profiler = SamplingProfiler(
+            interval_ms=interval_ms or settings.PROFILER_INTERVAL_MS,
+            include_idle=include_idle,
+        )
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            result = await asyncio.to_thread(profiler.stop)
+    finally:
+        profile_lock.release()
+    name = f"worker-{os.getpid()}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+    return _profile_response(result, output=output, name=name)
+
+
+@router.post("/profile/token", response_model=schemas.ProfileToken)
+def create_profile_token(
+    *,
+    ttl_seconds: int = Query(default=600, ge=60, le=3600),
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    """Token for the X-Profile-Token header; requests sent with it are profiled."""
+    _require_profiler()
+    expires_delta = timedelta(seconds=ttl_seconds)
+    return schemas.ProfileToken(
+        header=PROFILE_TOKEN_HEADER,
+        token=security.create_profile_token(current_user.id, expires_delta=expires_delta),
+        expires_at=datetime.now(timezone.utc) + expires_delta,
+    )
+
+
+@router.get("/profile/requests/{profile_id}")
+def get_request_profile(
+    profile_id: str,
+    *,
+    output: str = Query(default="speedscope", alias="format", pattern="^(collapsed|speedscope)$"),
+    current_user: models.User = Depends(deps.get_current_admin_user),
+) -> Any:
+    _require_profiler()
+    result = profile_store.get(profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return _profile_response(result, output=output, name=f"request-{profile_id}")
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 from hashlib import sha256
 from secrets import randbelow
 from typing import Any
-from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from jose import JWTError
@@ -215,7 +215,6 @@ def login_access_token(
 @router.post("/forgot-password", dependencies=[Depends(deps.rate_limit)])
 def forgot_password(
     payload: schemas.PasswordResetRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """Generate a password reset token and send a reset email."""
@@ -234,9 +233,7 @@ def forgot_password(
         reset_link = (
             f"{settings.FRONTEND_BASE_URL.rstrip('/')}/auth/reset"
         )
-        background_tasks.add_task(
-            email_utils.send_password_reset_email, user.email, reset_link, reset_token
-        )
+        email_utils.send_password_reset_email(user.email, reset_link, reset_token)
 
     response: dict[str, Any] = {
         "detail": "If an account exists, a reset link has been sent."
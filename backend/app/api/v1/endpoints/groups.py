@@ -1,14 +1,13 @@
 ﻿# backend/app/api/v1/endpoints/groups.py
 from collections import OrderedDict
 from datetime import datetime, timezone
-import base64
 import json
 import math
 import os
 import time
 import uuid
 from typing import Any, Dict, List
-from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, Response, UploadFile, status
+from fastapi import APIRouter, Body, Depends, File, Form, HTTPException, Query, Response, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 from pydantic import ValidationError
 from sqlalchemy import func
@@ -16,14 +15,24 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
-from app.core.push import get_group_member_ids, get_push_tokens, send_expo_push
+from app.core import events
+from app.core.config import settings
+from app.core.pagination import decode_cursor as _decode_cursor, encode_cursor as _encode_cursor
+from app.core.push import enqueue_push, get_group_push_tokens, get_push_tokens, invalidate_group_fanout
+from app.core.images import (
+    ImageProcessingBusyError,
+    pick_image_url,
+    process_image_derivatives,
+    store_image_derivatives,
+)
 from app.core.storage import (
-    normalize_group_image_bytes,
+    UploadTooLargeError,
+    copy_file_limited,
+    read_file_limited,
     supabase_public_storage_enabled,
     supabase_storage_enabled,
-    upload_bytes_to_supabase,
-    upload_public_bytes_to_supabase,
-    upload_public_image_with_thumbnail,
+    upload_file_to_supabase,
+    upload_public_file_to_supabase,
 )
 from app.models.group import AppliesTo, Group, GroupCategory, GroupRequirement, GroupStatus, GroupVisibility
 from app.models.group_extras import (
@@ -108,40 +117,6 @@ def _coerce_aware(value: datetime | None) -> datetime | None:
     return value
 
 
-def _encode_cursor(group: Group) -> str:
-    created_at = _coerce_aware(group.created_at)
-    payload = {
-        "created_at": created_at.isoformat() if created_at else None,
-        "id": group.id,
-    }
-    raw = json.dumps(payload).encode("utf-8")
-    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
-
-
-def _decode_cursor(value: str | None) -> tuple[datetime, int] | None:
-    if not value:
-        return None
-    try:
-        padded = value + "=" * (-len(value) % 4)
-        payload = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
-        created_at = payload.get("created_at")
-        cursor_id = payload.get("id")
-        if not created_at or cursor_id is None:
-            return None
-        if isinstance(created_at, str):
-            created_at = created_at.replace("Z", "+00:00")
-            created_at = datetime.fromisoformat(created_at)
-        if isinstance(cursor_id, str):
-            cursor_id = int(cursor_id)
-        if not isinstance(created_at, datetime) or not isinstance(cursor_id, int):
-            return None
-        if created_at.tzinfo is None:
-            created_at = created_at.replace(tzinfo=timezone.utc)
-        return created_at, cursor_id
-    except Exception:
-        return None
-
-
 def _record_swipe(
     db: Session,
     *,
@@ -229,6 +204,7 @@ def _attach_group_stats(
     lat: float | None = None,
     lng: float | None = None,
     include_labels: bool = False,
+    image_size: str = "medium",
 ) -> None:
     if not groups:
         return
@@ -265,7 +241,11 @@ def _attach_group_stats(
         _apply_group_lifecycle(group, approved_count)
         group.approved_members = approved_count
         cover = cover_map.get(group.id)
-        group.cover_image_url = (cover.thumb_url or cover.url) if cover else None
+        group.cover_image_url = (
+            pick_image_url(cover.variants, image_size, fallback=cover.thumb_url or cover.url)
+            if cover
+            else None
+        )
         if include_labels and current_user:
             group_tags = set(group.tags or [])
             group.shared_tags = list(user_interests.intersection(group_tags))
@@ -450,11 +430,18 @@ def create_group(
         if not content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="Cover photo must be an image.")
 
-        cover_bytes = cover.file.read()
         try:
-            cover_bytes, content_type = normalize_group_image_bytes(cover_bytes, target_size=1024)
+            cover_bytes = read_file_limited(cover.file, max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail="Cover photo is too large.") from exc
+        try:
+            cover_derivatives = process_image_derivatives(cover_bytes, square=True, full_size=1024)
         except ValueError as exc:
             raise HTTPException(status_code=400, detail="Invalid cover image file.") from exc
+        except ImageProcessingBusyError as exc:
+            raise HTTPException(
+                status_code=503, detail="Image processing is busy, try again shortly.", headers={"Retry-After": "5"}
+            ) from exc
 
         group = Group(
             title=group_in.title,
@@ -504,33 +491,15 @@ def create_group(
         )
 
         stem = os.path.splitext(cover.filename or "group-cover")[0] or "group-cover"
-        upload_filename = f"{stem}.jpg"
-        thumb_url = None
-        if supabase_public_storage_enabled():
-            url, thumb_url = upload_public_image_with_thumbnail(
-                prefix=f"groups/{group.id}",
-                filename=upload_filename,
-                content_type=content_type,
-                data=cover_bytes,
-            )
-        elif supabase_storage_enabled():
-            url = upload_bytes_to_supabase(
-                prefix=f"groups/{group.id}",
-                filename=upload_filename,
-                content_type=content_type,
-                data=cover_bytes,
-                public=False,
-            )
-        else:
-            blob = MediaBlob(
-                content_type=content_type or "image/jpeg",
-                filename=upload_filename,
-                data=cover_bytes,
-                created_by=current_user.id,
-            )
-            db.add(blob)
-            db.flush()
-            url = f"/api/v1/media/{blob.id}"
+        variants = store_image_derivatives(
+            db,
+            prefix=f"groups/{group.id}",
+            stem=stem,
+            derivatives=cover_derivatives,
+            created_by=current_user.id,
+        )
+        url = pick_image_url(variants, "full")
+        thumb_url = pick_image_url(variants, "medium")
 
         db.add(
             GroupMedia(
@@ -538,6 +507,7 @@ def create_group(
                 uploader_id=current_user.id,
                 url=url,
                 thumb_url=thumb_url,
+                variants=variants,
                 media_type=GroupMediaType.IMAGE,
                 is_cover=True,
             )
@@ -545,6 +515,7 @@ def create_group(
 
         db.commit()
         db.refresh(group)
+        events.emit(events.GROUP_CREATED, group_id=group.id, creator_id=current_user.id)
         group.cover_image_url = thumb_url or url
         return group
     except HTTPException:
@@ -573,6 +544,7 @@ def discover_groups(
     cursor: str | None = None,
     skip: int = 0,
     limit: int = 50,
+    image_size: str = Query(default="medium", pattern="^(thumb|medium|full)$"),
 ) -> Any:
     discovery = current_user.discovery_settings or {}
     global_mode = bool(discovery.get("global_mode")) if isinstance(discovery, dict) else False
@@ -607,6 +579,7 @@ def discover_groups(
         "skip": skip if cursor_payload is None else 0,
         "global_mode": global_mode,
         "distance_pref_km": distance_pref_km,
+        "image_size": image_size,
     }
     cache_key = _cache_key("discover", current_user.id, cache_params)
     cached = _cache_get(cache_key)
@@ -668,6 +641,7 @@ def discover_groups(
         lat=effective_lat,
         lng=effective_lng,
         include_labels=True,
+        image_size=image_size,
     )
     if not global_mode and radius_km is None:
         user_city = (current_user.location_city or "").strip().lower()
@@ -948,17 +922,13 @@ async def request_to_join_group(
         action=SwipeAction.SUPERLIKE if request_tier == "superlike" else SwipeAction.LIKE,
     )
 
-    creator_tokens = get_push_tokens(db, [group.creator_id])
-    if creator_tokens:
-        preview = request_message if request_message else "Tap to review their request."
-        body = preview if len(preview) <= 120 else f"{preview[:117]}..."
-        send_expo_push(
-            creator_tokens,
-            title=f"New join request for {group.title}",
-            body=body,
-            data={"type": "join_request", "group_id": id, "user_id": current_user.id},
-        )
-    
+    events.emit(
+        events.JOIN_REQUESTED,
+        group_id=id,
+        user_id=current_user.id,
+        request_message=request_message or None,
+    )
+
     return {"msg": "Join request sent. Awaiting creator approval."}
 
 @router.post("/{id}/approve/{user_id}", dependencies=[Depends(deps.rate_limit)])
@@ -978,6 +948,7 @@ def approve_member(
     if not membership:
         raise HTTPException(status_code=404, detail="Membership request not found")
     crud.membership.update_status(db, membership, JoinStatus.APPROVED)
+    invalidate_group_fanout(id)
     approved_count = (
         db.query(models.Membership)
         .filter(
@@ -991,14 +962,7 @@ def approve_member(
         group.status = GroupStatus.FULL
         db.add(group)
         db.commit()
-    tokens = get_push_tokens(db, [user_id])
-    if tokens:
-        send_expo_push(
-            tokens,
-            title="It's a match!",
-            body=f"You've been accepted into {group.title}.",
-            data={"type": "join_approved", "group_id": id},
-        )
+    events.emit(events.MEMBER_APPROVED, group_id=id, user_id=user_id)
     return {"msg": "Member approved"}
 
 
@@ -1039,6 +1003,8 @@ def reject_member(
     if not membership:
         raise HTTPException(status_code=404, detail="Membership request not found")
     crud.membership.update_status(db, membership, JoinStatus.REJECTED)
+    invalidate_group_fanout(id)
+    events.emit(events.MEMBER_REJECTED, group_id=id, user_id=user_id)
     return {"msg": "Member rejected"}
 
 @router.get("/{id}/members", response_model=List[schemas.Membership])
@@ -1068,6 +1034,8 @@ def leave_group(
     membership.deleted_at = _utcnow()
     db.add(membership)
     db.commit()
+    invalidate_group_fanout(id)
+    events.emit(events.MEMBER_LEFT, group_id=id, user_id=current_user.id)
     return {"msg": "Left group"}
 
 @router.post("/{id}/remove/{user_id}", dependencies=[Depends(deps.rate_limit)])
@@ -1090,6 +1058,8 @@ def remove_member(
     membership.join_status = JoinStatus.REJECTED
     db.add(membership)
     db.commit()
+    invalidate_group_fanout(id)
+    events.emit(events.MEMBER_REMOVED, group_id=id, user_id=user_id)
     return {"msg": "Member removed"}
 
 
@@ -1124,16 +1094,21 @@ def upload_group_media(
     content_type = file.content_type or ""
     if not (content_type.startswith("image/") or content_type.startswith("video/")):
         raise HTTPException(status_code=400, detail="Only image or video uploads are allowed.")
-    file_bytes = file.file.read()
     media_type = GroupMediaType.VIDEO if content_type.startswith("video/") else GroupMediaType.IMAGE
-    upload_filename = file.filename
+    derivatives = None
     if media_type == GroupMediaType.IMAGE:
         try:
-            file_bytes, content_type = normalize_group_image_bytes(file_bytes, target_size=1024)
+            file_bytes = read_file_limited(file.file, max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES)
+        except UploadTooLargeError:
+            raise HTTPException(status_code=413, detail="Image is too large.")
+        try:
+            derivatives = process_image_derivatives(file_bytes, square=True, full_size=1024)
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid image file.")
-        stem = os.path.splitext(file.filename or "group-image")[0] or "group-image"
-        upload_filename = f"{stem}.jpg"
+        except ImageProcessingBusyError:
+            raise HTTPException(
+                status_code=503, detail="Image processing is busy, try again shortly.", headers={"Retry-After": "5"}
+            )
     if is_cover:
         db.query(GroupMedia).filter(
             GroupMedia.group_id == id,
@@ -1141,53 +1116,60 @@ def upload_group_media(
             GroupMedia.deleted_at.is_(None),
         ).update({GroupMedia.is_cover: False})
     thumb_url = None
-    if supabase_public_storage_enabled():
-        if media_type == GroupMediaType.IMAGE:
-            url, thumb_url = upload_public_image_with_thumbnail(
-                prefix=f"groups/{id}",
-                filename=upload_filename,
-                content_type=content_type,
-                data=file_bytes,
-            )
-        else:
-            url = upload_public_bytes_to_supabase(
-                prefix=f"groups/{id}",
-                filename=upload_filename,
-                content_type=content_type,
-                data=file_bytes,
-            )
-    elif supabase_storage_enabled():
-        url = upload_bytes_to_supabase(
+    variants = None
+    if derivatives is not None:
+        stem = os.path.splitext(file.filename or "group-image")[0] or "group-image"
+        variants = store_image_derivatives(
+            db,
             prefix=f"groups/{id}",
-            filename=upload_filename,
-            content_type=content_type,
-            data=file_bytes,
-            public=False,
-        )
-    elif media_type == GroupMediaType.IMAGE:
-        blob = MediaBlob(
-            content_type=content_type or "image/jpeg",
-            filename=upload_filename,
-            data=file_bytes,
+            stem=stem,
+            derivatives=derivatives,
             created_by=current_user.id,
         )
-        db.add(blob)
-        db.flush()
-        url = f"/api/v1/media/{blob.id}"
+        url = pick_image_url(variants, "full")
+        thumb_url = pick_image_url(variants, "medium")
     else:
-        uploads_dir = os.path.join(os.getcwd(), "uploads", "groups")
-        os.makedirs(uploads_dir, exist_ok=True)
-        ext = os.path.splitext(upload_filename or "")[1] or ".bin"
-        filename = f"{uuid.uuid4().hex}{ext}"
-        filepath = os.path.join(uploads_dir, filename)
-        with open(filepath, "wb") as buffer:
-            buffer.write(file_bytes)
-        url = f"/uploads/groups/{filename}"
+        # Videos are streamed from the spooled upload instead of being read into memory.
+        try:
+            if supabase_public_storage_enabled():
+                url = upload_public_file_to_supabase(
+                    prefix=f"groups/{id}",
+                    filename=file.filename,
+                    content_type=content_type,
+                    fileobj=file.file,
+                    max_bytes=settings.UPLOAD_MAX_FILE_BYTES,
+                )
+            elif supabase_storage_enabled():
+                url = upload_file_to_supabase(
+                    prefix=f"groups/{id}",
+                    filename=file.filename,
+                    content_type=content_type,
+                    fileobj=file.file,
+                    max_bytes=settings.UPLOAD_MAX_FILE_BYTES,
+                    public=False,
+                )
+            else:
+                uploads_dir = os.path.join(os.getcwd(), "uploads", "groups")
+                os.makedirs(uploads_dir, exist_ok=True)
+                ext = os.path.splitext(file.filename or "")[1] or ".bin"
+                filename = f"{uuid.uuid4().hex}{ext}"
+                filepath = os.path.join(uploads_dir, filename)
+                try:
+                    with open(filepath, "wb") as buffer:
+                        copy_file_limited(file.file, buffer, max_bytes=settings.UPLOAD_MAX_FILE_BYTES)
+                except UploadTooLargeError:
+                    os.unlink(filepath)
+                    raise
+                url = f"/uploads/groups/{filename}"
+        except UploadTooLargeError:
+            db.rollback()
+            raise HTTPException(status_code=413, detail="File is too large.")
     media = GroupMedia(
         group_id=id,
         uploader_id=current_user.id,
         url=url,
         thumb_url=thumb_url,
+        variants=variants,
         media_type=media_type,
         is_cover=is_cover,
     )
@@ -1221,9 +1203,15 @@ def delete_group_media(
     )
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
-    if media.url and media.url.startswith("/api/v1/media/"):
+    media_urls = {media.url}
+    for entry in (media.variants or {}).values():
+        if isinstance(entry, dict):
+            media_urls.update(value for value in entry.values() if isinstance(value, str))
+    for media_url in media_urls:
+        if not (media_url and media_url.startswith("/api/v1/media/")):
+            continue
         try:
-            blob_id = int(media.url.split("/api/v1/media/")[1])
+            blob_id = int(media_url.split("/api/v1/media/")[1])
             blob = db.query(MediaBlob).filter(MediaBlob.id == blob_id).first()
             if blob:
                 blob.deleted_at = _utcnow()
@@ -1327,13 +1315,10 @@ def create_group_plan(
     db.add(plan)
     db.commit()
     db.refresh(plan)
-    recipient_ids = [
-        user_id for user_id in get_group_member_ids(db, id) if user_id != current_user.id
-    ]
-    tokens = get_push_tokens(db, recipient_ids)
+    tokens = get_group_push_tokens(db, id, exclude_user_id=current_user.id)
     if tokens:
         group = crud.group.get(db, id=id)
-        send_expo_push(
+        enqueue_push(
             tokens,
             title=f"New plan in {group.title if group else 'your group'}",
             body=plan.title,
@@ -1390,12 +1375,9 @@ def remind_group_plan(
     ).first()
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
-    recipient_ids = [
-        user_id for user_id in get_group_member_ids(db, id) if user_id != current_user.id
-    ]
-    tokens = get_push_tokens(db, recipient_ids)
+    tokens = get_group_push_tokens(db, id, exclude_user_id=current_user.id)
     if tokens:
-        send_expo_push(
+        enqueue_push(
             tokens,
             title=f"Reminder: {plan.title}",
             body=f"{group.title} · {plan.scheduled_at.isoformat() if plan.scheduled_at else 'Time TBD'}",
@@ -1484,7 +1466,7 @@ def rsvp_group_plan(
     if group and group.creator_id != current_user.id:
         tokens = get_push_tokens(db, [group.creator_id])
         if tokens:
-            send_expo_push(
+            enqueue_push(
                 tokens,
                 title=f"RSVP update in {group.title}",
                 body=f"{current_user.full_name} marked {rsvp_in.status.value.replace('_', ' ')}",
@@ -1532,12 +1514,9 @@ def create_group_announcement(
     db.add(announcement)
     db.commit()
     db.refresh(announcement)
-    recipient_ids = [
-        user_id for user_id in get_group_member_ids(db, id) if user_id != current_user.id
-    ]
-    tokens = get_push_tokens(db, recipient_ids)
+    tokens = get_group_push_tokens(db, id, exclude_user_id=current_user.id)
     if tokens:
-        send_expo_push(
+        enqueue_push(
             tokens,
             title=f"Announcement in {group.title}",
             body=announcement.title,
@@ -1604,13 +1583,10 @@ def create_group_poll(
         db.add(GroupPollOption(poll_id=poll.id, label=option))
     db.commit()
     db.refresh(poll)
-    recipient_ids = [
-        user_id for user_id in get_group_member_ids(db, id) if user_id != current_user.id
-    ]
-    tokens = get_push_tokens(db, recipient_ids)
+    tokens = get_group_push_tokens(db, id, exclude_user_id=current_user.id)
     if tokens:
         group = crud.group.get(db, id=id)
-        send_expo_push(
+        enqueue_push(
             tokens,
             title=f"New poll in {group.title if group else 'your group'}",
             body=poll.question,
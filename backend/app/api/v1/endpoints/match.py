@@ -12,7 +12,7 @@ from app.models.swipe_history import SwipeAction, SwipeHistory, SwipeTargetType
 from app.models.group import CostType, GroupCategory, GroupVisibility
 from app.models.membership import JoinStatus, MembershipRole
 from app.models.match_request import MatchInviteStatus
-from app.core.push import get_push_tokens, send_expo_push
+from app.core.push import enqueue_push, get_push_tokens, invalidate_group_fanout
 
 router = APIRouter()
 MAX_MATCH_CANDIDATES = 200
@@ -149,6 +149,7 @@ def _get_or_create_direct_thread(
                 join_status=JoinStatus.APPROVED,
             ),
         )
+    invalidate_group_fanout(group.id)
 
     thread = models.DirectThread(user_a_id=a_id, user_b_id=b_id, group_id=group.id)
     db.add(thread)
@@ -432,7 +433,7 @@ def send_match_request(
         target_label = target_name or (target_user.username if target_user else None)
         target_label = target_label or "Someone"
         tokens = get_push_tokens(db, [current_user.id, user_id])
-        send_expo_push(
+        enqueue_push(
             tokens,
             title="It's a match!",
             body=f"You and {target_label} liked each other.",
@@ -1,27 +1,86 @@
 import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from urllib.parse import quote, unquote
 
 import httpx
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import RedirectResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
 from jose import jwt
 from sqlalchemy.orm import Session
 
+from app import schemas
 from app.api import deps
 from app.core import storage
+from app.core.blob_store import get_blob_store, iter_blob_chunks
 from app.core.config import settings
 from app.models.media import MediaBlob
 
 router = APIRouter()
 
 
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into inclusive offsets.
+
+    Returns ``None`` when the whole object should be sent (no header, other
+    units, or multiple ranges, which we answer with a plain 200).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates
+
+
+def _not_modified_since(header: str | None, last_modified: datetime | None) -> bool:
+    if not header or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
 @router.get("/media/{media_id}")
 def get_media(
     *,
     db: Session = Depends(deps.get_db),
     media_id: int,
+    request: Request,
 ) -> Response:
+    # ``data`` is a deferred column, so this loads metadata only; legacy
+    # in-database bytes are fetched below only when a body is sent.
     media = (
         db.query(MediaBlob)
         .filter(MediaBlob.id == media_id, MediaBlob.deleted_at.is_(None))
@@ -29,8 +88,67 @@ def get_media(
     )
     if not media:
         raise HTTPException(status_code=404, detail="Media not found")
-    headers = {"Cache-Control": "public, max-age=86400"}
-    return Response(content=media.data, media_type=media.content_type, headers=headers)
+
+    # A blob's bytes never change, but the blob can be soft-deleted (user
+    # deletion, moderation takedown), so caching is private and time-bounded;
+    # after expiry the ETag still makes revalidation a cheap 304.
+    headers = {
+        "Cache-Control": f"private, max-age={settings.MEDIA_CACHE_MAX_AGE_SECONDS}",
+        "Accept-Ranges": "bytes",
+    }
+    etag = f'"{media.content_hash}"' if media.content_hash else None
+    if etag:
+        headers["ETag"] = etag
+    if media.created_at is not None:
+        headers["Last-Modified"] = format_datetime(media.created_at.astimezone(timezone.utc), usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if (etag and _etag_matches(if_none_match, etag)) or (
+        if_none_match is None and _not_modified_since(request.headers.get("if-modified-since"), media.created_at)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and (etag is None or if_range.strip() != etag):
+        range_header = None
+
+    if not media.content_hash:
+        data = media.data
+        byte_range = _parse_range(range_header, len(data))
+        if byte_range is None:
+            return Response(content=data, media_type=media.content_type, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(
+            content=data[start : end + 1],
+            status_code=206,
+            media_type=media.content_type,
+            headers=headers,
+        )
+
+    store = get_blob_store()
+    try:
+        size = media.size_bytes if media.size_bytes is not None else store.size(media.content_hash)
+        byte_range = _parse_range(range_header, size)
+        path = store.local_path(media.content_hash)
+        if byte_range is None and path:
+            return FileResponse(path, media_type=media.content_type, headers=headers)
+        handle = store.open(media.content_hash)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_blob_chunks(handle), media_type=media.content_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_blob_chunks(handle, start=start, length=end - start + 1),
+        status_code=206,
+        media_type=media.content_type,
+        headers=headers,
+    )
 
 
 @router.get("/storage/signed/{object_key:path}")
@@ -45,13 +163,35 @@ def get_storage_signed_url(
             "signed_url": storage.build_public_url(decoded_key),
             "expires_in": 0,
         }
-    signed_url = storage.create_signed_url(decoded_key)
+    signed_url, expires_in = storage.get_signed_url(decoded_key)
     return {
         "signed_url": signed_url,
-        "expires_in": settings.SUPABASE_SIGNED_URL_EXPIRE_SECONDS,
+        "expires_in": expires_in,
     }
 
 
+@router.post("/storage/signed", response_model=list[schemas.SignedUrl])
+def get_storage_signed_urls(
+    *,
+    payload: schemas.SignedUrlBatchRequest,
+    current_user_id: int = Depends(deps.get_current_user_id),
+):
+    """Sign a page of object keys at once; unknown keys are omitted from the result."""
+    # Keys are echoed back as sent so clients can match them to their URLs.
+    decoded = {key: unquote(key) for key in payload.object_keys}
+    if settings.SUPABASE_STORAGE_PUBLIC:
+        return [
+            {"object_key": key, "signed_url": storage.build_public_url(path), "expires_in": 0}
+            for key, path in decoded.items()
+        ]
+    signed = storage.get_signed_urls(list(decoded.values()))
+    return [
+        {"object_key": key, "signed_url": signed[path][0], "expires_in": signed[path][1]}
+        for key, path in decoded.items()
+        if path in signed
+    ]
+
+
 @router.get("/storage/{object_key:path}")
 def get_storage_object(
     *,
@@ -61,7 +201,7 @@ def get_storage_object(
     decoded_key = unquote(object_key)
     if settings.SUPABASE_STORAGE_PUBLIC:
         return RedirectResponse(storage.build_public_url(decoded_key))
-    signed_url = storage.create_signed_url(decoded_key)
+    signed_url, _ = storage.get_signed_url(decoded_key)
     return RedirectResponse(signed_url)
 
 
@@ -1,103 +1,44 @@
-import io
+import asyncio
 import json
+import logging
 import os
-import tempfile
 import uuid
 from datetime import datetime
 import anyio
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, Form
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from PIL import Image
-from nudenet import NudeDetector
 
 from app import crud, models, schemas
+from app.core.blob_store import create_media_blob
 from app.core.config import settings
-from app.models.media import MediaBlob
+from app.core.jobs import job_queue
+from app.core.moderation import moderate_image
+from app.core.pagination import (
+    cursor_timestamp,
+    cursor_timestamp_value,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+)
+from app.core.search import message_search_index, search_messages
+from app.db.session import SessionLocal
 from app.models.membership import JoinStatus
 from app.models.message import GroupMessageRead
 from app.api import deps
-from app.core.push import get_group_member_ids, get_push_tokens, send_expo_push
+from app.core.push import enqueue_group_message_push, get_group_fanout
 from app.core.realtime import realtime_manager, serialize_message
-from app.core.storage import supabase_storage_enabled, upload_bytes_to_supabase
+from app.core.storage import (
+    UploadTooLargeError,
+    copy_file_limited,
+    read_file_limited,
+    supabase_storage_enabled,
+    upload_file_to_supabase,
+)
 
 router = APIRouter()
-
-_nudenet_detector = None
-
-
-def _estimate_nudity_score_bytes(image_bytes: bytes) -> float:
-    try:
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        image.thumbnail((96, 96))
-        pixels = list(image.getdata())
-        if not pixels:
-            return 0.0
-        skin = 0
-        for r, g, b in pixels:
-            max_c = max(r, g, b)
-            min_c = min(r, g, b)
-            if (
-                r > 95
-                and g > 40
-                and b > 20
-                and (max_c - min_c) > 15
-                and abs(r - g) > 15
-                and r > g
-                and r > b
-            ):
-                skin += 1
-        return skin / len(pixels)
-    except Exception:
-        return 0.0
-
-
-def _get_nudenet_detector():
-    global _nudenet_detector
-    if _nudenet_detector is None:
-        _nudenet_detector = NudeDetector()
-    return _nudenet_detector
-
-
-def _detect_nudity(image_bytes: bytes) -> dict | None:
-    provider = getattr(settings, "NUDITY_PROVIDER", "nudenet")
-    if provider in {"nudenet", "open_source"}:
-        detector = _get_nudenet_detector()
-        threshold = float(getattr(settings, "NUDITY_MIN_CONFIDENCE", 0.35))
-        if threshold > 1:
-            threshold = threshold / 100.0
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp:
-                temp.write(image_bytes)
-                temp_path = temp.name
-            try:
-                results = detector.detect(temp_path)
-            finally:
-                os.unlink(temp_path)
-            max_score = 0.0
-            is_explicit = False
-            explicit_labels = {
-                "exposed_anus",
-                "exposed_breast_f",
-                "exposed_breast_m",
-                "exposed_buttocks",
-                "exposed_genitalia_f",
-                "exposed_genitalia_m",
-                "exposed_torso",
-            }
-            for item in results or []:
-                label = (item.get("class") or "").lower()
-                score = float(item.get("score") or 0.0)
-                max_score = max(max_score, score)
-                if label in explicit_labels and score >= threshold:
-                    is_explicit = True
-            return {
-                "contains_nudity": is_explicit,
-                "score": round(max_score, 3),
-                "provider": "nudenet",
-            }
-        except Exception:
-            return None
-    return None
+logger = logging.getLogger(__name__)
 
 def require_group_member(
     db: Session,
@@ -117,43 +58,127 @@ def require_group_member(
     if not membership:
         raise HTTPException(status_code=403, detail="You must be an approved member to access chat.")
 
+@router.get("/messages/search", response_model=list[schemas.GroupMessageSearchResult])
+def search_group_messages(
+    *,
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    group_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=20, ge=1, le=50),
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """Search chat history across the groups the user is an approved member of."""
+    results = search_messages(
+        db,
+        user_id=current_user.id,
+        query=q,
+        group_id=group_id,
+        cursor=decode_rank_cursor(cursor),
+        limit=limit + 1,
+    )
+    if len(results) > limit:
+        results = results[:limit]
+        last_message, last_rank, _ = results[-1]
+        response.headers["X-Next-Cursor"] = encode_rank_cursor(last_rank, last_message.id)
+    return [
+        schemas.GroupMessageSearchResult(
+            id=message.id,
+            group_id=message.group_id,
+            sender_id=message.sender_id,
+            content=message.content,
+            snippet=snippet,
+            rank=rank,
+            created_at=message.created_at,
+        )
+        for message, rank, snippet in results
+    ]
+
+
 @router.get("/{id}/messages", response_model=list[schemas.GroupMessage])
 def list_messages(
     *,
+    response: Response,
     db: Session = Depends(deps.get_db),
     id: int,
     since: datetime | None = None,
     before: datetime | None = None,
+    cursor: str | None = None,
+    after: str | None = None,
     limit: int | None = None,
     current_user: models.User = Depends(deps.get_current_user),
 ):
+    """List chat history newest-page-first using a ``(created_at, id)`` keyset cursor.
+
+    Pages are returned oldest-to-newest. ``X-Next-Cursor`` points at the next
+    older page. ``since`` (a timestamp) or ``after`` (a cursor) instead walk
+    forward; when that page is truncated, ``X-Has-More`` is set and
+    ``X-Next-After-Cursor`` continues the walk.
+    """
     require_group_member(db, group_id=id, user_id=current_user.id)
+    page_limit = min(
+        max(1, limit or settings.MESSAGE_PAGE_DEFAULT_LIMIT),
+        settings.MESSAGE_PAGE_MAX_LIMIT,
+    )
     query = db.query(models.GroupMessage).filter(
         models.GroupMessage.group_id == id,
         models.GroupMessage.deleted_at.is_(None),
     )
+    created_at = cursor_timestamp(db, models.GroupMessage.created_at)
     if since:
-        query = query.filter(models.GroupMessage.created_at > since)
+        query = query.filter(created_at > cursor_timestamp_value(db, since))
     if before:
-        query = query.filter(models.GroupMessage.created_at < before)
-
-    messages: list[models.GroupMessage]
-    if limit and limit > 0:
-        if since:
-            messages = (
-                query.order_by(models.GroupMessage.created_at.asc())
-                .limit(limit)
-                .all()
+        query = query.filter(created_at < cursor_timestamp_value(db, before))
+    cursor_payload = decode_cursor(cursor)
+    if cursor_payload:
+        cursor_created_at = cursor_timestamp_value(db, cursor_payload[0])
+        cursor_id = cursor_payload[1]
+        query = query.filter(
+            or_(
+                created_at < cursor_created_at,
+                and_(
+                    created_at == cursor_created_at,
+                    models.GroupMessage.id < cursor_id,
+                ),
             )
-        else:
-            messages = (
-                query.order_by(models.GroupMessage.created_at.desc())
-                .limit(limit)
-                .all()
+        )
+
+    after_payload = decode_cursor(after) if not cursor_payload else None
+    if after_payload:
+        after_created_at = cursor_timestamp_value(db, after_payload[0])
+        after_id = after_payload[1]
+        query = query.filter(
+            or_(
+                created_at > after_created_at,
+                and_(
+                    created_at == after_created_at,
+                    models.GroupMessage.id > after_id,
+                ),
             )
-            messages.reverse()
+        )
+
+    messages: list[models.GroupMessage]
+    if (since or after_payload) and not cursor_payload:
+        messages = (
+            query.order_by(created_at.asc(), models.GroupMessage.id.asc())
+            .limit(page_limit + 1)
+            .all()
+        )
+        if len(messages) > page_limit:
+            messages = messages[:page_limit]
+            response.headers["X-Has-More"] = "true"
+            response.headers["X-Next-After-Cursor"] = encode_cursor(messages[-1])
     else:
-        messages = query.order_by(models.GroupMessage.created_at.asc()).all()
+        messages = (
+            query.order_by(created_at.desc(), models.GroupMessage.id.desc())
+            .limit(page_limit + 1)
+            .all()
+        )
+        if len(messages) > page_limit:
+            messages = messages[:page_limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(messages[-1])
+        messages.reverse()
     if not messages:
         return messages
     message_ids = [message.id for message in messages]
@@ -169,6 +194,221 @@ def list_messages(
         message.read_by = read_map.get(message.id, [])
     return messages
 
+
+def _message_push_body(content: str | None, attachment_type: str | None) -> str:
+    if content:
+        preview = content.strip()
+        return preview if len(preview) <= 120 else f"{preview[:117]}..."
+    if attachment_type and attachment_type.startswith("image/"):
+        return "Sent a photo."
+    return "Sent an attachment."
+
+
+def _attachment_size_limit(content_type: str) -> int:
+    if content_type.startswith("image/"):
+        return settings.UPLOAD_MAX_IMAGE_BYTES
+    return settings.UPLOAD_MAX_FILE_BYTES
+
+
+def _spool_upload(file: UploadFile, *, max_bytes: int) -> str:
+    spool_dir = os.path.join(os.getcwd(), settings.MESSAGE_SPOOL_DIR)
+    os.makedirs(spool_dir, exist_ok=True)
+    ext = os.path.splitext(file.filename or "")[1] or ".bin"
+    path = os.path.join(spool_dir, f"{uuid.uuid4().hex}{ext}")
+    try:
+        with open(path, "wb") as buffer:
+            copy_file_limited(file.file, buffer, max_bytes=max_bytes)
+    except UploadTooLargeError:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _store_attachment(
+    db: Session,
+    *,
+    group_id: int,
+    sender_id: int,
+    filename: str | None,
+    content_type: str,
+    fileobj,
+) -> str:
+    max_bytes = _attachment_size_limit(content_type)
+    if supabase_storage_enabled():
+        return upload_file_to_supabase(
+            prefix=f"messages/{group_id}",
+            filename=filename,
+            content_type=content_type,
+            fileobj=fileobj,
+            max_bytes=max_bytes,
+            public=False,
+        )
+    if content_type.startswith("image/"):
+        blob = create_media_blob(
+            db,
+            content_type=content_type,
+            filename=filename,
+            data=read_file_limited(fileobj, max_bytes=max_bytes),
+            created_by=sender_id,
+        )
+        return f"/api/v1/media/{blob.id}"
+    uploads_dir = os.path.join(os.getcwd(), "uploads", "messages")
+    os.makedirs(uploads_dir, exist_ok=True)
+    ext = os.path.splitext(filename or "")[1] or ".bin"
+    stored_name = f"{uuid.uuid4().hex}{ext}"
+    with open(os.path.join(uploads_dir, stored_name), "wb") as buffer:
+        copy_file_limited(fileobj, buffer, max_bytes=max_bytes)
+    return f"/uploads/messages/{stored_name}"
+
+
+def _message_read_by(db: Session, message_id: int) -> list[int]:
+    rows = (
+        db.query(GroupMessageRead.user_id)
+        .filter(GroupMessageRead.message_id == message_id)
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+def _discard_spool(spool_path: str) -> None:
+    try:
+        os.unlink(spool_path)
+    except OSError:
+        pass
+
+
+def _set_attachment_status(db: Session, message: models.GroupMessage, meta: dict, status: str) -> dict:
+    meta["status"] = status
+    message.meta = meta
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    return serialize_message(message, read_by=_message_read_by(db, message.id))
+
+
+def _process_attachment(payload: dict) -> dict | None:
+    """Moderate and store a spooled attachment, returning the updated message payload.
+
+    Errors that cannot go away on a retry (oversized or unreadable input, a
+    missing spool file) mark the message failed straight away. Anything else
+    (storage 5xx, transport or database errors) propagates so the job queue
+    retries it; the spool file is kept until an attempt succeeds or the last
+    one is exhausted (see ``_process_attachment_failed``).
+    """
+    spool_path = payload["spool_path"]
+    content_type = payload["content_type"]
+    db = SessionLocal()
+    try:
+        message = (
+            db.query(models.GroupMessage)
+            .filter(models.GroupMessage.id == payload["message_id"])
+            .first()
+        )
+        if not message:
+            _discard_spool(spool_path)
+            return None
+        meta = dict(message.meta or {})
+        try:
+            with open(spool_path, "rb") as buffer:
+                if content_type.startswith("image/"):
+                    image_bytes = read_file_limited(
+                        buffer, max_bytes=_attachment_size_limit(content_type)
+                    )
+                    meta["nudity"] = moderate_image(image_bytes)
+                    buffer.seek(0)
+                message.attachment_url = _store_attachment(
+                    db,
+                    group_id=message.group_id,
+                    sender_id=message.sender_id,
+                    filename=payload.get("filename"),
+                    content_type=content_type,
+                    fileobj=buffer,
+                )
+        except (ValueError, FileNotFoundError):
+            logger.exception("message_attachment_failed message_id=%s", message.id)
+            db.rollback()
+            meta = dict(message.meta or {})
+            serialized = _set_attachment_status(db, message, meta, "failed")
+            _discard_spool(spool_path)
+            return serialized
+        serialized = _set_attachment_status(db, message, meta, "ready")
+        _discard_spool(spool_path)
+        return serialized
+    finally:
+        db.close()
+
+
+def _mark_attachment_failed(payload: dict) -> dict | None:
+    db = SessionLocal()
+    try:
+        message = (
+            db.query(models.GroupMessage)
+            .filter(models.GroupMessage.id == payload["message_id"])
+            .first()
+        )
+        if not message:
+            return None
+        return _set_attachment_status(db, message, dict(message.meta or {}), "failed")
+    finally:
+        db.close()
+        _discard_spool(payload["spool_path"])
+
+
+@job_queue.handler("messages.process_attachment")
+async def _process_attachment_job(payload: dict) -> None:
+    serialized = await asyncio.to_thread(_process_attachment, payload)
+    if not serialized:
+        return
+    await realtime_manager.broadcast(
+        serialized["group_id"],
+        {"type": "message:update", "message": serialized},
+    )
+    if (serialized.get("meta") or {}).get("status") == "ready":
+        job_queue.enqueue("messages.push", {"message_id": serialized["id"]})
+
+
+@job_queue.failure_handler("messages.process_attachment")
+async def _process_attachment_failed(payload: dict) -> None:
+    serialized = await asyncio.to_thread(_mark_attachment_failed, payload)
+    if not serialized:
+        return
+    await realtime_manager.broadcast(
+        serialized["group_id"],
+        {"type": "message:update", "message": serialized},
+    )
+
+
+@job_queue.handler("messages.push")
+def _send_message_push(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        message = (
+            db.query(models.GroupMessage)
+            .filter(models.GroupMessage.id == payload["message_id"])
+            .first()
+        )
+        if not message:
+            return
+        recipient_ids = [
+            user_id
+            for user_id in get_group_fanout(db, message.group_id)
+            if user_id != message.sender_id
+        ]
+        if not recipient_ids:
+            return
+        group = crud.group.get(db, id=message.group_id)
+        enqueue_group_message_push(
+            db,
+            group_id=message.group_id,
+            group_title=group.title if group else "New message",
+            recipient_ids=recipient_ids,
+            body=_message_push_body(message.content, message.attachment_type),
+            data={"type": "message", "group_id": message.group_id, "message_id": message.id},
+        )
+    finally:
+        db.close()
+
+
 @router.post("/{id}/messages", response_model=schemas.GroupMessage, dependencies=[Depends(deps.rate_limit)])
 def create_message(
     *,
@@ -180,64 +420,30 @@ def create_message(
     metadata: str | None = Form(default=None),
     current_user: models.User = Depends(deps.get_current_user),
 ):
+    """Persist and broadcast a message; attachment handling and pushes run in the job queue."""
     require_group_member(db, group_id=id, user_id=current_user.id)
     if not content and not file:
         raise HTTPException(status_code=400, detail="Message content or file is required.")
 
-    attachment_url = None
-    attachment_type = None
-    nudity_info = None
-    if file:
-        attachment_type = file.content_type or "application/octet-stream"
-        file_bytes = file.file.read()
-        if attachment_type.startswith("image/"):
-            detection = _detect_nudity(file_bytes)
-            if detection is None:
-                score = _estimate_nudity_score_bytes(file_bytes)
-                detection = {
-                    "contains_nudity": score >= 0.35,
-                    "score": round(score, 3),
-                    "provider": "heuristic",
-                }
-            nudity_info = detection
-        if supabase_storage_enabled():
-            attachment_url = upload_bytes_to_supabase(
-                prefix=f"messages/{id}",
-                filename=file.filename,
-                content_type=attachment_type,
-                data=file_bytes,
-                public=False,
-            )
-        elif attachment_type.startswith("image/"):
-            blob = MediaBlob(
-                content_type=attachment_type,
-                filename=file.filename,
-                data=file_bytes,
-                created_by=current_user.id,
-            )
-            db.add(blob)
-            db.flush()
-            attachment_url = f"/api/v1/media/{blob.id}"
-        else:
-            uploads_dir = os.path.join(os.getcwd(), "uploads", "messages")
-            os.makedirs(uploads_dir, exist_ok=True)
-            ext = os.path.splitext(file.filename or "")[1] or ".bin"
-            filename = f"{uuid.uuid4().hex}{ext}"
-            filepath = os.path.join(uploads_dir, filename)
-            with open(filepath, "wb") as buffer:
-                buffer.write(file_bytes)
-            attachment_url = f"/uploads/messages/{filename}"
-
     parsed_metadata = None
     if metadata:
         try:
             parsed_metadata = json.loads(metadata)
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid metadata JSON.")
-    if nudity_info:
-        if parsed_metadata is None:
+
+    attachment_type = None
+    spool_path = None
+    if file:
+        attachment_type = file.content_type or "application/octet-stream"
+        try:
+            spool_path = _spool_upload(file, max_bytes=_attachment_size_limit(attachment_type))
+        except UploadTooLargeError:
+            raise HTTPException(status_code=413, detail="Attachment is too large.")
+        if not isinstance(parsed_metadata, dict):
             parsed_metadata = {}
-        parsed_metadata["nudity"] = nudity_info
+        parsed_metadata["status"] = "processing"
+
     resolved_type = message_type
     if not resolved_type:
         resolved_type = "file" if file else "text"
@@ -245,38 +451,37 @@ def create_message(
         group_id=id,
         sender_id=current_user.id,
         content=content,
-        attachment_url=attachment_url,
+        attachment_url=None,
         attachment_type=attachment_type,
         message_type=resolved_type,
         meta=parsed_metadata,
     )
     db.add(message)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        if spool_path:
+            os.unlink(spool_path)
+        raise
     db.refresh(message)
+    message_search_index.add(message)
     anyio.from_thread.run(
         realtime_manager.broadcast,
         id,
         {"type": "message:new", "message": serialize_message(message, read_by=[])},
     )
-    group = crud.group.get(db, id=id)
-    recipient_ids = [
-        user_id for user_id in get_group_member_ids(db, id) if user_id != current_user.id
-    ]
-    tokens = get_push_tokens(db, recipient_ids)
-    if tokens:
-        if content:
-            preview = content.strip()
-            body = preview if len(preview) <= 120 else f"{preview[:117]}..."
-        elif attachment_type and attachment_type.startswith("image/"):
-            body = "Sent a photo."
-        else:
-            body = "Sent an attachment."
-        send_expo_push(
-            tokens,
-            title=group.title if group else "New message",
-            body=body,
-            data={"type": "message", "group_id": id, "message_id": message.id},
+    if spool_path:
+        job_queue.enqueue(
+            "messages.process_attachment",
+            {
+                "message_id": message.id,
+                "spool_path": spool_path,
+                "filename": file.filename,
+                "content_type": attachment_type,
+            },
         )
+    else:
+        job_queue.enqueue("messages.push", {"message_id": message.id})
     return message
 
 
@@ -289,35 +494,16 @@ def mark_messages_read(
     current_user: models.User = Depends(deps.get_current_user),
 ):
     require_group_member(db, group_id=id, user_id=current_user.id)
-    message_ids = payload.message_ids
-    if not message_ids:
+    if not payload.message_ids and payload.up_to_id is None:
         return {"msg": "No messages to update"}
-    valid_ids = (
-        db.query(models.GroupMessage.id)
-        .filter(
-            models.GroupMessage.group_id == id,
-            models.GroupMessage.id.in_(message_ids),
-            models.GroupMessage.deleted_at.is_(None),
-        )
-        .all()
-    )
-    valid_set = {row[0] for row in valid_ids}
-    if not valid_set:
-        return {"msg": "No messages found"}
-    existing = (
-        db.query(GroupMessageRead.message_id)
-        .filter(
-            GroupMessageRead.user_id == current_user.id,
-            GroupMessageRead.message_id.in_(list(valid_set)),
-        )
-        .all()
+    new_ids = crud.message_read.mark_read(
+        db,
+        group_id=id,
+        user_id=current_user.id,
+        message_ids=payload.message_ids,
+        up_to_id=payload.up_to_id,
     )
-    existing_set = {row[0] for row in existing}
-    new_ids = [message_id for message_id in valid_set if message_id not in existing_set]
-    for message_id in new_ids:
-        db.add(GroupMessageRead(message_id=message_id, user_id=current_user.id))
     if new_ids:
-        db.commit()
         anyio.from_thread.run(
             realtime_manager.broadcast,
             id,
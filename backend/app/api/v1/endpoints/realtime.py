@@ -13,7 +13,6 @@ from app.db.session import SessionLocal
 from app.models.auth_session import UserRefreshSession
 from app.models.membership import JoinStatus
 from app.models.user import VerificationStatus
-from app.models.message import GroupMessageRead
 
 router = APIRouter()
 
@@ -73,38 +72,6 @@ def _normalize_ids(values: Iterable[object]) -> list[int]:
     return ids
 
 
-def _record_reads(db: Session, group_id: int, user_id: int, message_ids: list[int]) -> list[int]:
-    if not message_ids:
-        return []
-    valid_ids = (
-        db.query(models.GroupMessage.id)
-        .filter(
-            models.GroupMessage.group_id == group_id,
-            models.GroupMessage.id.in_(message_ids),
-            models.GroupMessage.deleted_at.is_(None),
-        )
-        .all()
-    )
-    valid_set = {row[0] for row in valid_ids}
-    if not valid_set:
-        return []
-    existing = (
-        db.query(GroupMessageRead.message_id)
-        .filter(
-            GroupMessageRead.user_id == user_id,
-            GroupMessageRead.message_id.in_(list(valid_set)),
-        )
-        .all()
-    )
-    existing_set = {row[0] for row in existing}
-    new_ids = [message_id for message_id in valid_set if message_id not in existing_set]
-    for message_id in new_ids:
-        db.add(GroupMessageRead(message_id=message_id, user_id=user_id))
-    if new_ids:
-        db.commit()
-    return new_ids
-
-
 def _extract_token_from_subprotocol(websocket: WebSocket) -> tuple[str | None, str | None]:
     raw = websocket.headers.get("sec-websocket-protocol") or ""
     if not raw:
@@ -128,6 +95,7 @@ async def group_realtime(websocket: WebSocket, group_id: int) -> None:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
     db = SessionLocal()
+    user_id: int | None = None
     try:
         user = _get_current_user(db, token)
         if (
@@ -137,7 +105,10 @@ async def group_realtime(websocket: WebSocket, group_id: int) -> None:
         ):
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
-        await realtime_manager.connect(group_id, websocket, subprotocol=accepted_subprotocol)
+        user_id = user.id
+        await realtime_manager.connect(
+            group_id, websocket, subprotocol=accepted_subprotocol, user_id=user_id
+        )
         while True:
             raw = await websocket.receive_text()
             try:
@@ -146,17 +117,17 @@ async def group_realtime(websocket: WebSocket, group_id: int) -> None:
                 continue
             event_type = payload.get("type")
             if event_type == "typing":
-                await realtime_manager.broadcast(
-                    group_id,
-                    {
-                        "type": "typing",
-                        "user_id": user.id,
-                        "is_typing": bool(payload.get("is_typing")),
-                    },
-                )
+                realtime_manager.set_typing(group_id, user.id, bool(payload.get("is_typing")))
             elif event_type == "read":
                 message_ids = _normalize_ids(payload.get("message_ids", []))
-                recorded = _record_reads(db, group_id, user.id, message_ids)
+                up_to_ids = _normalize_ids([payload.get("up_to_id")])
+                recorded = crud.message_read.mark_read(
+                    db,
+                    group_id=group_id,
+                    user_id=user.id,
+                    message_ids=message_ids,
+                    up_to_id=up_to_ids[0] if up_to_ids else None,
+                )
                 if recorded:
                     await realtime_manager.broadcast(
                         group_id,
@@ -165,5 +136,7 @@ async def group_realtime(websocket: WebSocket, group_id: int) -> None:
     except WebSocketDisconnect:
         pass
     finally:
-        await realtime_manager.disconnect(group_id, websocket)
+        if user_id is not None:
+            realtime_manager.clear_typing(group_id, user_id)
+        await realtime_manager.disconnect(group_id, websocket, user_id=user_id)
         db.close()
@@ -1,5 +1,6 @@
 ﻿# backend/app/api/v1/endpoints/users.py
 from datetime import datetime, timezone
+import os
 from uuid import uuid4
 from typing import Any, List
 from fastapi import APIRouter, Body, Depends, File, HTTPException, UploadFile, status
@@ -15,11 +16,20 @@ from app.models.media import MediaBlob
 from app.models.membership import JoinStatus, MembershipRole
 from app.models.user import VerificationStatus
 from app.models.message import GroupMessageRead
+from app.core.blob_store import create_media_blob
+from app.core.config import settings
+from app.core.images import (
+    ImageProcessingBusyError,
+    pick_image_url,
+    process_image_derivatives,
+    store_image_derivatives,
+)
+from app.core.push import invalidate_user_fanout
 from app.core.storage import (
-    supabase_public_storage_enabled,
+    UploadTooLargeError,
+    read_file_limited,
     supabase_storage_enabled,
-    upload_bytes_to_supabase,
-    upload_public_image_with_thumbnail,
+    upload_file_to_supabase,
 )
 
 router = APIRouter()
@@ -90,7 +100,9 @@ def register_push_token(
         .filter(models.UserPushToken.token == token)
         .first()
     )
+    affected_user_ids = {current_user.id}
     if existing:
+        affected_user_ids.add(existing.user_id)
         existing.user_id = current_user.id
         existing.platform = payload.platform
         db.add(existing)
@@ -103,6 +115,7 @@ def register_push_token(
             )
         )
     db.commit()
+    invalidate_user_fanout(db, affected_user_ids)
     return {"msg": "Push token saved"}
 
 @router.get("/me/groups", response_model=List[schemas.Group])
@@ -603,51 +616,46 @@ def upload_profile_photo(
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image uploads are allowed.")
 
-    file_bytes = file.file.read()
-    photo_url = None
-    thumb_url = None
-    if supabase_public_storage_enabled():
-        photo_url, thumb_url = upload_public_image_with_thumbnail(
-            prefix=f"users/{current_user.id}",
-            filename=file.filename,
-            content_type=file.content_type,
-            data=file_bytes,
-        )
-    elif supabase_storage_enabled():
-        photo_url = upload_bytes_to_supabase(
-            prefix=f"users/{current_user.id}",
-            filename=file.filename,
-            content_type=file.content_type,
-            data=file_bytes,
-            public=False,
-        )
-    else:
-        blob = MediaBlob(
-            content_type=file.content_type or "image/jpeg",
-            filename=file.filename,
-            data=file_bytes,
-            created_by=current_user.id,
-        )
-        db.add(blob)
-        db.flush()
-        photo_url = f"/api/v1/media/{blob.id}"
-    current_user.profile_image_url = current_user.profile_image_url or photo_url
     media = dict(current_user.profile_media or {})
     photos = list(media.get("photos") or [])
     if len(photos) >= 9:
         raise HTTPException(status_code=400, detail="You can upload up to 9 photos.")
+    try:
+        file_bytes = read_file_limited(file.file, max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail="Image is too large.")
+    # Raw camera uploads are normalized (EXIF rotation, size cap) into thumb/medium/full.
+    try:
+        derivatives = process_image_derivatives(file_bytes)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image file.")
+    except ImageProcessingBusyError:
+        raise HTTPException(
+            status_code=503, detail="Image processing is busy, try again shortly.", headers={"Retry-After": "5"}
+        )
+    stem = os.path.splitext(file.filename or "photo")[0] or "photo"
+    variants = store_image_derivatives(
+        db,
+        prefix=f"users/{current_user.id}",
+        stem=stem,
+        derivatives=derivatives,
+        created_by=current_user.id,
+    )
+    photo_url = pick_image_url(variants, "full")
+    thumb_url = pick_image_url(variants, "medium")
+    current_user.profile_image_url = current_user.profile_image_url or photo_url
     photos.append(photo_url)
     media["photos"] = photos
-    if thumb_url:
-        thumbs = media.get("photo_thumbs")
-        if not isinstance(thumbs, dict):
-            thumbs = {}
-        else:
-            thumbs = dict(thumbs)
-        thumbs[photo_url] = thumb_url
-        media["photo_thumbs"] = thumbs
-        if current_user.profile_image_url == photo_url:
-            media["profile_image_thumb_url"] = thumb_url
+    thumbs = media.get("photo_thumbs")
+    thumbs = dict(thumbs) if isinstance(thumbs, dict) else {}
+    thumbs[photo_url] = thumb_url
+    media["photo_thumbs"] = thumbs
+    photo_variants = media.get("photo_variants")
+    photo_variants = dict(photo_variants) if isinstance(photo_variants, dict) else {}
+    photo_variants[photo_url] = variants
+    media["photo_variants"] = photo_variants
+    if current_user.profile_image_url == photo_url:
+        media["profile_image_thumb_url"] = thumb_url
     current_user.profile_media = media
     if current_user.verification_status != VerificationStatus.VERIFIED:
         current_user.verification_status = VerificationStatus.PENDING
@@ -683,6 +691,17 @@ def delete_profile_photo(
             media["photo_thumbs"] = thumbs
         else:
             media.pop("photo_thumbs", None)
+    media_urls = {url}
+    photo_variants = media.get("photo_variants")
+    if isinstance(photo_variants, dict) and url in photo_variants:
+        photo_variants = dict(photo_variants)
+        for entry in (photo_variants.pop(url) or {}).values():
+            if isinstance(entry, dict):
+                media_urls.update(value for value in entry.values() if isinstance(value, str))
+        if photo_variants:
+            media["photo_variants"] = photo_variants
+        else:
+            media.pop("photo_variants", None)
     if current_user.profile_image_url == url:
         current_user.profile_image_url = photos[0] if photos else None
         if current_user.profile_image_url and isinstance(thumbs, dict):
@@ -690,9 +709,11 @@ def delete_profile_photo(
         else:
             media.pop("profile_image_thumb_url", None)
     current_user.profile_media = media
-    if url.startswith("/api/v1/media/"):
+    for media_url in media_urls:
+        if not media_url.startswith("/api/v1/media/"):
+            continue
         try:
-            blob_id = int(url.split("/api/v1/media/")[1])
+            blob_id = int(media_url.split("/api/v1/media/")[1])
             blob = db.query(MediaBlob).filter(MediaBlob.id == blob_id).first()
             if blob:
                 blob.deleted_at = _utcnow()
@@ -813,25 +834,27 @@ def upload_photo_verification(
 ) -> Any:
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image uploads are allowed.")
-    file_bytes = file.file.read()
-    if supabase_storage_enabled():
-        photo_url = upload_bytes_to_supabase(
-            prefix=f"users/{current_user.id}",
-            filename=file.filename,
-            content_type=file.content_type,
-            data=file_bytes,
-            public=False,
-        )
-    else:
-        blob = MediaBlob(
-            content_type=file.content_type or "image/jpeg",
-            filename=file.filename,
-            data=file_bytes,
-            created_by=current_user.id,
-        )
-        db.add(blob)
-        db.flush()
-        photo_url = f"/api/v1/media/{blob.id}"
+    try:
+        if supabase_storage_enabled():
+            photo_url = upload_file_to_supabase(
+                prefix=f"users/{current_user.id}",
+                filename=file.filename,
+                content_type=file.content_type,
+                fileobj=file.file,
+                max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES,
+                public=False,
+            )
+        else:
+            blob = create_media_blob(
+                db,
+                content_type=file.content_type or "image/jpeg",
+                filename=file.filename,
+                data=read_file_limited(file.file, max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES),
+                created_by=current_user.id,
+            )
+            photo_url = f"/api/v1/media/{blob.id}"
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail="Image is too large.")
     media = dict(current_user.profile_media or {})
     media["photo_verification_url"] = photo_url
     media["photo_verified"] = False
@@ -854,25 +877,27 @@ def upload_id_verification(
 ) -> Any:
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image uploads are allowed.")
-    file_bytes = file.file.read()
-    if supabase_storage_enabled():
-        id_url = upload_bytes_to_supabase(
-            prefix=f"users/{current_user.id}",
-            filename=file.filename,
-            content_type=file.content_type,
-            data=file_bytes,
-            public=False,
-        )
-    else:
-        blob = MediaBlob(
-            content_type=file.content_type or "image/jpeg",
-            filename=file.filename,
-            data=file_bytes,
-            created_by=current_user.id,
-        )
-        db.add(blob)
-        db.flush()
-        id_url = f"/api/v1/media/{blob.id}"
+    try:
+        if supabase_storage_enabled():
+            id_url = upload_file_to_supabase(
+                prefix=f"users/{current_user.id}",
+                filename=file.filename,
+                content_type=file.content_type,
+                fileobj=file.file,
+                max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES,
+                public=False,
+            )
+        else:
+            blob = create_media_blob(
+                db,
+                content_type=file.content_type or "image/jpeg",
+                filename=file.filename,
+                data=read_file_limited(file.file, max_bytes=settings.UPLOAD_MAX_IMAGE_BYTES),
+                created_by=current_user.id,
+            )
+            id_url = f"/api/v1/media/{blob.id}"
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail="Image is too large.")
     details = dict(current_user.profile_details or {})
     details["id_verification_url"] = id_url
     details["id_verification_status"] = "pending"
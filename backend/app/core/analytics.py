@@ -0,0 +1,227 @@
+"""Incremental request analytics rollups.
+
+Each flushed batch of request events is folded into minute and hour rollups
+(per route, plus hourly per client IP) in the same transaction as the raw
+insert. Every upsert only adds to existing rows, so concurrent workers can
+flush without reading or locking each other's rows.
+
+Latency is kept as a log-scale histogram: a request of ``d`` ms lands in bin
+``ceil(log(d) / log(GAMMA))``, and a bin is reported as the midpoint of its
+range, giving percentiles within ~5% of the true value. Histograms from
+different buckets or routes merge by adding counts per bin.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Sequence
+
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.request_rollup import (
+    ROLLUP_HOUR,
+    ROLLUP_MINUTE,
+    RequestIpRollup,
+    RequestIpUserRollup,
+    RequestLatencyRollup,
+    RequestRouteRollup,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SKETCH_GAMMA = 1.1
+_LOG_GAMMA = math.log(LATENCY_SKETCH_GAMMA)
+# Rows per INSERT statement, well under SQLite's bound-parameter limit.
+_UPSERT_CHUNK = 500
+
+_unsupported_dialect_logged = False
+
+
+def latency_bin(duration_ms: int | float) -> int:
+    if duration_ms <= 1:
+        return 0
+    return math.ceil(math.log(duration_ms) / _LOG_GAMMA)
+
+
+def latency_bin_value(index: int) -> float:
+    """Representative latency (ms) of a bin: the midpoint of (GAMMA^(i-1), GAMMA^i]."""
+    return 2 * LATENCY_SKETCH_GAMMA**index / (LATENCY_SKETCH_GAMMA + 1)
+
+
+def latency_percentiles(
+    bin_counts: dict[int, int], quantiles: Sequence[float] = (0.5, 0.95, 0.99)
+) -> list[float | None]:
+    total = sum(bin_counts.values())
+    if total <= 0:
+        return [None for _ in quantiles]
+    ordered = sorted(bin_counts.items())
+    results: list[float | None] = []
+    for quantile in quantiles:
+        rank = max(1, math.ceil(quantile * total))
+        seen = 0
+        for index, count in ordered:
+            seen += count
+            if seen >= rank:
+                results.append(round(latency_bin_value(index), 1))
+                break
+    return results
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == ROLLUP_MINUTE:
+        return timestamp.replace(second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _status_counts(status_code: int) -> tuple[int, int]:
+    return int(400 <= status_code <= 499), int(status_code >= 500)
+
+
+def record_request_rollups(db: Session, rows: Iterable[dict]) -> None:
+    """Add a batch of request-event rows to the rollup tables (caller commits)."""
+    global _unsupported_dialect_logged
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is None:
+        if not _unsupported_dialect_logged:
+            logger.warning("request_rollups_unsupported_dialect dialect=%s", dialect)
+            _unsupported_dialect_logged = True
+        return
+
+    routes: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    latency: dict[tuple, int] = defaultdict(int)
+    ips: dict[tuple, list] = {}
+    ip_users: set[tuple] = set()
+
+    for row in rows:
+        created_at: datetime = row["created_at"]
+        route = row.get("route") or row["path"]
+        status_code = int(row["status_code"])
+        duration_ms = int(row["duration_ms"])
+        is_4xx, is_5xx = _status_counts(status_code)
+        sketch_bin = latency_bin(duration_ms)
+        for granularity in (ROLLUP_MINUTE, ROLLUP_HOUR):
+            start = bucket_start(created_at, granularity)
+            totals = routes[(granularity, start, row["method"], route)]
+            totals[0] += 1
+            totals[1] += is_4xx
+            totals[2] += is_5xx
+            totals[3] += duration_ms
+            latency[(granularity, start, route, sketch_bin)] += 1
+
+        client_ip = row.get("client_ip")
+        if not client_ip:
+            continue
+        hour = bucket_start(created_at, ROLLUP_HOUR)
+        totals = ips.setdefault((hour, client_ip), [0, 0, 0, 0, created_at])
+        totals[0] += 1
+        totals[1] += is_4xx
+        totals[2] += is_5xx
+        totals[3] += duration_ms
+        totals[4] = max(totals[4], created_at)
+        if row.get("user_id") is not None:
+            ip_users.add((hour, client_ip, int(row["user_id"])))
+
+    # Keys are sorted so concurrent flushes take row locks in the same order.
+    _upsert_additive(
+        db,
+        insert,
+        RequestRouteRollup,
+        [
+            {
+                "granularity": granularity,
+                "bucket_start": start,
+                "method": method,
+                "route": route,
+                "requests": totals[0],
+                "errors_4xx": totals[1],
+                "errors_5xx": totals[2],
+                "duration_ms_sum": totals[3],
+            }
+            for (granularity, start, method, route), totals in sorted(routes.items())
+        ],
+        keys=["granularity", "bucket_start", "method", "route"],
+        counters=["requests", "errors_4xx", "errors_5xx", "duration_ms_sum"],
+    )
+    _upsert_additive(
+        db,
+        insert,
+        RequestLatencyRollup,
+        [
+            {"granularity": granularity, "bucket_start": start, "route": route, "bin": index, "count": count}
+            for (granularity, start, route, index), count in sorted(latency.items())
+        ],
+        keys=["granularity", "bucket_start", "route", "bin"],
+        counters=["count"],
+    )
+    _upsert_additive(
+        db,
+        insert,
+        RequestIpRollup,
+        [
+            {
+                "bucket_start": hour,
+                "client_ip": client_ip,
+                "requests": totals[0],
+                "errors_4xx": totals[1],
+                "errors_5xx": totals[2],
+                "duration_ms_sum": totals[3],
+                "last_seen_at": totals[4],
+            }
+            for (hour, client_ip), totals in sorted(ips.items())
+        ],
+        keys=["bucket_start", "client_ip"],
+        counters=["requests", "errors_4xx", "errors_5xx", "duration_ms_sum"],
+        latest=["last_seen_at"],
+    )
+    pairs = [
+        {"bucket_start": hour, "client_ip": client_ip, "user_id": user_id}
+        for hour, client_ip, user_id in sorted(ip_users)
+    ]
+    for index in range(0, len(pairs), _UPSERT_CHUNK):
+        statement = insert(RequestIpUserRollup).values(pairs[index : index + _UPSERT_CHUNK])
+        db.execute(
+            statement.on_conflict_do_nothing(index_elements=["bucket_start", "client_ip", "user_id"])
+        )
+
+
+def _upsert_additive(
+    db: Session,
+    insert,
+    model,
+    values: list[dict],
+    *,
+    keys: list[str],
+    counters: list[str],
+    latest: Sequence[str] = (),
+) -> None:
+    table = model.__table__
+    for index in range(0, len(values), _UPSERT_CHUNK):
+        statement = insert(model).values(values[index : index + _UPSERT_CHUNK])
+        set_ = {name: table.c[name] + statement.excluded[name] for name in counters}
+        for name in latest:
+            set_[name] = case(
+                (statement.excluded[name] > table.c[name], statement.excluded[name]),
+                else_=table.c[name],
+            )
+        db.execute(statement.on_conflict_do_update(index_elements=keys, set_=set_))
+
+
+def prune_request_rollups(
+    db: Session, *, now: datetime, minute_retention: timedelta, hour_retention: timedelta
+) -> None:
+    """Delete rollup rows past retention (caller commits)."""
+    minute_cutoff = now - minute_retention
+    hour_cutoff = now - hour_retention
+    for model in (RequestRouteRollup, RequestLatencyRollup):
+        db.query(model).filter(
+            model.granularity == ROLLUP_MINUTE, model.bucket_start < minute_cutoff
+        ).delete(synchronize_session=False)
+        db.query(model).filter(
+            model.granularity == ROLLUP_HOUR, model.bucket_start < hour_cutoff
+        ).delete(synchronize_session=False)
+    for model in (RequestIpRollup, RequestIpUserRollup):
+        db.query(model).filter(model.bucket_start < hour_cutoff).delete(synchronize_session=False)
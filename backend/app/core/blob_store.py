@@ -0,0 +1,170 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Iterator
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.media import MediaBlob
+
+
+class BlobStore:
+    """Content-addressed byte storage for ``MediaBlob`` rows.
+
+    Objects are keyed by the SHA-256 of their bytes, so writing the same
+    content twice stores it once. Backends only need ``put``/``open``/
+    ``delete``; ``local_path`` lets the media endpoint hand a file straight to
+    the server instead of streaming it through Python.
+    """
+
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def open(self, key: str) -> BinaryIO:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> str | None:
+        return None
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _validate_key(key: str) -> str:
+    if len(key) != 64 or any(ch not in "0123456789abcdef" for ch in key):
+        raise ValueError("invalid blob key")
+    return key
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs on local disk under ``root/ab/cd/<sha256>``.
+
+    Two levels of sharding keep directories small. Writes go to a temp file
+    in the target directory and are renamed into place, so readers never see
+    a partial object.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        key = _validate_key(key)
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        key = content_hash(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def local_path(self, key: str) -> str | None:
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+
+_BACKENDS = {
+    "local": lambda: LocalBlobStore(settings.MEDIA_BLOB_DIR),
+}
+_blob_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        backend = (settings.MEDIA_BLOB_BACKEND or "local").lower()
+        if backend not in _BACKENDS:
+            raise RuntimeError(f"Unknown MEDIA_BLOB_BACKEND: {backend}")
+        _blob_store = _BACKENDS[backend]()
+    return _blob_store
+
+
+def iter_blob_chunks(handle: BinaryIO, *, start: int = 0, length: int | None = None) -> Iterator[bytes]:
+    """Yield ``length`` bytes from ``start`` (to EOF when ``None``), then close."""
+    chunk_size = settings.UPLOAD_CHUNK_SIZE
+    try:
+        handle.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = handle.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
+
+
+def read_media_blob(blob: MediaBlob) -> bytes:
+    """Return a blob's bytes from the store, or from legacy in-database data."""
+    if blob.content_hash:
+        with get_blob_store().open(blob.content_hash) as handle:
+            return handle.read()
+    return bytes(blob.data)
+
+
+def create_media_blob(
+    db: Session,
+    *,
+    data: bytes,
+    content_type: str,
+    filename: str | None,
+    created_by: int | None,
+) -> MediaBlob:
+    """Write ``data`` to the blob store and add a metadata-only ``MediaBlob``.
+
+    The row is flushed so callers can build ``/api/v1/media/{id}`` URLs.
+    """
+    key = get_blob_store().put(data)
+    blob = MediaBlob(
+        content_type=content_type,
+        filename=filename,
+        content_hash=key,
+        size_bytes=len(data),
+        created_by=created_by,
+    )
+    db.add(blob)
+    db.flush()
+    return blob
@@ -23,21 +23,69 @@ class Settings(BaseSettings):
     RESET_TOKEN_EXPIRE_MINUTES: int = 30
     RATE_LIMIT_PER_MINUTE: int = 60
     REDIS_URL: str | None = None
+    REALTIME_TYPING_TICK_MS: int = Field(default=300, ge=50, le=5000)
+    REALTIME_TYPING_TTL_SECONDS: float = Field(default=6.0, gt=0, le=60)
+    JOB_QUEUE_BACKEND: str = "memory"
+    JOB_QUEUE_WORKERS: int = Field(default=4, ge=1, le=64)
+    JOB_QUEUE_MAX_ATTEMPTS: int = Field(default=3, ge=1, le=20)
+    PUSH_DISPATCH_INTERVAL_SECONDS: float = Field(default=1.0, gt=0, le=60)
+    PUSH_DISPATCH_BATCH_SIZE: int = Field(default=500, ge=1, le=5000)
+    PUSH_MAX_ATTEMPTS: int = Field(default=5, ge=1, le=20)
+    PUSH_RETRY_BACKOFF_SECONDS: float = Field(default=5.0, ge=0, le=600)
+    # Chat pushes to one recipient for one group are folded into a single
+    # "N new messages" push per window; 0 sends one push per message.
+    PUSH_COALESCE_WINDOW_SECONDS: int = Field(default=60, ge=0, le=3600)
+    # Cached group members + push tokens; 0 disables the cache.
+    PUSH_FANOUT_CACHE_TTL_SECONDS: int = Field(default=300, ge=0, le=86400)
+    # Expo recommends waiting ~15 minutes before fetching push receipts.
+    PUSH_RECEIPT_DELAY_SECONDS: int = Field(default=900, ge=0)
+    PUSH_OUTBOX_RETENTION_DAYS: int = Field(default=7, ge=1)
+    EXPO_ACCESS_TOKEN: str | None = None
+    MESSAGE_SPOOL_DIR: str = "spool/messages"
+    MESSAGE_PAGE_DEFAULT_LIMIT: int = Field(default=50, ge=1, le=500)
+    MESSAGE_PAGE_MAX_LIMIT: int = Field(default=200, ge=1, le=1000)
     CORS_ORIGINS: str | None = None
     AUTO_CREATE_TABLES: bool = True
     REQUIRE_VERIFICATION: bool = False
 
     NUDITY_PROVIDER: str = "nudenet"
     NUDITY_MIN_CONFIDENCE: float = 0.35
+    MODERATION_POOL_WORKERS: int = Field(default=1, ge=1, le=16)
+    MODERATION_BATCH_SIZE: int = Field(default=8, ge=1, le=64)
+    MODERATION_BATCH_WINDOW_MS: int = Field(default=25, ge=0, le=1000)
+    MODERATION_TIMEOUT_SECONDS: float = Field(default=10.0, gt=0, le=120)
+    MODERATION_CACHE_TTL_SECONDS: int = Field(default=7 * 24 * 3600, ge=60)
+    MODERATION_CACHE_MAX_ENTRIES: int = Field(default=10000, ge=1)
+    MODERATION_PHASH_MAX_DISTANCE: int = Field(default=3, ge=0, le=3)
 
     SUPABASE_URL: str | None = None
     SUPABASE_SERVICE_ROLE_KEY: str | None = None
     SUPABASE_STORAGE_BUCKET: str | None = None
     SUPABASE_STORAGE_PUBLIC: bool = True
     SUPABASE_SIGNED_URL_EXPIRE_SECONDS: int = 3600
+    # Cached signed URLs are reissued until this many seconds before they expire.
+    SUPABASE_SIGNED_URL_CACHE_MARGIN_SECONDS: int = Field(default=300, ge=0)
     SUPABASE_PUBLIC_STORAGE_BUCKET: str | None = None
     SUPABASE_PUBLIC_STORAGE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
     SUPABASE_PUBLIC_THUMBNAIL_MAX_SIZE: int = 720
+    IMAGE_THUMB_SIZE: int = Field(default=320, ge=32, le=2048)
+    IMAGE_FULL_SIZE: int = Field(default=1440, ge=256, le=4096)
+    # Extra formats generated next to JPEG for every size ("webp", "avif").
+    IMAGE_DERIVATIVE_FORMATS: str = "webp"
+    IMAGE_PROCESSING_WORKERS: int = Field(default=2, ge=1, le=32)
+    IMAGE_PROCESSING_MAX_PENDING: int = Field(default=8, ge=1, le=256)
+    IMAGE_PROCESSING_TIMEOUT_SECONDS: float = Field(default=30.0, gt=0, le=300)
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = Field(default=20, ge=1, le=200)
+    SUPABASE_HTTP_RETRIES: int = Field(default=2, ge=0, le=10)
+    SUPABASE_HTTP_RETRY_BACKOFF_SECONDS: float = Field(default=0.25, ge=0, le=10)
+    UPLOAD_MAX_IMAGE_BYTES: int = Field(default=10 * 1024 * 1024, ge=1024)
+    # Keep at or below the reverse proxy client_max_body_size (20 MB).
+    UPLOAD_MAX_FILE_BYTES: int = Field(default=20 * 1024 * 1024, ge=1024)
+    UPLOAD_CHUNK_SIZE: int = Field(default=1024 * 1024, ge=4096)
+    MEDIA_BLOB_BACKEND: str = "local"
+    MEDIA_BLOB_DIR: str = "media_blobs"
+    MEDIA_CACHE_MAX_AGE_SECONDS: int = Field(default=3600, ge=0)
 
     SENTRY_DSN: str | None = None
     SENTRY_ENVIRONMENT: str = "production"
@@ -46,10 +94,35 @@ class Settings(BaseSettings):
 
     METRICS_ENABLED: bool = True
     METRICS_BEARER_TOKEN: str | None = None
+    # Requests slower than this log their SQL statements (grouped, without
+    # parameters); 0 disables the dump.
+    SLOW_REQUEST_THRESHOLD_MS: int = Field(default=0, ge=0, le=600000)
+    SLOW_REQUEST_MAX_STATEMENTS: int = Field(default=200, ge=1, le=10000)
+    # Admin sampling profiler (/admin/profile and X-Profile-Token requests); off unless enabled.
+    PROFILER_ENABLED: bool = False
+    PROFILER_INTERVAL_MS: float = Field(default=10.0, ge=1.0, le=1000.0)
+    PROFILER_MAX_SECONDS: int = Field(default=60, ge=1, le=600)
+    PROFILER_RESULT_TTL_SECONDS: int = Field(default=3600, ge=60, le=7 * 86400)
     REQUEST_ANALYTICS_ENABLED: bool = True
     REQUEST_ANALYTICS_API_ONLY: bool = True
     REQUEST_ANALYTICS_SAMPLE_RATE: float = Field(default=1.0, ge=0.0, le=1.0)
     REQUEST_ANALYTICS_RETENTION_DAYS: int = Field(default=30, ge=0, le=3650)
+    # Request events are buffered in memory and written in multi-row batches;
+    # events beyond the buffer size are dropped (and counted), never awaited.
+    REQUEST_ANALYTICS_BUFFER_SIZE: int = Field(default=10000, ge=1, le=1_000_000)
+    REQUEST_ANALYTICS_FLUSH_INTERVAL_MS: int = Field(default=1000, ge=10, le=60000)
+    REQUEST_ANALYTICS_FLUSH_BATCH_SIZE: int = Field(default=500, ge=1, le=10000)
+    # Minute/hour rollups read by the admin analytics endpoints, updated on each flush.
+    REQUEST_ANALYTICS_ROLLUPS_ENABLED: bool = True
+    REQUEST_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS: int = Field(default=48, ge=1, le=24 * 31)
+    REQUEST_ANALYTICS_ROLLUP_RETENTION_DAYS: int = Field(default=180, ge=1, le=3650)
+    # On Postgres request_events is range-partitioned by day; the maintenance
+    # task keeps this many future partitions and drops expired ones.
+    REQUEST_ANALYTICS_PARTITION_PREMAKE_DAYS: int = Field(default=7, ge=1, le=90)
+    REQUEST_ANALYTICS_MAINTENANCE_INTERVAL_SECONDS: int = Field(default=3600, ge=60, le=86400)
+    # Periodic maintenance runs in one worker, elected via a Postgres advisory lock.
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_TICK_SECONDS: float = Field(default=60.0, ge=1, le=3600)
     
     PROJECT_NAME: str = "splendoura"
     ADMIN_EMAIL: str | None = None
@@ -65,6 +138,12 @@ class Settings(BaseSettings):
     SMTP_USE_TLS: bool = True
     SMTP_USE_SSL: bool = False
     SMTP_FROM: str = "support@splendoure.com"
+    SMTP_QUEUE_MAX_SIZE: int = Field(default=1000, ge=1)
+    SMTP_BATCH_SIZE: int = Field(default=20, ge=1, le=500)
+    SMTP_MAX_ATTEMPTS: int = Field(default=4, ge=1, le=20)
+    # Close the reused SMTP connection after this long without mail.
+    SMTP_IDLE_TIMEOUT_SECONDS: float = Field(default=30.0, gt=0, le=600)
+    SMTP_RETRY_BACKOFF_SECONDS: float = Field(default=5.0, ge=0, le=600)
     NEW_USER_ALERT_EMAIL: str | None = "martins.okhimhe@splendoure.com"
 
     model_config = SettingsConfigDict(
@@ -1,12 +1,32 @@
+import heapq
+import itertools
 import logging
+import queue
 import smtplib
 import ssl
+import threading
+import time
+from dataclasses import dataclass, field
 from email.message import EmailMessage
 
+from prometheus_client import Counter
+
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+MAIL_MESSAGES_TOTAL = Counter(
+    "splendoura_mail_messages_total",
+    "Outgoing emails by result (sent, retry, failed, dropped).",
+    ["result"],
+)
+SMTP_CONNECTIONS_TOTAL = Counter(
+    "splendoura_smtp_connections_total",
+    "SMTP connections opened (handshake, STARTTLS and login).",
+)
+# Check a reused connection with NOOP if it has been idle this long.
+SMTP_NOOP_AFTER_SECONDS = 10
+
 
 def _smtp_connect() -> smtplib.SMTP:
     host = settings.SMTP_HOST
@@ -21,11 +41,202 @@ def _smtp_connect() -> smtplib.SMTP:
     server = smtplib.SMTP(host, port, timeout=10)
     if settings.SMTP_USE_TLS:
         context = ssl.create_default_context()
-        server.starttls(context=context)
+        try:
+            server.starttls(context=context)
+        except BaseException:
+            server.close()
+            raise
+    return server
+
+
+def _smtp_login(server: smtplib.SMTP) -> smtplib.SMTP:
+    if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
+        server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+    SMTP_CONNECTIONS_TOTAL.inc()
     return server
 
 
+@dataclass(order=True)
+class _MailItem:
+    not_before: float
+    seq: int
+    message: EmailMessage = field(compare=False)
+    attempt: int = field(default=1, compare=False)
+
+
+class MailQueue:
+    """Sends queued emails from one thread over a reused SMTP connection.
+
+    ``send_email`` only enqueues, so requests never wait on the mail server.
+    The sender drains up to ``batch_size`` messages per wake-up over the same
+    connection, reconnects when the server drops it, closes it after
+    ``idle_timeout_seconds`` without mail, and retries transient failures
+    (4xx replies, disconnects) with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 1000,
+        batch_size: int = 20,
+        max_attempts: int = 4,
+        idle_timeout_seconds: float = 30.0,
+        backoff_seconds: float = 5.0,
+    ) -> None:
+        self._queue: queue.Queue[_MailItem | None] = queue.Queue(maxsize=max(1, max_size))
+        self._batch_size = max(1, batch_size)
+        self._max_attempts = max(1, max_attempts)
+        self._idle_timeout = idle_timeout_seconds
+        self._backoff = backoff_seconds
+        self._delayed: list[_MailItem] = []
+        self._seq = itertools.count()
+        self._server: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, name="mail-sender", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("mail_queue_stop_full pending=%s", self._queue.qsize())
+        thread.join(timeout)
+
+    def enqueue(self, message: EmailMessage) -> None:
+        if not self.running:
+            # Scripts and tests without the app lifecycle send inline.
+            self._send_batch([_MailItem(0.0, next(self._seq), message, self._max_attempts)])
+            self._close()
+            return
+        try:
+            self._queue.put_nowait(_MailItem(0.0, next(self._seq), message))
+        except queue.Full:
+            MAIL_MESSAGES_TOTAL.labels(result="dropped").inc()
+            logger.error("mail_queue_full to=%s", message["To"])
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            timeout = self._idle_timeout
+            if self._delayed:
+                timeout = max(0.0, min(timeout, self._delayed[0].not_before - time.monotonic()))
+            try:
+                first = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                first = False
+            if first is None:
+                stopping = True
+            batch = [first] if first else []
+            now = time.monotonic()
+            while self._delayed and self._delayed[0].not_before <= now and len(batch) < self._batch_size:
+                batch.append(heapq.heappop(self._delayed))
+            while not stopping and len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if batch:
+                self._send_batch(batch)
+            elif first is False and not self._delayed:
+                self._close()
+        if self._delayed:
+            logger.warning("mail_queue_stopped_with_retries pending=%s", len(self._delayed))
+        self._close()
+
+    def _connection(self) -> smtplib.SMTP:
+        now = time.monotonic()
+        if self._server is not None and now - self._last_used > SMTP_NOOP_AFTER_SECONDS:
+            try:
+                if self._server.noop()[0] != 250:
+                    self._close()
+            except (smtplib.SMTPException, OSError):
+                self._close()
+        if self._server is None:
+            server = _smtp_connect()
+            try:
+                self._server = _smtp_login(server)
+            except BaseException:
+                # Not assigned yet, so _close() would not release the socket.
+                server.close()
+                raise
+        self._last_used = now
+        return self._server
+
+    def _close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _send_batch(self, batch: list[_MailItem]) -> None:
+        for item in batch:
+            to_email = item.message["To"]
+            try:
+                self._connection().send_message(item.message)
+            except smtplib.SMTPRecipientsRefused:
+                MAIL_MESSAGES_TOTAL.labels(result="failed").inc()
+                logger.error("mail_send_refused to=%s", to_email)
+                continue
+            except smtplib.SMTPResponseException as exc:
+                if exc.smtp_code >= 500:
+                    MAIL_MESSAGES_TOTAL.labels(result="failed").inc()
+                    logger.error("mail_send_rejected to=%s code=%s", to_email, exc.smtp_code)
+                    continue
+                self._retry(item, f"code={exc.smtp_code}")
+                continue
+            except (smtplib.SMTPException, OSError, RuntimeError) as exc:
+                self._close()
+                self._retry(item, exc.__class__.__name__)
+                continue
+            MAIL_MESSAGES_TOTAL.labels(result="sent").inc()
+
+    def _retry(self, item: _MailItem, reason: str) -> None:
+        if item.attempt >= self._max_attempts:
+            MAIL_MESSAGES_TOTAL.labels(result="failed").inc()
+            logger.error("mail_send_failed to=%s attempts=%s reason=%s", item.message["To"], item.attempt, reason)
+            return
+        MAIL_MESSAGES_TOTAL.labels(result="retry").inc()
+        logger.warning("mail_send_retry to=%s attempt=%s reason=%s", item.message["To"], item.attempt, reason)
+        delay = self._backoff * (2 ** (item.attempt - 1))
+        heapq.heappush(
+            self._delayed,
+            _MailItem(time.monotonic() + delay, next(self._seq), item.message, item.attempt + 1),
+        )
+
+
+mail_queue = MailQueue(
+    max_size=settings.SMTP_QUEUE_MAX_SIZE,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_attempts=settings.SMTP_MAX_ATTEMPTS,
+    idle_timeout_seconds=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+    backoff_seconds=settings.SMTP_RETRY_BACKOFF_SECONDS,
+)
+
+
 def send_email(to_email: str, subject: str, html_body: str, text_body: str) -> None:
+    """Queue an email for the background sender; returns immediately."""
     if not settings.SMTP_HOST:
         logger.warning("SMTP_HOST not configured; skipping email send.")
         return
@@ -36,14 +247,7 @@ def send_email(to_email: str, subject: str, html_body: str, text_body: str) -> N
     msg["To"] = to_email
     msg.set_content(text_body)
     msg.add_alternative(html_body, subtype="html")
-
-    try:
-        with _smtp_connect() as server:
-            if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
-                server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-            server.send_message(msg)
-    except Exception:
-        logger.exception("Failed to send email to %s", to_email)
+    mail_queue.enqueue(msg)
 
 
 def send_password_reset_email(to_email: str, reset_link: str, reset_code: str) -> None:
@@ -0,0 +1,86 @@
+"""Side effects of domain events, run by the background job queue.
+
+Imported at startup (``app.main``) so every worker that consumes the queue
+has the handlers registered, and by ``events.emit`` for code that never
+imports the app (scripts, one-off jobs).
+"""
+
+from app import crud
+from app.core import email as email_utils
+from app.core.config import settings
+from app.core.events import JOIN_REQUESTED, MEMBER_APPROVED, USER_REGISTERED, subscribe
+from app.core.push import enqueue_push, get_push_tokens, notify_admins_new_user
+from app.db.session import SessionLocal
+
+
+@subscribe(USER_REGISTERED)
+def send_new_user_alert(payload: dict) -> None:
+    if not settings.NEW_USER_ALERT_EMAIL:
+        return
+    db = SessionLocal()
+    try:
+        user = crud.user.get(db, id=payload["user_id"])
+        if not user:
+            return
+        email_utils.send_new_user_alert_email(
+            to_email=settings.NEW_USER_ALERT_EMAIL,
+            user_id=user.id,
+            full_name=user.full_name,
+            username=user.username,
+            joined_email=user.email,
+        )
+    finally:
+        db.close()
+
+
+@subscribe(USER_REGISTERED)
+def push_new_user_to_admins(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        user = crud.user.get(db, id=payload["user_id"])
+        if user:
+            notify_admins_new_user(db, user)
+    finally:
+        db.close()
+
+
+@subscribe(JOIN_REQUESTED)
+def push_join_request_to_creator(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        group = crud.group.get(db, id=payload["group_id"])
+        if not group:
+            return
+        tokens = get_push_tokens(db, [group.creator_id])
+        if not tokens:
+            return
+        preview = payload.get("request_message") or "Tap to review their request."
+        body = preview if len(preview) <= 120 else f"{preview[:117]}..."
+        enqueue_push(
+            tokens,
+            title=f"New join request for {group.title}",
+            body=body,
+            data={"type": "join_request", "group_id": group.id, "user_id": payload["user_id"]},
+        )
+    finally:
+        db.close()
+
+
+@subscribe(MEMBER_APPROVED)
+def push_member_approved(payload: dict) -> None:
+    db = SessionLocal()
+    try:
+        group = crud.group.get(db, id=payload["group_id"])
+        if not group:
+            return
+        tokens = get_push_tokens(db, [payload["user_id"]])
+        if not tokens:
+            return
+        enqueue_push(
+            tokens,
+            title="It's a match!",
+            body=f"You've been accepted into {group.title}.",
+            data={"type": "join_approved", "group_id": group.id},
+        )
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+import importlib
+import logging
+from typing import Callable
+
+from app.core.jobs import job_queue
+
+logger = logging.getLogger(__name__)
+
+USER_REGISTERED = "user_registered"
+GROUP_CREATED = "group_created"
+JOIN_REQUESTED = "join_requested"
+MEMBER_APPROVED = "member_approved"
+MEMBER_REJECTED = "member_rejected"
+MEMBER_LEFT = "member_left"
+MEMBER_REMOVED = "member_removed"
+
+EventHandler = Callable[[dict], None]
+
+_subscribers: dict[str, list[str]] = {}
+# Imported on first emit so scripts and jobs that never import app.main still
+# reach the handlers; it imports crud, which imports this module.
+_HANDLER_MODULE = "app.core.event_handlers"
+_unhandled_events: set[str] = set()
+
+
+def subscribe(event: str) -> Callable[[EventHandler], EventHandler]:
+    """Register a handler that runs on the background job queue for ``event``.
+
+    Each handler is its own job, so a failing handler is retried (and logged)
+    without re-running the others. Handlers receive the JSON payload passed to
+    ``emit`` and must open their own database session.
+    """
+
+    def register(func: EventHandler) -> EventHandler:
+        job_name = f"events.{event}.{func.__module__}.{func.__qualname__}"
+        job_queue.handler(job_name)(func)
+        names = _subscribers.setdefault(event, [])
+        if job_name not in names:
+            names.append(job_name)
+        return func
+
+    return register
+
+
+def emit(event: str, **payload) -> None:
+    """Queue every handler subscribed to ``event``. Call after the commit."""
+    importlib.import_module(_HANDLER_MODULE)
+    job_names = _subscribers.get(event)
+    if not job_names:
+        # Once per event and process: some events have no handlers yet.
+        if event not in _unhandled_events:
+            _unhandled_events.add(event)
+            logger.warning("event_without_subscribers event=%s", event)
+        return
+    for job_name in job_names:
+        job_queue.enqueue(job_name, payload)
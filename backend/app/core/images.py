@@ -0,0 +1,319 @@
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from PIL import Image, ImageOps
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.orm import Session
+
+from app.core.blob_store import create_media_blob
+from app.core.config import settings
+from app.core.storage import (
+    supabase_public_storage_enabled,
+    supabase_storage_enabled,
+    upload_many_bytes_to_supabase,
+)
+
+try:  # AVIF encoding needs the optional pillow-avif-plugin on Pillow < 11.
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+IMAGE_PROCESSING_SECONDS = Histogram(
+    "splendoura_image_processing_seconds",
+    "Image transform latency in seconds, including time queued for a pool worker.",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+IMAGE_PROCESSING_IN_FLIGHT = Gauge(
+    "splendoura_image_processing_in_flight",
+    "Image transforms submitted to the process pool and not yet finished.",
+    multiprocess_mode="livesum",
+)
+IMAGE_PROCESSING_REJECTED_TOTAL = Counter(
+    "splendoura_image_processing_rejected_total",
+    "Image transforms rejected because the pool was saturated or timed out.",
+    ["reason"],
+)
+
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "avif": ("AVIF", "image/avif", ".avif"),
+}
+
+
+@dataclass(frozen=True)
+class ImageDerivative:
+    size: str
+    format: str
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    data: bytes
+
+
+def _image_sizes() -> dict[str, int]:
+    return {
+        "full": settings.IMAGE_FULL_SIZE,
+        "medium": settings.SUPABASE_PUBLIC_THUMBNAIL_MAX_SIZE,
+        "thumb": settings.IMAGE_THUMB_SIZE,
+    }
+
+
+def _output_formats() -> list[str]:
+    """JPEG plus any configured extra formats this Pillow build can encode."""
+    Image.init()
+    saveable = set(Image.SAVE)
+    formats = ["jpeg"]
+    for name in (settings.IMAGE_DERIVATIVE_FORMATS or "").split(","):
+        name = name.strip().lower()
+        if name in _FORMATS and name not in formats and _FORMATS[name][0] in saveable:
+            formats.append(name)
+    return formats
+
+
+def _encode(image: Image.Image, fmt: str, *, quality: int) -> bytes:
+    pil_format = _FORMATS[fmt][0]
+    out = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(out, format=pil_format, quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        image.save(out, format=pil_format, quality=quality, method=4)
+    else:
+        image.save(out, format=pil_format, quality=quality)
+    return out.getvalue()
+
+
+def _cover_crop(image: Image.Image, target: int) -> Image.Image:
+    width, height = image.size
+    scale = max(target / width, target / height)
+    resized_width = max(target, int(round(width * scale)))
+    resized_height = max(target, int(round(height * scale)))
+    image = image.resize((resized_width, resized_height), Image.LANCZOS)
+    left = max((resized_width - target) // 2, 0)
+    # Keep the top of the image and crop overflow from the bottom.
+    return image.crop((left, 0, left + target, target))
+
+
+def build_image_derivatives(
+    image_bytes: bytes,
+    *,
+    square: bool = False,
+    full_size: int | None = None,
+) -> list[ImageDerivative]:
+    """Decode once and produce every size in every output format.
+
+    ``square`` crops to squares (group covers and media, matching
+    ``normalize_group_image_bytes``); otherwise images are fit within each
+    size, which normalizes raw camera uploads. Each size is downscaled from
+    the previous one, and JPEG sources are decoded at reduced scale via
+    ``Image.draft`` when they are much larger than the full size.
+    """
+    sizes = _image_sizes()
+    if full_size:
+        sizes["full"] = full_size
+    full_size = sizes["full"]
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            width, height = source.size
+            if width <= 0 or height <= 0:
+                raise ValueError("invalid image dimensions")
+            if square:
+                requested = (full_size, full_size)
+            else:
+                longest = max(width, height)
+                requested = (
+                    max(1, width * full_size // longest),
+                    max(1, height * full_size // longest),
+                )
+            source.draft("RGB", requested)
+            image = ImageOps.exif_transpose(source).convert("RGB")
+    except Exception as exc:
+        raise ValueError("invalid image bytes") from exc
+
+    formats = _output_formats()
+    derivatives: list[ImageDerivative] = []
+    for size_name in ("full", "medium", "thumb"):
+        target = sizes[size_name]
+        if square:
+            image = _cover_crop(image, target) if image.size != (target, target) else image
+        else:
+            image = image.copy()
+            image.thumbnail((target, target), Image.LANCZOS)
+        quality = 88 if size_name == "full" else 82
+        for fmt in formats:
+            _, content_type, extension = _FORMATS[fmt]
+            derivatives.append(
+                ImageDerivative(
+                    size=size_name,
+                    format=fmt,
+                    content_type=content_type,
+                    extension=extension,
+                    width=image.width,
+                    height=image.height,
+                    data=_encode(image, fmt, quality=quality),
+                )
+            )
+    return derivatives
+
+
+class ImageProcessingBusyError(RuntimeError):
+    """Raised when the image pool is saturated; endpoints answer 503."""
+
+
+class ImageProcessingPool:
+    """Bounded process pool for CPU-heavy Pillow work.
+
+    Decoding, resizing and encoding run in separate processes so they neither
+    hold the GIL nor tie up the threadpool slots sync endpoints share. At
+    most ``max_pending`` transforms may be queued or running per web worker;
+    beyond that ``run`` fails fast instead of letting uploads pile up.
+    """
+
+    def __init__(self, *, workers: int = 2, max_pending: int = 8, timeout_seconds: float = 30.0) -> None:
+        self._workers = max(1, workers)
+        self._max_pending = max(1, max_pending)
+        self._timeout = timeout_seconds
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    def stop(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future: Future | None = None) -> None:
+        IMAGE_PROCESSING_IN_FLIGHT.dec()
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, func: Callable[..., Any], *args: Any, operation: str, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                IMAGE_PROCESSING_REJECTED_TOTAL.labels(reason="saturated").inc()
+                raise ImageProcessingBusyError("image processing queue is full")
+            self._pending += 1
+        IMAGE_PROCESSING_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            if self._pool is None:
+                self.start()
+            future = self._pool.submit(func, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is held until the job itself finishes: a job that is already
+        # running cannot be cancelled and keeps its process busy past a timeout.
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self._timeout)
+        except FutureTimeoutError as exc:
+            future.cancel()
+            IMAGE_PROCESSING_REJECTED_TOTAL.labels(reason="timeout").inc()
+            raise ImageProcessingBusyError("image processing timed out") from exc
+        finally:
+            IMAGE_PROCESSING_SECONDS.labels(operation=operation).observe(time.perf_counter() - started)
+
+
+image_processing_pool = ImageProcessingPool(
+    workers=settings.IMAGE_PROCESSING_WORKERS,
+    max_pending=settings.IMAGE_PROCESSING_MAX_PENDING,
+    timeout_seconds=settings.IMAGE_PROCESSING_TIMEOUT_SECONDS,
+)
+
+
+def process_image_derivatives(
+    image_bytes: bytes,
+    *,
+    square: bool = False,
+    full_size: int | None = None,
+) -> list[ImageDerivative]:
+    """``build_image_derivatives`` on the image process pool."""
+    return image_processing_pool.run(
+        build_image_derivatives,
+        image_bytes,
+        square=square,
+        full_size=full_size,
+        operation="derivatives",
+    )
+
+
+def store_image_derivatives(
+    db: Session,
+    *,
+    prefix: str,
+    stem: str,
+    derivatives: list[ImageDerivative],
+    created_by: int | None,
+) -> dict:
+    """Upload derivatives and return variants as ``{size: {format: url, width, height}}``.
+
+    Uses the public bucket when configured, then the private bucket, then
+    ``MediaBlob`` rows.
+    """
+    if supabase_public_storage_enabled() or supabase_storage_enabled():
+        public = supabase_public_storage_enabled()
+        urls = upload_many_bytes_to_supabase(
+            [
+                {
+                    "prefix": f"{prefix}/{item.size}" if item.size != "full" else prefix,
+                    "filename": f"{stem}{item.extension}",
+                    "content_type": item.content_type,
+                    "data": item.data,
+                }
+                for item in derivatives
+            ],
+            bucket=settings.SUPABASE_PUBLIC_STORAGE_BUCKET if public else None,
+            public=public,
+            cache_control=settings.SUPABASE_PUBLIC_STORAGE_CACHE_CONTROL if public else None,
+        )
+    else:
+        urls = []
+        for item in derivatives:
+            blob = create_media_blob(
+                db,
+                content_type=item.content_type,
+                filename=f"{stem}{item.extension}",
+                data=item.data,
+                created_by=created_by,
+            )
+            urls.append(f"/api/v1/media/{blob.id}")
+
+    variants: dict[str, dict] = {}
+    for item, url in zip(derivatives, urls):
+        entry = variants.setdefault(item.size, {"width": item.width, "height": item.height})
+        entry[item.format] = url
+    return variants
+
+
+def pick_image_url(
+    variants: dict | None,
+    size: str,
+    *,
+    fallback: str | None = None,
+    image_format: str = "jpeg",
+) -> str | None:
+    """Return the URL for ``size`` (and format, falling back to JPEG) if recorded."""
+    if not isinstance(variants, dict):
+        return fallback
+    entry = variants.get(size)
+    if not isinstance(entry, dict):
+        return fallback
+    return entry.get(image_format) or entry.get("jpeg") or fallback
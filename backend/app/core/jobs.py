@@ -0,0 +1,232 @@
+import asyncio
+import inspect
+import json
+import logging
+from typing import Any, Callable
+
+import redis
+import redis.asyncio as redis_async
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Any]
+
+
+class JobQueue:
+    """Background job queue drained by worker tasks on the app event loop.
+
+    Jobs are plain JSON payloads dispatched to handlers registered by name.
+    The default backend is an in-process ``asyncio.Queue``; with
+    ``JOB_QUEUE_BACKEND=redis`` jobs are pushed to a Redis list so any worker
+    process can pick them up. Sync handlers run in a thread, async handlers
+    run on the loop. A job that raises is retried with backoff; once its last
+    attempt fails, the ``failure_handler`` registered for it (if any) runs
+    with the same payload.
+    """
+
+    def __init__(
+        self,
+        *,
+        backend: str = "memory",
+        redis_url: str | None = None,
+        workers: int = 2,
+        max_attempts: int = 3,
+    ) -> None:
+        self._backend = backend
+        self._redis_url = redis_url
+        self._workers = max(1, workers)
+        self._max_attempts = max(1, max_attempts)
+        self._handlers: dict[str, JobHandler] = {}
+        self._failure_handlers: dict[str, JobHandler] = {}
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+        self._redis_sync: redis.Redis | None = None
+        self._redis: redis_async.Redis | None = None
+        self._redis_key = "jobs:queue"
+
+    @property
+    def _use_redis(self) -> bool:
+        return self._backend == "redis" and bool(self._redis_url)
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._queue is not None
+
+    def handler(self, name: str) -> Callable[[JobHandler], JobHandler]:
+        def register(func: JobHandler) -> JobHandler:
+            self._handlers[name] = func
+            return func
+
+        return register
+
+    def failure_handler(self, name: str) -> Callable[[JobHandler], JobHandler]:
+        def register(func: JobHandler) -> JobHandler:
+            self._failure_handlers[name] = func
+            return func
+
+        return register
+
+    def _get_sync_redis(self) -> redis.Redis:
+        if self._redis_sync is None:
+            self._redis_sync = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._redis_sync
+
+    def enqueue(self, name: str, payload: dict, *, attempt: int = 1) -> None:
+        """Queue a job. Safe to call from sync endpoints running in a threadpool."""
+        job = {"name": name, "payload": payload, "attempt": attempt}
+        if self._use_redis:
+            try:
+                self._get_sync_redis().rpush(self._redis_key, json.dumps(job, default=str))
+                return
+            except Exception:
+                logger.exception("job_enqueue_redis_failed name=%s", name)
+        if not self.running or self._loop.is_closed():
+            self._run_inline(job)
+            return
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        if current_loop is self._loop:
+            self._queue.put_nowait(job)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+
+    def _run_inline(self, job: dict) -> None:
+        handler = self._handlers.get(job["name"])
+        if handler is None:
+            logger.warning("job_handler_missing name=%s", job["name"])
+            return
+        try:
+            result = handler(job["payload"])
+            if inspect.isawaitable(result):
+                asyncio.run(result)
+        except Exception:
+            logger.exception("job_failed name=%s inline=true", job["name"])
+            self._run_failure_inline(job)
+
+    def _run_failure_inline(self, job: dict) -> None:
+        failure_handler = self._failure_handlers.get(job["name"])
+        if failure_handler is None:
+            return
+        try:
+            result = failure_handler(job["payload"])
+            if inspect.isawaitable(result):
+                asyncio.run(result)
+        except Exception:
+            logger.exception("job_failure_handler_failed name=%s inline=true", job["name"])
+
+    async def _call(self, handler: JobHandler, payload: dict) -> None:
+        if inspect.iscoroutinefunction(handler):
+            await handler(payload)
+        else:
+            await asyncio.to_thread(handler, payload)
+
+    async def _run_failure(self, name: str, payload: dict) -> None:
+        failure_handler = self._failure_handlers.get(name)
+        if failure_handler is None:
+            return
+        try:
+            await self._call(failure_handler, payload)
+        except Exception:
+            logger.exception("job_failure_handler_failed name=%s", name)
+
+    async def _run(self, job: dict) -> None:
+        name = job.get("name")
+        handler = self._handlers.get(name)
+        if handler is None:
+            logger.warning("job_handler_missing name=%s", name)
+            return
+        try:
+            await self._call(handler, job.get("payload") or {})
+        except Exception:
+            attempt = int(job.get("attempt") or 1)
+            if attempt >= self._max_attempts:
+                logger.exception("job_failed name=%s attempt=%s", name, attempt)
+                await self._run_failure(name, job.get("payload") or {})
+                return
+            logger.warning("job_retry name=%s attempt=%s", name, attempt)
+            retry = asyncio.create_task(
+                self._retry_later(name, job.get("payload") or {}, attempt=attempt + 1, delay=min(2 ** attempt, 30))
+            )
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, name: str, payload: dict, *, attempt: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if self._use_redis:
+            # enqueue pushes with the sync Redis client; keep that off the loop.
+            await asyncio.to_thread(self.enqueue, name, payload, attempt=attempt)
+        else:
+            self.enqueue(name, payload, attempt=attempt)
+
+    async def _memory_worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _redis_worker(self) -> None:
+        while True:
+            try:
+                if self._redis is None:
+                    self._redis = redis_async.from_url(self._redis_url, decode_responses=True)
+                item = await self._redis.blpop(self._redis_key, timeout=1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job_redis_poll_failed")
+                await asyncio.sleep(1)
+                continue
+            if not item:
+                continue
+            try:
+                job = json.loads(item[1])
+            except (TypeError, json.JSONDecodeError):
+                continue
+            await self._run(job)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for _ in range(self._workers):
+            self._tasks.append(asyncio.create_task(self._memory_worker()))
+            if self._use_redis:
+                self._tasks.append(asyncio.create_task(self._redis_worker()))
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("job_queue_stop_timeout pending=%s", self._queue.qsize())
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks.clear()
+        self._retries.clear()
+        self._queue = None
+        self._loop = None
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
+
+
+job_queue = JobQueue(
+    backend=settings.JOB_QUEUE_BACKEND,
+    redis_url=settings.REDIS_URL,
+    workers=settings.JOB_QUEUE_WORKERS,
+    max_attempts=settings.JOB_QUEUE_MAX_ATTEMPTS,
+)
@@ -0,0 +1,468 @@
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+import redis
+from PIL import Image
+from prometheus_client import Counter, Histogram
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODERATION_INFERENCE_SECONDS = Histogram(
+    "splendoura_moderation_inference_seconds",
+    "NudeNet batch inference latency in seconds, measured from the web worker.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+MODERATION_BATCH_SIZE = Histogram(
+    "splendoura_moderation_batch_size",
+    "Number of images per moderation inference batch.",
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+MODERATION_FALLBACK_TOTAL = Counter(
+    "splendoura_moderation_fallback_total",
+    "Images moderated with the skin-tone heuristic instead of NudeNet.",
+    ["reason"],
+)
+MODERATION_CACHE_TOTAL = Counter(
+    "splendoura_moderation_cache_total",
+    "Moderation cache lookups by result (exact, similar, miss).",
+    ["result"],
+)
+
+EXPLICIT_LABELS = {
+    "exposed_anus",
+    "exposed_breast_f",
+    "exposed_breast_m",
+    "exposed_buttocks",
+    "exposed_genitalia_f",
+    "exposed_genitalia_m",
+    "exposed_torso",
+}
+
+# Per-process detector, created by the pool initializer.
+_worker_detector = None
+
+
+def _init_worker() -> None:
+    global _worker_detector
+    from nudenet import NudeDetector
+
+    _worker_detector = NudeDetector()
+
+
+def _warmup() -> bool:
+    return _worker_detector is not None
+
+
+def _decode_bgr(image_bytes: bytes):
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        rgb = np.asarray(image.convert("RGB"))
+    # NudeNet expects OpenCV channel order.
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+def _detect_batch(images: list[bytes]) -> list[list[dict] | None]:
+    """Run NudeNet on in-memory images inside a pool process."""
+    decoded: list = []
+    positions: list[int] = []
+    results: list[list[dict] | None] = [None] * len(images)
+    for index, image_bytes in enumerate(images):
+        try:
+            decoded.append(_decode_bgr(image_bytes))
+            positions.append(index)
+        except Exception:
+            continue
+    if not decoded:
+        return results
+    detections = _worker_detector.detect_batch(decoded, batch_size=len(decoded))
+    for index, items in zip(positions, detections):
+        results[index] = items
+    return results
+
+
+def _estimate_nudity_score_bytes(image_bytes: bytes) -> float:
+    """Fraction of skin-tone pixels in a 96x96 thumbnail."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        image.thumbnail((96, 96))
+        pixels = np.asarray(image, dtype=np.int16).reshape(-1, 3)
+        if not pixels.size:
+            return 0.0
+        r, g, b = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+        spread = pixels.max(axis=1) - pixels.min(axis=1)
+        mask = (
+            (r > 95)
+            & (g > 40)
+            & (b > 20)
+            & (spread > 15)
+            & (np.abs(r - g) > 15)
+            & (r > g)
+            & (r > b)
+        )
+        return int(np.count_nonzero(mask)) / len(pixels)
+    except Exception:
+        return 0.0
+
+
+def _summarize_detections(items: list[dict]) -> dict:
+    threshold = float(getattr(settings, "NUDITY_MIN_CONFIDENCE", 0.35))
+    if threshold > 1:
+        threshold = threshold / 100.0
+    max_score = 0.0
+    is_explicit = False
+    for item in items or []:
+        label = (item.get("class") or "").lower()
+        score = float(item.get("score") or 0.0)
+        max_score = max(max_score, score)
+        if label in EXPLICIT_LABELS and score >= threshold:
+            is_explicit = True
+    return {
+        "contains_nudity": is_explicit,
+        "score": round(max_score, 3),
+        "provider": "nudenet",
+    }
+
+
+class ModerationService:
+    """Image moderation backed by a process pool with NudeNet preloaded.
+
+    Callers block on ``detect`` from worker threads. Concurrent requests are
+    collected for up to ``batch_window_ms`` into a single ``detect_batch``
+    call so the model runs once per batch instead of once per image. Up to
+    ``workers`` batches are in flight at once; each resolves its callers from
+    a done callback, so a slow batch only holds its own pool slot.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 1,
+        batch_size: int = 8,
+        batch_window_ms: int = 25,
+        timeout_seconds: float = 10.0,
+    ) -> None:
+        self._workers = max(1, workers)
+        self._batch_size = max(1, batch_size)
+        self._batch_window = max(batch_window_ms, 0) / 1000.0
+        self._timeout = timeout_seconds
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: queue.Queue[tuple[bytes, Future]] = queue.Queue()
+        self._batcher: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self._workers)
+
+    @property
+    def enabled(self) -> bool:
+        provider = getattr(settings, "NUDITY_PROVIDER", "nudenet")
+        return provider in {"nudenet", "open_source"}
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            # Spin up every worker now so the model is loaded before the first upload.
+            for _ in range(self._workers):
+                self._pool.submit(_warmup)
+            self._batcher = threading.Thread(
+                target=self._run_batcher, name="moderation-batcher", daemon=True
+            )
+            self._batcher.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            self._pending.put((b"", Future()))
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _collect_batch(self) -> list[tuple[bytes, Future]]:
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self._batch_window
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Callers that already timed out cancelled their future; skip their images.
+        return [(image_bytes, future) for image_bytes, future in batch if future.set_running_or_notify_cancel()]
+
+    def _finish_batch(self, batch: list[tuple[bytes, Future]], started: float, job: Future) -> None:
+        self._slots.release()
+        MODERATION_INFERENCE_SECONDS.observe(time.perf_counter() - started)
+        try:
+            results = job.result()
+        except BaseException as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), items in zip(batch, results):
+            if not future.done():
+                future.set_result(items)
+
+    def _run_batcher(self) -> None:
+        while True:
+            # Wait for a free pool worker first, so images keep queueing into
+            # the next batch while every worker is busy.
+            self._slots.acquire()
+            batch = self._collect_batch()
+            pool = self._pool
+            if pool is None:
+                self._slots.release()
+                for _, future in batch:
+                    future.set_exception(RuntimeError("moderation service stopped"))
+                return
+            if not batch:
+                self._slots.release()
+                continue
+            MODERATION_BATCH_SIZE.observe(len(batch))
+            started = time.perf_counter()
+            try:
+                job = pool.submit(_detect_batch, [image_bytes for image_bytes, _ in batch])
+            except Exception as exc:
+                self._slots.release()
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            job.add_done_callback(
+                lambda job, batch=batch, started=started: self._finish_batch(batch, started, job)
+            )
+
+    def detect(self, image_bytes: bytes) -> dict | None:
+        """Return a NudeNet verdict, or ``None`` if inference is unavailable or too slow."""
+        if not self.enabled:
+            return None
+        if self._pool is None:
+            self.start()
+        future: Future = Future()
+        self._pending.put((image_bytes, future))
+        try:
+            items = future.result(timeout=self._timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            MODERATION_FALLBACK_TOTAL.labels(reason="timeout").inc()
+            return None
+        except Exception:
+            logger.exception("moderation_inference_failed")
+            MODERATION_FALLBACK_TOTAL.labels(reason="error").inc()
+            return None
+        if items is None:
+            MODERATION_FALLBACK_TOTAL.labels(reason="decode").inc()
+            return None
+        return _summarize_detections(items)
+
+
+def perceptual_hash(image_bytes: bytes) -> int | None:
+    """64-bit difference hash; near-duplicate images differ in only a few bits."""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            gray = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+        pixels = np.asarray(gray, dtype=np.int16)
+    except Exception:
+        return None
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+class ModerationCache:
+    """Moderation verdicts keyed by SHA-256 and by perceptual hash.
+
+    Exact re-sends hit on the digest. Near-duplicates (re-encoded or resized
+    forwards) are found by splitting the 64-bit hash into four 16-bit bands:
+    any hash within ``max_distance <= 3`` bits of a stored one shares at least
+    one band with it, so only those candidates are compared. Entries live in
+    Redis with a TTL when ``REDIS_URL`` is set, otherwise in a bounded
+    in-process LRU.
+    """
+
+    _BANDS = 4
+
+    def __init__(
+        self,
+        *,
+        redis_url: str | None = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_entries: int = 10000,
+        max_distance: int = 3,
+    ) -> None:
+        self._redis_url = redis_url
+        self._redis: redis.Redis | None = None
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._max_distance = max_distance
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._bands: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _namespace(self) -> str:
+        # Verdicts depend on the confidence threshold, so changing it starts a fresh cache.
+        return f"moderation:{float(settings.NUDITY_MIN_CONFIDENCE)}"
+
+    def _band_keys(self, phash: int) -> list[str]:
+        return [
+            f"{self._namespace}:band:{index}:{(phash >> (16 * index)) & 0xFFFF:04x}"
+            for index in range(self._BANDS)
+        ]
+
+    def _get_redis(self) -> redis.Redis | None:
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._redis
+
+    def _memory_get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, verdict = entry
+            if expires_at < time.time():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return verdict
+
+    def _memory_set(self, keys: list[str], verdict: dict, phash: int | None) -> None:
+        expires_at = time.time() + self._ttl
+        with self._lock:
+            for key in keys:
+                self._entries[key] = (expires_at, verdict)
+                self._entries.move_to_end(key)
+            if phash is not None:
+                for band_key in self._band_keys(phash):
+                    self._bands.setdefault(band_key, set()).add(phash)
+            while len(self._entries) > self._max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if ":phash:" in evicted:
+                    evicted_hash = int(evicted.rsplit(":", 1)[1], 16)
+                    for band_key in self._band_keys(evicted_hash):
+                        self._bands.get(band_key, set()).discard(evicted_hash)
+
+    def _similar_candidates(self, client: redis.Redis | None, phash: int) -> set[int]:
+        band_keys = self._band_keys(phash)
+        if client is not None:
+            pipe = client.pipeline()
+            for band_key in band_keys:
+                pipe.smembers(band_key)
+            return {int(value, 16) for members in pipe.execute() for value in members}
+        with self._lock:
+            return set().union(*(self._bands.get(band_key, set()) for band_key in band_keys))
+
+    def get(self, digest: str, phash: int | None) -> dict | None:
+        try:
+            client = self._get_redis()
+        except Exception:
+            client = None
+        try:
+            verdict = self._lookup(client, digest, phash)
+        except Exception:
+            logger.exception("moderation_cache_lookup_failed")
+            verdict = None
+        if verdict is None:
+            MODERATION_CACHE_TOTAL.labels(result="miss").inc()
+        return verdict
+
+    def _read(self, client: redis.Redis | None, key: str) -> dict | None:
+        if client is None:
+            return self._memory_get(key)
+        raw = client.get(key)
+        return json.loads(raw) if raw else None
+
+    def _lookup(self, client: redis.Redis | None, digest: str, phash: int | None) -> dict | None:
+        verdict = self._read(client, f"{self._namespace}:sha:{digest}")
+        if verdict is not None:
+            MODERATION_CACHE_TOTAL.labels(result="exact").inc()
+            return verdict
+        if phash is None:
+            return None
+        candidates = sorted(
+            self._similar_candidates(client, phash), key=lambda value: bin(value ^ phash).count("1")
+        )
+        for candidate in candidates:
+            if bin(candidate ^ phash).count("1") > self._max_distance:
+                break
+            verdict = self._read(client, f"{self._namespace}:phash:{candidate:016x}")
+            if verdict is not None:
+                MODERATION_CACHE_TOTAL.labels(result="similar").inc()
+                return verdict
+        return None
+
+    def set(self, digest: str, phash: int | None, verdict: dict) -> None:
+        keys = [f"{self._namespace}:sha:{digest}"]
+        if phash is not None:
+            keys.append(f"{self._namespace}:phash:{phash:016x}")
+        try:
+            client = self._get_redis()
+            if client is None:
+                self._memory_set(keys, verdict, phash)
+                return
+            payload = json.dumps(verdict)
+            pipe = client.pipeline()
+            for key in keys:
+                pipe.set(key, payload, ex=self._ttl)
+            if phash is not None:
+                for band_key in self._band_keys(phash):
+                    pipe.sadd(band_key, f"{phash:016x}")
+                    pipe.expire(band_key, self._ttl)
+            pipe.execute()
+        except Exception:
+            logger.exception("moderation_cache_store_failed")
+
+
+moderation_service = ModerationService(
+    workers=settings.MODERATION_POOL_WORKERS,
+    batch_size=settings.MODERATION_BATCH_SIZE,
+    batch_window_ms=settings.MODERATION_BATCH_WINDOW_MS,
+    timeout_seconds=settings.MODERATION_TIMEOUT_SECONDS,
+)
+
+
+moderation_cache = ModerationCache(
+    redis_url=settings.REDIS_URL,
+    ttl_seconds=settings.MODERATION_CACHE_TTL_SECONDS,
+    max_entries=settings.MODERATION_CACHE_MAX_ENTRIES,
+    max_distance=settings.MODERATION_PHASH_MAX_DISTANCE,
+)
+
+
+def moderate_image(image_bytes: bytes) -> dict:
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    phash = perceptual_hash(image_bytes)
+    cached = moderation_cache.get(digest, phash)
+    if cached is not None:
+        return cached
+    detection = moderation_service.detect(image_bytes)
+    if detection is not None:
+        # Heuristic fallbacks are not cached so a later retry can still reach NudeNet.
+        moderation_cache.set(digest, phash, detection)
+        return detection
+    score = _estimate_nudity_score_bytes(image_bytes)
+    return {
+        "contains_nudity": score >= 0.35,
+        "score": round(score, 3),
+        "provider": "heuristic",
+    }
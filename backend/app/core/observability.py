@@ -1,20 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
 import random
 import time
 import uuid
+from collections import deque
 from datetime import datetime, timedelta, timezone
 
 from fastapi import FastAPI, Request, Response
 from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
 from prometheus_client import multiprocess
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
+from app.core.analytics import prune_request_rollups, record_request_rollups
 from app.core.config import settings
+from app.core.partitions import drop_partitions_before, ensure_daily_partitions, is_partitioned
+from app.core.query_stats import (
+    end_request_query_stats,
+    install_query_instrumentation,
+    start_request_query_stats,
+)
 from app.core.request_meta import get_client_ip, get_request_id
-from app.db.session import SessionLocal
+from app.core.scheduler import scheduler
+from app.db.session import SessionLocal, engine
 from app.models.request_event import RequestEvent
 
 logger = logging.getLogger("app.request")
@@ -35,8 +47,38 @@ HTTP_REQUESTS_IN_PROGRESS = Gauge(
     "Current number of requests being processed.",
     multiprocess_mode="livesum",
 )
-
-_request_event_store_enabled = True
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "splendoura_http_request_db_queries",
+    "Database statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "splendoura_http_request_db_seconds",
+    "Total database time per HTTP request in seconds.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+HTTP_REQUEST_DB_ROWS = Histogram(
+    "splendoura_http_request_db_rows",
+    "Rows returned or affected by database statements per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+REQUEST_EVENTS_WRITTEN_TOTAL = Counter(
+    "splendoura_request_events_written_total",
+    "Request events written to the request_events table.",
+)
+REQUEST_EVENTS_DROPPED_TOTAL = Counter(
+    "splendoura_request_events_dropped_total",
+    "Request events discarded before being stored.",
+    ["reason"],
+)
+REQUEST_EVENT_FLUSH_SECONDS = Histogram(
+    "splendoura_request_event_flush_seconds",
+    "Time to write one batch of request events.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
 
 
 def _truncate(value: str | None, limit: int) -> str | None:
@@ -96,36 +138,192 @@ def _should_store_request_event(path: str) -> bool:
     return _sample_request_event()
 
 
-def _store_request_event(payload: dict[str, object]) -> None:
-    global _request_event_store_enabled
-    if not _request_event_store_enabled:
-        return
+def _request_event_row(payload: dict[str, object], created_at: datetime) -> dict[str, object]:
+    return {
+        "request_id": payload.get("request_id"),
+        "method": payload["method"],
+        "path": payload["path"],
+        "route": payload.get("route"),
+        "status_code": payload["status_code"],
+        "duration_ms": payload["duration_ms"],
+        "client_ip": payload.get("client_ip"),
+        "user_id": payload.get("user_id"),
+        "user_agent": payload.get("user_agent"),
+        "referer": payload.get("referer"),
+        "query_string": payload.get("query_string"),
+        "is_error": payload["is_error"],
+        "created_at": created_at,
+    }
+
+
+def _write_request_events(rows: list[dict[str, object]]) -> None:
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        # One executemany; SQLAlchemy renders it as batched multi-row
+        # INSERT ... VALUES statements.
+        db.execute(insert(RequestEvent.__table__), rows)
+        if settings.REQUEST_ANALYTICS_ROLLUPS_ENABLED:
+            record_request_rollups(db, rows)
+        db.commit()
+    REQUEST_EVENT_FLUSH_SECONDS.observe(time.perf_counter() - started)
+    REQUEST_EVENTS_WRITTEN_TOTAL.inc(len(rows))
+
+
+class RequestEventBuffer:
+    """Bounded in-memory buffer of request events, written in batches.
+
+    ``add`` is called from the middleware on the event loop and never touches
+    the database: it appends to a ring buffer and, once the buffer is full,
+    drops the oldest event. A task on the same loop drains up to
+    ``batch_size`` rows every flush interval (or as soon as a full batch is
+    waiting) and writes each batch with one INSERT in a worker thread.
+    Failed batches are dropped and counted rather than retried, so a database
+    outage cannot grow memory or back-pressure requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 1.0,
+    ) -> None:
+        self._events: deque[dict[str, object]] = deque()
+        self._max_size = max(1, max_size)
+        self._batch_size = max(1, batch_size)
+        self._interval = flush_interval_seconds
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._consecutive_failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def add(self, row: dict[str, object]) -> None:
+        if len(self._events) >= self._max_size:
+            self._events.popleft()
+            REQUEST_EVENTS_DROPPED_TOTAL.labels(reason="buffer_full").inc()
+        self._events.append(row)
+        if self._wakeup is not None and len(self._events) >= self._batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._wakeup = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        while self._events:
+            count = min(len(self._events), self._batch_size)
+            batch = [self._events.popleft() for _ in range(count)]
+            await self._write(batch)
 
-    try:
-        with SessionLocal() as db:
-            db.add(
-                RequestEvent(
-                    request_id=payload.get("request_id"),  # type: ignore[arg-type]
-                    method=payload["method"],  # type: ignore[arg-type]
-                    path=payload["path"],  # type: ignore[arg-type]
-                    route=payload.get("route"),  # type: ignore[arg-type]
-                    status_code=payload["status_code"],  # type: ignore[arg-type]
-                    duration_ms=payload["duration_ms"],  # type: ignore[arg-type]
-                    client_ip=payload.get("client_ip"),  # type: ignore[arg-type]
-                    user_id=payload.get("user_id"),  # type: ignore[arg-type]
-                    user_agent=payload.get("user_agent"),  # type: ignore[arg-type]
-                    referer=payload.get("referer"),  # type: ignore[arg-type]
-                    query_string=payload.get("query_string"),  # type: ignore[arg-type]
-                    is_error=payload["is_error"],  # type: ignore[arg-type]
+    async def _write(self, batch: list[dict[str, object]]) -> None:
+        try:
+            await asyncio.to_thread(_write_request_events, batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            REQUEST_EVENTS_DROPPED_TOTAL.labels(reason="write_error").inc(len(batch))
+            self._consecutive_failures += 1
+            if self._consecutive_failures == 1:
+                logger.exception("request_event_flush_failed rows=%s", len(batch))
+            else:
+                logger.warning(
+                    "request_event_flush_failed rows=%s consecutive=%s",
+                    len(batch),
+                    self._consecutive_failures,
                 )
+            return
+        self._consecutive_failures = 0
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+request_event_buffer = RequestEventBuffer(
+    max_size=settings.REQUEST_ANALYTICS_BUFFER_SIZE,
+    batch_size=settings.REQUEST_ANALYTICS_FLUSH_BATCH_SIZE,
+    flush_interval_seconds=settings.REQUEST_ANALYTICS_FLUSH_INTERVAL_MS / 1000,
+)
+
+
+def _delete_request_events_before(db: Session, cutoff: datetime, batch_size: int = 10000) -> int:
+    """Retention for an unpartitioned table: short DELETE transactions instead of one long one."""
+    deleted = 0
+    while True:
+        expired_ids = (
+            db.query(RequestEvent.id).filter(RequestEvent.created_at < cutoff).limit(batch_size).scalar_subquery()
+        )
+        count = db.query(RequestEvent).filter(RequestEvent.id.in_(expired_ids)).delete(synchronize_session=False)
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+@scheduler.periodic(
+    "request_events_maintenance",
+    interval_seconds=settings.REQUEST_ANALYTICS_MAINTENANCE_INTERVAL_SECONDS,
+)
+def maintain_request_events() -> None:
+    """Create upcoming request_events partitions and apply retention to events and rollups."""
+    if not settings.REQUEST_ANALYTICS_ENABLED:
+        return
+    now = datetime.now(timezone.utc)
+    retention_days = settings.REQUEST_ANALYTICS_RETENTION_DAYS
+    table = RequestEvent.__tablename__
+    with SessionLocal() as db:
+        if is_partitioned(db, table):
+            created = ensure_daily_partitions(
+                db, table, start=now.date(), days=settings.REQUEST_ANALYTICS_PARTITION_PREMAKE_DAYS + 1
             )
+            dropped: list[str] = []
+            if retention_days > 0:
+                dropped = drop_partitions_before(db, table, now - timedelta(days=retention_days))
             db.commit()
-    except Exception:
-        _request_event_store_enabled = False
-        logger.exception("request_event_storage_disabled_after_failure")
+            if created or dropped:
+                logger.info(
+                    "request_event_partitions_maintained created=%s dropped=%s",
+                    ",".join(created) or "-",
+                    ",".join(dropped) or "-",
+                )
+        elif retention_days > 0:
+            deleted = _delete_request_events_before(db, now - timedelta(days=retention_days))
+            if deleted:
+                logger.info("request_events_pruned rows=%s", deleted)
+        prune_request_rollups(
+            db,
+            now=now,
+            minute_retention=timedelta(hours=settings.REQUEST_ANALYTICS_MINUTE_ROLLUP_RETENTION_HOURS),
+            hour_retention=timedelta(days=settings.REQUEST_ANALYTICS_ROLLUP_RETENTION_DAYS),
+        )
+        db.commit()
 
 
 def register_observability(app: FastAPI) -> None:
+    install_query_instrumentation(engine)
+
     @app.middleware("http")
     async def request_observability_middleware(request: Request, call_next):
         path = request.url.path
@@ -140,6 +338,10 @@ def register_observability(app: FastAPI) -> None:
         route = path
         status_code = 500
         response: Response | None = None
+        slow_threshold_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+        query_stats, query_stats_token = start_request_query_stats(
+            max_statements=settings.SLOW_REQUEST_MAX_STATEMENTS if slow_threshold_ms else 0
+        )
         HTTP_REQUESTS_IN_PROGRESS.inc()
         try:
             response = await call_next(request)
@@ -149,6 +351,7 @@ def register_observability(app: FastAPI) -> None:
             return response
         finally:
             elapsed_seconds = max(time.perf_counter() - started, 0.0)
+            end_request_query_stats(query_stats_token)
             HTTP_REQUESTS_IN_PROGRESS.dec()
             method = request.method.upper()
             HTTP_REQUESTS_TOTAL.labels(
@@ -160,10 +363,14 @@ def register_observability(app: FastAPI) -> None:
                 method=method,
                 route=route,
             ).observe(elapsed_seconds)
+            HTTP_REQUEST_DB_QUERIES.labels(method=method, route=route).observe(query_stats.queries)
+            HTTP_REQUEST_DB_SECONDS.labels(method=method, route=route).observe(query_stats.duration_seconds)
+            HTTP_REQUEST_DB_ROWS.labels(method=method, route=route).observe(query_stats.rows)
 
             duration_ms = int(round(elapsed_seconds * 1000))
+            finished_at = datetime.now(timezone.utc)
             payload: dict[str, object] = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": finished_at.isoformat(),
                 "request_id": request_id,
                 "method": method,
                 "path": _truncate(path, 512) or path[:512],
@@ -176,11 +383,31 @@ def register_observability(app: FastAPI) -> None:
                 "referer": _truncate(request.headers.get("referer"), 512),
                 "query_string": _truncate(request.url.query, 1024),
                 "is_error": status_code >= 500,
+                "db_queries": query_stats.queries,
+                "db_time_ms": round(query_stats.duration_seconds * 1000, 2),
+                "db_rows": query_stats.rows,
             }
             logger.info(json.dumps(payload, separators=(",", ":")))
+            if slow_threshold_ms and duration_ms >= slow_threshold_ms:
+                logger.warning(
+                    json.dumps(
+                        {
+                            "event": "slow_request",
+                            "request_id": request_id,
+                            "method": method,
+                            "route": payload["route"],
+                            "duration_ms": duration_ms,
+                            "db_queries": query_stats.queries,
+                            "db_time_ms": payload["db_time_ms"],
+                            "statements_dropped": query_stats.statements_dropped,
+                            "statements": query_stats.summarize(),
+                        },
+                        separators=(",", ":"),
+                    )
+                )
 
             if _should_store_request_event(path):
-                _store_request_event(payload)
+                request_event_buffer.add(_request_event_row(payload, finished_at))
 
     @app.get("/metrics", include_in_schema=False)
     async def metrics(request: Request):
@@ -191,16 +418,9 @@ def register_observability(app: FastAPI) -> None:
         return Response(content=_metrics_payload(), media_type=CONTENT_TYPE_LATEST)
 
     @app.on_event("startup")
-    def prune_old_request_events() -> None:
-        if not settings.REQUEST_ANALYTICS_ENABLED:
-            return
-        retention_days = settings.REQUEST_ANALYTICS_RETENTION_DAYS
-        if retention_days <= 0:
-            return
-        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
-        try:
-            with SessionLocal() as db:
-                db.query(RequestEvent).filter(RequestEvent.created_at < cutoff).delete(synchronize_session=False)
-                db.commit()
-        except Exception:
-            logger.exception("request_event_retention_prune_failed")
+    async def start_request_event_buffer() -> None:
+        await request_event_buffer.start()
+
+    @app.on_event("shutdown")
+    async def stop_request_event_buffer() -> None:
+        await request_event_buffer.stop()
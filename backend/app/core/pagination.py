@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+# SQLite keeps datetimes as text in whatever form they were written:
+# ``CURRENT_TIMESTAMP`` defaults have no fraction ("...:41") while bound Python
+# values carry microseconds ("...:41.000000"), so raw comparisons treat equal
+# instants as different. Both sides are normalised to millisecond text there.
+_SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+
+def _coerce_aware(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def cursor_timestamp(db: Session, column: Any) -> ColumnElement:
+    """``column`` in the form keyset filters and their ORDER BY must both use."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime(_SQLITE_TIMESTAMP_FORMAT, column)
+    return column
+
+
+def cursor_timestamp_value(db: Session, value: datetime) -> datetime | str:
+    """``value`` comparable with ``cursor_timestamp(db, column)``."""
+    if db.get_bind().dialect.name == "sqlite":
+        value = _coerce_aware(value).astimezone(timezone.utc).replace(tzinfo=None)
+        return f"{value:%Y-%m-%d %H:%M:%S}.{value.microsecond // 1000:03d}"
+    return value
+
+
+def encode_cursor(item: Any) -> str:
+    """Encode an opaque keyset cursor from an object's ``(created_at, id)``."""
+    created_at = _coerce_aware(item.created_at)
+    payload = {
+        "created_at": created_at.isoformat() if created_at else None,
+        "id": item.id,
+    }
+    raw = json.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def decode_cursor(value: str | None) -> tuple[datetime, int] | None:
+    if not value:
+        return None
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
+        created_at = payload.get("created_at")
+        cursor_id = payload.get("id")
+        if not created_at or cursor_id is None:
+            return None
+        if isinstance(created_at, str):
+            created_at = created_at.replace("Z", "+00:00")
+            created_at = datetime.fromisoformat(created_at)
+        if isinstance(cursor_id, str):
+            cursor_id = int(cursor_id)
+        if not isinstance(created_at, datetime) or not isinstance(cursor_id, int):
+            return None
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at, cursor_id
+    except Exception:
+        return None
+
+
+def encode_rank_cursor(rank: float, item_id: int) -> str:
+    """Encode a keyset cursor for result lists ordered by ``(rank desc, id desc)``."""
+    raw = json.dumps({"rank": rank, "id": item_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8").rstrip("=")
+
+
+def decode_rank_cursor(value: str | None) -> tuple[float, int] | None:
+    if not value:
+        return None
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("utf-8")))
+        return float(payload["rank"]), int(payload["id"])
+    except Exception:
+        return None
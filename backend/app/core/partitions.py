@@ -0,0 +1,103 @@
+"""Daily range partitions for append-only Postgres tables.
+
+Partitions are named ``<table>_pYYYYMMDD`` and cover one UTC day. Existing
+partitions are read back from the catalog, so a partition with other bounds
+(e.g. the pre-partitioning table attached as a single ``MINVALUE`` partition)
+is never overlapped and is dropped once its upper bound passes retention.
+"""
+
+import logging
+import re
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+# DDL on the parent waits for running queries; give up rather than queue inserts behind it.
+DDL_LOCK_TIMEOUT = "5s"
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    row = db.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table},
+    ).first()
+    return row is not None
+
+
+def daily_partition_name(table: str, day: date) -> str:
+    return f"{table}_p{day:%Y%m%d}"
+
+
+def _parse_bound(value: str) -> datetime | None:
+    value = value.strip()
+    if value.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def partition_bounds(db: Session, table: str) -> dict[str, tuple[datetime | None, datetime | None]]:
+    """Map partition name -> (lower, upper); ``None`` stands for MINVALUE/MAXVALUE."""
+    rows = db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).all()
+    bounds: dict[str, tuple[datetime | None, datetime | None]] = {}
+    for name, expression in rows:
+        match = _BOUND_RE.search(expression or "")
+        if match is None:
+            # DEFAULT partition: never created or dropped here.
+            continue
+        bounds[name] = (_parse_bound(match.group(1)), _parse_bound(match.group(2)))
+    return bounds
+
+
+def _overlaps(
+    lower: datetime, upper: datetime, existing: tuple[datetime | None, datetime | None]
+) -> bool:
+    other_lower, other_upper = existing
+    return (other_lower is None or other_lower < upper) and (other_upper is None or lower < other_upper)
+
+
+def ensure_daily_partitions(db: Session, table: str, *, start: date, days: int) -> list[str]:
+    """Create the partitions for ``days`` days from ``start`` that are not covered yet (caller commits)."""
+    existing = partition_bounds(db, table)
+    created: list[str] = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        lower = datetime.combine(day, time.min, tzinfo=timezone.utc)
+        upper = lower + timedelta(days=1)
+        if any(_overlaps(lower, upper, bounds) for bounds in existing.values()):
+            continue
+        name = daily_partition_name(table, day)
+        db.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+        db.execute(
+            text(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+        )
+        existing[name] = (lower, upper)
+        created.append(name)
+    return created
+
+
+def drop_partitions_before(db: Session, table: str, cutoff: datetime) -> list[str]:
+    """Drop partitions whose rows are all older than ``cutoff`` (caller commits)."""
+    dropped: list[str] = []
+    for name, (_, upper) in sorted(partition_bounds(db, table).items()):
+        if upper is None or upper > cutoff:
+            continue
+        db.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+        db.execute(text(f'DROP TABLE "{name}"'))
+        dropped.append(name)
+    return dropped
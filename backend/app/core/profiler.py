@@ -0,0 +1,307 @@
+"""Low-overhead wall-clock sampling profiler for a running worker.
+
+A daemon thread snapshots every thread's stack with ``sys._current_frames()``
+at a fixed interval and counts identical stacks; nothing is hooked into the
+code being profiled, so the cost is one stack walk per thread per tick.
+Profiles render as collapsed stacks (``thread;outer;...;leaf count``, for
+flamegraph.pl / speedscope) or as a speedscope JSON document with one
+profile per thread.
+
+Two entry points use it: the admin ``/admin/profile`` endpoint profiles the
+worker that serves it for N seconds, and a request carrying a valid
+``X-Profile-Token`` header is profiled while it runs, with the result stored
+under the ``X-Profile-Id`` response header for later download.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+import redis
+from fastapi import FastAPI, Request
+from jose import JWTError
+
+from app.core import security
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_STATUS_HEADER = "X-Profile-Status"
+MAX_STACK_DEPTH = 128
+
+# Leaf frames that mean "waiting", not working: selector polls, locks, queues.
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+Frame = tuple[str, str, int]
+
+# One profile per process at a time: concurrent samplers would double the overhead
+# and each would see the other's thread.
+profile_lock = threading.Lock()
+
+
+def _short_path(path: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in path:
+        return path.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if path.startswith(cwd):
+        return path[len(cwd) :]
+    return path
+
+
+@dataclass
+class ProfileResult:
+    interval_ms: float
+    duration_ms: float
+    stacks: Counter = field(default_factory=Counter)
+    idle_samples: int = 0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        lines = []
+        for (thread_name, frames), count in self.stacks.most_common():
+            labels = [thread_name] + [f"{name} ({path}:{line})" for name, path, line in frames]
+            lines.append(";".join(label.replace(";", ":") for label in labels) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, *, name: str) -> dict:
+        frame_index: dict[Frame, int] = {}
+        profiles: dict[str, dict] = {}
+        for (thread_name, frames), count in self.stacks.most_common():
+            profile = profiles.setdefault(
+                thread_name,
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": 0,
+                    "samples": [],
+                    "weights": [],
+                },
+            )
+            weight = round(count * self.interval_ms, 3)
+            profile["samples"].append([frame_index.setdefault(frame, len(frame_index)) for frame in frames])
+            profile["weights"].append(weight)
+            profile["endValue"] = round(profile["endValue"] + weight, 3)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "splendoura-profiler",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [{"name": frame[0], "file": frame[1], "line": frame[2]} for frame in frame_index]
+            },
+            "profiles": sorted(profiles.values(), key=lambda profile: profile["endValue"], reverse=True),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "interval_ms": self.interval_ms,
+            "duration_ms": self.duration_ms,
+            "idle_samples": self.idle_samples,
+            "stacks": [
+                {"thread": thread_name, "frames": [list(frame) for frame in frames], "count": count}
+                for (thread_name, frames), count in self.stacks.items()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProfileResult":
+        stacks: Counter = Counter()
+        for entry in data["stacks"]:
+            stacks[(entry["thread"], tuple(tuple(frame) for frame in entry["frames"]))] = entry["count"]
+        return cls(
+            interval_ms=data["interval_ms"],
+            duration_ms=data["duration_ms"],
+            stacks=stacks,
+            idle_samples=data.get("idle_samples", 0),
+        )
+
+
+class SamplingProfiler:
+    """Samples every thread but its own every ``interval_ms`` until stopped."""
+
+    def __init__(self, *, interval_ms: float = 10.0, include_idle: bool = False) -> None:
+        self._interval = max(interval_ms, 1.0) / 1000
+        self._include_idle = include_idle
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._labels: dict[object, Frame] = {}
+        self._result = ProfileResult(interval_ms=self._interval * 1000, duration_ms=0.0)
+        self._started = 0.0
+
+    def _frame(self, frame) -> Frame:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = (code.co_name, _short_path(code.co_filename), code.co_firstlineno)
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+    def _sample(self) -> None:
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if not self._include_idle and self._is_idle(frame):
+                self._result.idle_samples += 1
+                continue
+            frames: list[Frame] = []
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                frames.append(self._frame(frame))
+                frame = frame.f_back
+            frames.reverse()
+            self._result.stacks[(names.get(ident, f"thread-{ident}"), tuple(frames))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self._sample()
+            except Exception:
+                logger.exception("profiler_sample_failed")
+                return
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> ProfileResult:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._result.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        return self._result
+
+
+class ProfileStore:
+    """Per-request profiles kept for download by id.
+
+    Stored in Redis when ``REDIS_URL`` is set, so the profile can be fetched
+    from any worker; otherwise each process keeps a small LRU.
+    """
+
+    def __init__(self, *, redis_url: str | None = None, ttl_seconds: int = 3600, max_entries: int = 32) -> None:
+        self._redis_url = redis_url
+        self._redis: redis.Redis | None = None
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(profile_id: str) -> str:
+        return f"profiler:request:{profile_id}"
+
+    def _get_redis(self) -> redis.Redis | None:
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._redis
+
+    def put(self, profile_id: str, result: ProfileResult) -> None:
+        raw = json.dumps(result.to_dict(), separators=(",", ":"))
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.set(self._key(profile_id), raw, ex=self._ttl)
+                return
+            except Exception:
+                logger.exception("profile_store_write_failed profile_id=%s", profile_id)
+        with self._lock:
+            self._entries[profile_id] = (raw, time.time() + self._ttl)
+            self._entries.move_to_end(profile_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, profile_id: str) -> ProfileResult | None:
+        raw = None
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = client.get(self._key(profile_id))
+            except Exception:
+                logger.exception("profile_store_read_failed profile_id=%s", profile_id)
+        if raw is None:
+            with self._lock:
+                entry = self._entries.get(profile_id)
+                if entry is not None and entry[1] > time.time():
+                    raw = entry[0]
+        return ProfileResult.from_dict(json.loads(raw)) if raw else None
+
+
+profile_store = ProfileStore(redis_url=settings.REDIS_URL, ttl_seconds=settings.PROFILER_RESULT_TTL_SECONDS)
+
+
+def _profile_token_valid(token: str) -> bool:
+    try:
+        security.decode_token(token, expected_type="profile")
+    except JWTError:
+        return False
+    return True
+
+
+def register_request_profiling(app: FastAPI) -> None:
+    @app.middleware("http")
+    async def request_profiling_middleware(request: Request, call_next):
+        token = request.headers.get(PROFILE_TOKEN_HEADER)
+        if not token or not settings.PROFILER_ENABLED:
+            return await call_next(request)
+        if not _profile_token_valid(token):
+            response = await call_next(request)
+            response.headers[PROFILE_STATUS_HEADER] = "invalid-token"
+            return response
+        if not profile_lock.acquire(blocking=False):
+            response = await call_next(request)
+            response.headers[PROFILE_STATUS_HEADER] = "busy"
+            return response
+        # Samples the whole worker while the request runs (until its response
+        # headers are ready): the request's own thread plus anything else the
+        # worker is doing at the time, each under its own thread name.
+        profiler = SamplingProfiler(interval_ms=settings.PROFILER_INTERVAL_MS)
+        try:
+            profiler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                result = await asyncio.to_thread(profiler.stop)
+        finally:
+            profile_lock.release()
+        profile_id = getattr(request.state, "request_id", None) or uuid.uuid4().hex
+        await asyncio.to_thread(profile_store.put, profile_id, result)
+        logger.info(
+            "request_profiled profile_id=%s path=%s samples=%s duration_ms=%s",
+            profile_id,
+            request.url.path,
+            result.samples,
+            result.duration_ms,
+        )
+        response.headers[PROFILE_ID_HEADER] = profile_id
+        response.headers[PROFILE_STATUS_HEADER] = "stored"
+        return response
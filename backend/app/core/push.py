@@ -1,22 +1,76 @@
+import asyncio
 import json
 import logging
-import urllib.request
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Iterable
 
+import httpx
+import redis
+from prometheus_client import Counter, Histogram
+from sqlalchemy import and_, func
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from app import models
+from app.core.config import settings
+from app.core.realtime import realtime_manager
+from app.db.session import SessionLocal
 from app.models.membership import JoinStatus
+from app.models.push_outbox import (
+    PUSH_STATUS_DELIVERED,
+    PUSH_STATUS_EXPIRED,
+    PUSH_STATUS_FAILED,
+    PUSH_STATUS_PENDING,
+    PUSH_STATUS_SENDING,
+    PUSH_STATUS_SENT,
+    PushOutbox,
+)
 from app.models.push_token import UserPushToken
 from app.models.user import UserRole
 
 logger = logging.getLogger(__name__)
 
 EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_RECEIPTS_URL = "https://exp.host/--/api/v2/push/getReceipts"
 MAX_EXPO_CHUNK = 100
+MAX_EXPO_RECEIPT_CHUNK = 1000
+# A claimed row is retried by any worker if its sender has not recorded a result by then.
+CLAIM_LEASE_SECONDS = 120
+RECEIPT_POLL_SECONDS = 60
+RECEIPT_MAX_AGE = timedelta(hours=24)
 
+PUSH_MESSAGES_TOTAL = Counter(
+    "splendoura_push_messages_total",
+    "Push outbox messages by delivery outcome.",
+    ["result"],
+)
+PUSH_TOKENS_PRUNED_TOTAL = Counter(
+    "splendoura_push_tokens_pruned_total",
+    "Device tokens removed after Expo reported DeviceNotRegistered.",
+)
+PUSH_FANOUT_RECIPIENTS_TOTAL = Counter(
+    "splendoura_push_fanout_recipients_total",
+    "Chat push recipients by outcome: queued, coalesced into a pending push, or connected (skipped).",
+    ["outcome"],
+)
+PUSH_FANOUT_CACHE_TOTAL = Counter(
+    "splendoura_push_fanout_cache_total",
+    "Group member/push-token lookups by cache result.",
+    ["result"],
+)
+PUSH_REQUEST_SECONDS = Histogram(
+    "splendoura_push_request_seconds",
+    "Expo push API request latency in seconds.",
+    ["endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
 
-def _chunk(values: list[dict], size: int) -> Iterable[list[dict]]:
+
+def _chunk(values: list, size: int) -> Iterable[list]:
     for index in range(0, len(values), size):
         yield values[index : index + size]
 
@@ -42,40 +96,689 @@ def get_push_tokens(db: Session, user_ids: Iterable[int]) -> list[str]:
     return list({row[0] for row in rows if row[0]})
 
 
-def send_expo_push(
+def get_push_tokens_by_user(db: Session, user_ids: Iterable[int]) -> dict[int, list[str]]:
+    ids = [int(value) for value in user_ids if value is not None]
+    if not ids:
+        return {}
+    rows = db.query(UserPushToken.user_id, UserPushToken.token).filter(UserPushToken.user_id.in_(ids)).all()
+    tokens: dict[int, list[str]] = {}
+    for user_id, token in rows:
+        if token:
+            tokens.setdefault(user_id, []).append(token)
+    return tokens
+
+
+class GroupFanoutCache:
+    """Approved members of a group and their push tokens, keyed by group id.
+
+    Entries map member id to tokens (empty for members without a device) and
+    are dropped when membership or tokens change. Shared through Redis when
+    ``REDIS_URL`` is set so an invalidation reaches every worker; otherwise a
+    bounded per-process LRU. The TTL bounds staleness from missed paths.
+    """
+
+    def __init__(self, *, redis_url: str | None = None, ttl_seconds: int = 300, max_entries: int = 5000) -> None:
+        self._redis_url = redis_url
+        self._redis: redis.Redis | None = None
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[int, tuple[dict[int, list[str]], float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(group_id: int) -> str:
+        return f"push:fanout:{group_id}"
+
+    def _get_redis(self) -> redis.Redis | None:
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._redis
+
+    def get(self, group_id: int) -> dict[int, list[str]] | None:
+        if self._ttl <= 0:
+            return None
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = client.get(self._key(group_id))
+            except Exception:
+                logger.exception("push_fanout_cache_read_failed")
+                return None
+            if not raw:
+                return None
+            return {int(user_id): tokens for user_id, tokens in json.loads(raw).items()}
+        with self._lock:
+            entry = self._entries.get(group_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                self._entries.pop(group_id, None)
+                return None
+            self._entries.move_to_end(group_id)
+            return entry[0]
+
+    def set(self, group_id: int, fanout: dict[int, list[str]]) -> None:
+        if self._ttl <= 0:
+            return
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.set(self._key(group_id), json.dumps(fanout), ex=self._ttl)
+            except Exception:
+                logger.exception("push_fanout_cache_write_failed")
+            return
+        with self._lock:
+            self._entries[group_id] = (fanout, time.time() + self._ttl)
+            self._entries.move_to_end(group_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, group_ids: Iterable[int]) -> None:
+        group_ids = list({int(group_id) for group_id in group_ids})
+        if not group_ids:
+            return
+        client = self._get_redis()
+        if client is not None:
+            try:
+                client.delete(*[self._key(group_id) for group_id in group_ids])
+            except Exception:
+                logger.exception("push_fanout_cache_invalidate_failed")
+            return
+        with self._lock:
+            for group_id in group_ids:
+                self._entries.pop(group_id, None)
+
+
+group_fanout_cache = GroupFanoutCache(
+    redis_url=settings.REDIS_URL,
+    ttl_seconds=settings.PUSH_FANOUT_CACHE_TTL_SECONDS,
+)
+
+
+def get_group_fanout(db: Session, group_id: int) -> dict[int, list[str]]:
+    """``{member_id: push_tokens}`` for the group's approved members, cached."""
+    cached = group_fanout_cache.get(group_id)
+    if cached is not None:
+        PUSH_FANOUT_CACHE_TOTAL.labels(result="hit").inc()
+        return cached
+    PUSH_FANOUT_CACHE_TOTAL.labels(result="miss").inc()
+    member_ids = get_group_member_ids(db, group_id)
+    tokens = get_push_tokens_by_user(db, member_ids)
+    fanout = {user_id: tokens.get(user_id, []) for user_id in member_ids}
+    group_fanout_cache.set(group_id, fanout)
+    return fanout
+
+
+def get_group_push_tokens(db: Session, group_id: int, *, exclude_user_id: int | None = None) -> list[str]:
+    fanout = get_group_fanout(db, group_id)
+    tokens = [
+        token
+        for user_id, user_tokens in fanout.items()
+        if user_id != exclude_user_id
+        for token in user_tokens
+    ]
+    return list(dict.fromkeys(tokens))
+
+
+def invalidate_group_fanout(*group_ids: int) -> None:
+    """Call after approving, rejecting, removing or losing a group member."""
+    group_fanout_cache.invalidate(group_ids)
+
+
+def invalidate_user_fanout(db: Session, user_ids: Iterable[int]) -> None:
+    """Drop cached fan-out for every group the users belong to (token changes)."""
+    ids = [int(value) for value in user_ids if value is not None]
+    if not ids:
+        return
+    rows = (
+        db.query(models.Membership.group_id)
+        .filter(
+            models.Membership.user_id.in_(ids),
+            models.Membership.join_status == JoinStatus.APPROVED,
+            models.Membership.deleted_at.is_(None),
+        )
+        .distinct()
+        .all()
+    )
+    group_fanout_cache.invalidate(row[0] for row in rows)
+
+
+def enqueue_push(
     tokens: list[str],
     *,
     title: str,
     body: str,
     data: dict | None = None,
 ) -> None:
+    """Write one outbox row per token; ``push_dispatcher`` delivers them.
+
+    Commits in its own session so callers never wait on Expo and a push is
+    not lost if the process exits before it is sent.
+    """
+    tokens = [token for token in dict.fromkeys(tokens or []) if token]
     if not tokens:
         return
-    payloads = []
-    for token in tokens:
-        if not token:
-            continue
-        payloads.append(
-            {
-                "to": token,
-                "title": title,
-                "body": body,
-                "data": data or {},
-            }
+    db = SessionLocal()
+    try:
+        db.add_all(
+            [PushOutbox(token=token, title=title[:255], body=body, data=data or {}) for token in tokens]
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("push_enqueue_failed tokens=%s", len(tokens))
+        return
+    finally:
+        db.close()
+    push_dispatcher.wake()
+
+
+def _upsert_collapsed(db: Session, rows: list[dict]):
+    """Insert pending rows, or bump the count of the pending row they collapse into."""
+    dialect = db.get_bind().dialect.name
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect)
+    if insert is None:
+        for row in rows:
+            pending = (
+                db.query(PushOutbox)
+                .filter(
+                    PushOutbox.collapse_key == row["collapse_key"],
+                    PushOutbox.token == row["token"],
+                    PushOutbox.status == PUSH_STATUS_PENDING,
+                )
+                .first()
+            )
+            if pending is None:
+                db.add(PushOutbox(**row))
+            else:
+                pending.coalesced_count += 1
+                pending.data = row["data"]
+        return
+    statement = insert(PushOutbox).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PushOutbox.collapse_key, PushOutbox.token],
+        index_where=and_(PushOutbox.status == PUSH_STATUS_PENDING, PushOutbox.collapse_key.isnot(None)),
+        set_={
+            "coalesced_count": PushOutbox.coalesced_count + 1,
+            "data": statement.excluded.data,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(statement)
+
+
+def enqueue_group_message_push(
+    db: Session,
+    *,
+    group_id: int,
+    group_title: str,
+    recipient_ids: Iterable[int],
+    body: str,
+    data: dict,
+) -> None:
+    """Queue chat pushes, at most one per (recipient, group) per coalescing window.
+
+    Recipients with the group open over a websocket are skipped. The first
+    message after a quiet window is pushed right away; later ones fold into a
+    single pending push sent when the window ends ("N new messages in ...").
+    """
+    recipient_ids = list(dict.fromkeys(recipient_ids))
+    connected = realtime_manager.connected_user_ids(group_id)
+    targets = [user_id for user_id in recipient_ids if user_id not in connected]
+    if len(targets) < len(recipient_ids):
+        PUSH_FANOUT_RECIPIENTS_TOTAL.labels(outcome="connected").inc(len(recipient_ids) - len(targets))
+    fanout = get_group_fanout(db, group_id)
+    tokens_by_user = {user_id: fanout[user_id] for user_id in targets if fanout.get(user_id)}
+    if not tokens_by_user:
+        return
+    window = settings.PUSH_COALESCE_WINDOW_SECONDS
+    if window <= 0:
+        PUSH_FANOUT_RECIPIENTS_TOTAL.labels(outcome="queued").inc(len(tokens_by_user))
+        enqueue_push(
+            [token for tokens in tokens_by_user.values() for token in tokens],
+            title=group_title,
+            body=body,
+            data=data,
         )
-    for chunk in _chunk(payloads, MAX_EXPO_CHUNK):
-        payload_bytes = json.dumps(chunk, default=str).encode("utf-8")
-        request = urllib.request.Request(
-            EXPO_PUSH_URL,
-            data=payload_bytes,
-            headers={"Content-Type": "application/json"},
-            method="POST",
+        return
+
+    now = _utcnow()
+    keys = {user_id: f"group:{group_id}:user:{user_id}" for user_id in tokens_by_user}
+    outbox = SessionLocal()
+    try:
+        # Last push per (key, token) inside the window, and which ones are still pending.
+        last_push: dict[tuple[str, str], datetime] = {}
+        pending: set[tuple[str, str]] = set()
+        recent = (
+            outbox.query(
+                PushOutbox.collapse_key,
+                PushOutbox.token,
+                PushOutbox.status,
+                func.coalesce(PushOutbox.sent_at, PushOutbox.created_at),
+            )
+            .filter(
+                PushOutbox.collapse_key.in_(list(keys.values())),
+                PushOutbox.created_at > now - timedelta(seconds=window * 2),
+            )
+            .all()
         )
+        for key, token, status, pushed_at in recent:
+            if status == PUSH_STATUS_PENDING:
+                pending.add((key, token))
+            elif pushed_at is not None:
+                if pushed_at.tzinfo is None:
+                    pushed_at = pushed_at.replace(tzinfo=timezone.utc)
+                previous = last_push.get((key, token))
+                if previous is None or pushed_at > previous:
+                    last_push[(key, token)] = pushed_at
+
+        rows = []
+        for user_id, tokens in tokens_by_user.items():
+            key = keys[user_id]
+            coalesced = all((key, token) in pending for token in tokens)
+            PUSH_FANOUT_RECIPIENTS_TOTAL.labels(outcome="coalesced" if coalesced else "queued").inc()
+            for token in dict.fromkeys(tokens):
+                previous = last_push.get((key, token))
+                due = now
+                if previous is not None and previous > now - timedelta(seconds=window):
+                    due = previous + timedelta(seconds=window)
+                rows.append(
+                    {
+                        "token": token,
+                        "title": group_title[:255],
+                        "body": body,
+                        "data": data,
+                        "collapse_key": key,
+                        "coalesced_count": 1,
+                        "status": PUSH_STATUS_PENDING,
+                        "attempts": 0,
+                        "next_attempt_at": due,
+                    }
+                )
+        _upsert_collapsed(outbox, rows)
+        outbox.commit()
+    except Exception:
+        outbox.rollback()
+        logger.exception("push_enqueue_failed group_id=%s", group_id)
+        return
+    finally:
+        outbox.close()
+    push_dispatcher.wake()
+
+
+@dataclass(frozen=True)
+class _ClaimedPush:
+    id: int
+    token: str
+    title: str
+    body: str
+    data: dict | None
+    attempts: int
+    coalesced_count: int = 1
+
+    def message(self) -> dict:
+        body = self.body
+        data = dict(self.data or {})
+        if self.coalesced_count > 1:
+            body = f"{self.coalesced_count} new messages in {self.title}"
+            data["count"] = self.coalesced_count
+        return {"to": self.token, "title": self.title, "body": body, "data": data}
+
+
+@dataclass(frozen=True)
+class _PushResult:
+    id: int
+    token: str
+    attempts: int
+    outcome: str  # sent | retry | failed | unregistered
+    ticket_id: str | None = None
+    error: str | None = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _prune_tokens(db: Session, tokens: set[str]) -> list[int]:
+    """Delete dead tokens; returns their owners for fan-out invalidation after commit."""
+    if not tokens:
+        return []
+    owners = [row[0] for row in db.query(UserPushToken.user_id).filter(UserPushToken.token.in_(tokens))]
+    deleted = (
+        db.query(UserPushToken)
+        .filter(UserPushToken.token.in_(tokens))
+        .delete(synchronize_session=False)
+    )
+    if deleted:
+        PUSH_TOKENS_PRUNED_TOTAL.inc(deleted)
+        logger.info("push_tokens_pruned count=%s", deleted)
+    return owners
+
+
+class PushDispatcher:
+    """Delivers the push outbox to Expo from a task on the app event loop.
+
+    Rows are claimed in batches with ``FOR UPDATE SKIP LOCKED`` and a short
+    lease, so several app workers can dispatch without sending twice. Each
+    batch is sent as concurrent 100-message Expo requests over one pooled
+    client; transport errors, 429/5xx and rate-limit tickets are retried with
+    exponential backoff. A second task fetches receipts and prunes tokens
+    Expo reports as ``DeviceNotRegistered``.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 500,
+        interval_seconds: float = 1.0,
+        max_attempts: int = 5,
+        backoff_seconds: float = 5.0,
+        receipt_delay_seconds: int = 900,
+        retention_days: int = 7,
+    ) -> None:
+        self._batch_size = max(1, batch_size)
+        self._interval = interval_seconds
+        self._max_attempts = max(1, max_attempts)
+        self._backoff = backoff_seconds
+        self._receipt_delay = timedelta(seconds=receipt_delay_seconds)
+        self._retention = timedelta(days=retention_days)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def wake(self) -> None:
+        """Start a dispatch pass now instead of at the next poll. Thread-safe."""
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
         try:
-            with urllib.request.urlopen(request, timeout=10) as response:
-                response.read()
-        except Exception as exc:
-            logger.warning("Expo push send failed: %s", exc)
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+        if settings.EXPO_ACCESS_TOKEN:
+            headers["Authorization"] = f"Bearer {settings.EXPO_ACCESS_TOKEN}"
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            headers=headers,
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+        )
+        self._tasks = [
+            asyncio.create_task(self._dispatch_loop()),
+            asyncio.create_task(self._receipt_loop()),
+        ]
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._loop = None
+        self._wakeup = None
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("push_dispatch_failed")
+                claimed = 0
+            if claimed >= self._batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        claimed = await asyncio.to_thread(self._claim_batch)
+        if not claimed:
+            return 0
+        chunk_results = await asyncio.gather(
+            *(self._send_chunk(chunk) for chunk in _chunk(claimed, MAX_EXPO_CHUNK))
+        )
+        await asyncio.to_thread(self._record_results, [item for chunk in chunk_results for item in chunk])
+        return len(claimed)
+
+    def _claim_batch(self) -> list[_ClaimedPush]:
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(PushOutbox)
+                .filter(
+                    PushOutbox.status.in_([PUSH_STATUS_PENDING, PUSH_STATUS_SENDING]),
+                    PushOutbox.next_attempt_at <= now,
+                )
+                .order_by(PushOutbox.id)
+                .limit(self._batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            claimed = []
+            for row in rows:
+                if row.attempts >= self._max_attempts:
+                    # Only a row whose lease expired mid-send (the dispatcher
+                    # crashed on it) gets here; don't let it crash it forever.
+                    row.status = PUSH_STATUS_FAILED
+                    row.error = f"lease expired after {row.attempts} attempts"
+                    PUSH_MESSAGES_TOTAL.labels(result="failed").inc()
+                    continue
+                # Out of "pending" so new messages start a fresh collapsed row.
+                row.status = PUSH_STATUS_SENDING
+                row.attempts += 1
+                row.next_attempt_at = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+                claimed.append(
+                    _ClaimedPush(
+                        id=row.id,
+                        token=row.token,
+                        title=row.title,
+                        body=row.body,
+                        data=row.data,
+                        attempts=row.attempts,
+                        coalesced_count=row.coalesced_count or 1,
+                    )
+                )
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    async def _send_chunk(self, chunk: list[_ClaimedPush]) -> list[_PushResult]:
+        messages = [item.message() for item in chunk]
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(EXPO_PUSH_URL, json=messages)
+        except httpx.HTTPError as exc:
+            return [self._result(item, "retry", error=f"transport: {exc}") for item in chunk]
+        finally:
+            PUSH_REQUEST_SECONDS.labels(endpoint="send").observe(time.perf_counter() - started)
+        if response.status_code == 429 or response.status_code >= 500:
+            return [self._result(item, "retry", error=f"http {response.status_code}") for item in chunk]
+        try:
+            tickets = response.json().get("data") if response.is_success else None
+        except ValueError:
+            tickets = None
+        if not isinstance(tickets, list) or len(tickets) != len(chunk):
+            logger.warning("push_send_rejected status=%s body=%s", response.status_code, response.text[:500])
+            return [self._result(item, "failed", error=f"http {response.status_code}") for item in chunk]
+
+        results = []
+        for item, ticket in zip(chunk, tickets):
+            ticket = ticket if isinstance(ticket, dict) else {}
+            if ticket.get("status") == "ok":
+                results.append(self._result(item, "sent", ticket_id=ticket.get("id")))
+                continue
+            error = (ticket.get("details") or {}).get("error") or ticket.get("message") or "unknown"
+            if error == "DeviceNotRegistered":
+                results.append(self._result(item, "unregistered", error=error))
+            elif error == "MessageRateExceeded":
+                results.append(self._result(item, "retry", error=error))
+            else:
+                results.append(self._result(item, "failed", error=error))
+        return results
+
+    @staticmethod
+    def _result(item: _ClaimedPush, outcome: str, **kwargs) -> _PushResult:
+        return _PushResult(id=item.id, token=item.token, attempts=item.attempts, outcome=outcome, **kwargs)
+
+    def _record_results(self, results: list[_PushResult]) -> None:
+        if not results:
+            return
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            rows = {
+                row.id: row
+                for row in db.query(PushOutbox).filter(PushOutbox.id.in_([result.id for result in results]))
+            }
+            dead_tokens: set[str] = set()
+            for result in results:
+                row = rows.get(result.id)
+                if row is None:
+                    continue
+                outcome = result.outcome
+                if outcome == "retry" and result.attempts >= self._max_attempts:
+                    outcome = "failed"
+                row.error = (result.error or "")[:255] or None
+                if outcome == "sent":
+                    row.status = PUSH_STATUS_SENT
+                    row.ticket_id = result.ticket_id
+                    row.sent_at = now
+                elif outcome == "retry":
+                    # Stays "sending" so it never clashes with a newer pending collapsed row.
+                    row.status = PUSH_STATUS_SENDING
+                    delay = self._backoff * (2 ** (result.attempts - 1))
+                    row.next_attempt_at = now + timedelta(seconds=min(delay, 3600))
+                else:
+                    row.status = PUSH_STATUS_FAILED
+                    if outcome == "unregistered":
+                        dead_tokens.add(result.token)
+                PUSH_MESSAGES_TOTAL.labels(result=outcome).inc()
+            owners = _prune_tokens(db, dead_tokens)
+            db.commit()
+            invalidate_user_fanout(db, owners)
+        finally:
+            db.close()
+
+    async def _receipt_loop(self) -> None:
+        while True:
+            try:
+                while await self.check_receipts_once() >= MAX_EXPO_RECEIPT_CHUNK:
+                    pass
+                await asyncio.to_thread(self._purge_finished)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("push_receipts_failed")
+            await asyncio.sleep(RECEIPT_POLL_SECONDS)
+
+    async def check_receipts_once(self) -> int:
+        tickets = await asyncio.to_thread(self._due_tickets)
+        if not tickets:
+            return 0
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(EXPO_RECEIPTS_URL, json={"ids": list(tickets)})
+            response.raise_for_status()
+            receipts = response.json().get("data") or {}
+        finally:
+            PUSH_REQUEST_SECONDS.labels(endpoint="receipts").observe(time.perf_counter() - started)
+        await asyncio.to_thread(self._record_receipts, tickets, receipts)
+        return len(tickets)
+
+    def _due_tickets(self) -> dict[str, int]:
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(PushOutbox.ticket_id, PushOutbox.id)
+                .filter(
+                    PushOutbox.status == PUSH_STATUS_SENT,
+                    PushOutbox.sent_at <= now - self._receipt_delay,
+                    PushOutbox.updated_at <= now - timedelta(seconds=RECEIPT_POLL_SECONDS // 2),
+                    PushOutbox.ticket_id.isnot(None),
+                )
+                .order_by(PushOutbox.updated_at)
+                .limit(MAX_EXPO_RECEIPT_CHUNK)
+                .all()
+            )
+            return {ticket_id: row_id for ticket_id, row_id in rows}
+        finally:
+            db.close()
+
+    def _record_receipts(self, tickets: dict[str, int], receipts: dict) -> None:
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            rows = db.query(PushOutbox).filter(PushOutbox.id.in_(list(tickets.values()))).all()
+            dead_tokens: set[str] = set()
+            for row in rows:
+                receipt = receipts.get(row.ticket_id)
+                if not isinstance(receipt, dict):
+                    # Expo drops receipts after a day; stop asking for them.
+                    if row.sent_at is not None and row.sent_at <= now - RECEIPT_MAX_AGE:
+                        row.status = PUSH_STATUS_EXPIRED
+                    else:
+                        # Not ready yet; move it behind newer tickets until the next pass.
+                        row.updated_at = now
+                    continue
+                if receipt.get("status") == "ok":
+                    row.status = PUSH_STATUS_DELIVERED
+                    PUSH_MESSAGES_TOTAL.labels(result="delivered").inc()
+                    continue
+                error = (receipt.get("details") or {}).get("error") or receipt.get("message") or "unknown"
+                row.status = PUSH_STATUS_FAILED
+                row.error = str(error)[:255]
+                PUSH_MESSAGES_TOTAL.labels(result="receipt_error").inc()
+                if error == "DeviceNotRegistered":
+                    dead_tokens.add(row.token)
+            owners = _prune_tokens(db, dead_tokens)
+            db.commit()
+            invalidate_user_fanout(db, owners)
+        finally:
+            db.close()
+
+    def _purge_finished(self) -> None:
+        db = SessionLocal()
+        try:
+            db.query(PushOutbox).filter(
+                PushOutbox.status.in_([PUSH_STATUS_DELIVERED, PUSH_STATUS_FAILED, PUSH_STATUS_EXPIRED]),
+                PushOutbox.updated_at < _utcnow() - self._retention,
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+push_dispatcher = PushDispatcher(
+    batch_size=settings.PUSH_DISPATCH_BATCH_SIZE,
+    interval_seconds=settings.PUSH_DISPATCH_INTERVAL_SECONDS,
+    max_attempts=settings.PUSH_MAX_ATTEMPTS,
+    backoff_seconds=settings.PUSH_RETRY_BACKOFF_SECONDS,
+    receipt_delay_seconds=settings.PUSH_RECEIPT_DELAY_SECONDS,
+    retention_days=settings.PUSH_OUTBOX_RETENTION_DAYS,
+)
 
 
 def notify_admins_new_user(db: Session, new_user: models.User) -> None:
@@ -95,7 +798,7 @@ def notify_admins_new_user(db: Session, new_user: models.User) -> None:
     if not tokens:
         return
     label = new_user.full_name or new_user.username or new_user.email
-    send_expo_push(
+    enqueue_push(
         tokens,
         title="New user signup",
         body=f"{label} just joined Splendoura.",
@@ -0,0 +1,102 @@
+"""Per-request database query accounting.
+
+The observability middleware opens a ``RequestQueryStats`` in a context
+variable; SQLAlchemy cursor events add every statement executed on behalf of
+that request (sync endpoints included, since the threadpool runs them in a
+copy of the request context that shares the same stats object). Statements
+outside a request (background tasks, the event flush) are not counted.
+"""
+
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_START_TIMES_KEY = "query_stats_start_times"
+
+
+@dataclass
+class RequestQueryStats:
+    # Statements are only kept when the caller may need a slow-request dump.
+    max_statements: int = 0
+    queries: int = 0
+    duration_seconds: float = 0.0
+    rows: int = 0
+    statements: list[tuple[str, float]] = field(default_factory=list)
+    statements_dropped: int = 0
+
+    def record(self, statement: str, elapsed: float, rows: int) -> None:
+        self.queries += 1
+        self.duration_seconds += elapsed
+        self.rows += rows
+        if not self.max_statements:
+            return
+        if len(self.statements) < self.max_statements:
+            self.statements.append((statement, elapsed))
+        else:
+            self.statements_dropped += 1
+
+    def summarize(self, *, statement_chars: int = 500) -> list[dict[str, object]]:
+        """Recorded statements grouped by SQL text, most expensive first."""
+        grouped: dict[str, list[float]] = {}
+        for statement, elapsed in self.statements:
+            totals = grouped.setdefault(statement, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+        ordered = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                "sql": " ".join(statement.split())[:statement_chars],
+                "count": int(count),
+                "total_ms": round(total * 1000, 2),
+            }
+            for statement, (count, total) in ordered
+        ]
+
+
+_current_stats: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def start_request_query_stats(*, max_statements: int = 0) -> tuple[RequestQueryStats, Token]:
+    stats = RequestQueryStats(max_statements=max_statements)
+    return stats, _current_stats.set(stats)
+
+
+def end_request_query_stats(token: Token) -> None:
+    _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_stats.get() is None:
+        return
+    conn.info.setdefault(_START_TIMES_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current_stats.get()
+    start_times = conn.info.get(_START_TIMES_KEY)
+    if stats is None or not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    # rowcount is the number of rows returned for SELECTs on psycopg2 (-1 where unknown).
+    stats.record(statement, elapsed, max(getattr(cursor, "rowcount", 0) or 0, 0))
+
+
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time.
+    conn = exception_context.connection
+    start_times = conn.info.get(_START_TIMES_KEY) if conn is not None else None
+    if start_times:
+        start_times.pop()
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -1,13 +1,21 @@
 import asyncio
 import json
+import threading
+import time
 import uuid
 from typing import Dict, Set
 
+import redis
 import redis.asyncio as redis_async
 from fastapi import WebSocket
 
 from app.core.config import settings
 
+# Presence entries in Redis expire unless the owning instance refreshes them,
+# so a crashed worker does not leave users marked as connected.
+PRESENCE_TTL_SECONDS = 90
+PRESENCE_REFRESH_SECONDS = 30
+
 
 class ConnectionManager:
     def __init__(self, redis_url: str | None = None) -> None:
@@ -18,6 +26,18 @@ class ConnectionManager:
         self._subscriptions: dict[int, asyncio.Task] = {}
         self._subscriptions_lock = asyncio.Lock()
         self._instance_id = uuid.uuid4().hex
+        # Typing state is coalesced per (group, user) and flushed once per tick.
+        self._typing: dict[int, dict[int, float]] = {}
+        self._typing_announced: dict[int, set[int]] = {}
+        self._typing_dirty: set[int] = set()
+        self._typing_task: asyncio.Task | None = None
+        # Connected users per group (user id -> open sockets) for push suppression.
+        # Mutated on the loop and read from worker threads by connected_user_ids,
+        # so every access holds _users_lock.
+        self._group_users: dict[int, dict[int, int]] = {}
+        self._users_lock = threading.Lock()
+        self._redis_sync: redis.Redis | None = None
+        self._presence_task: asyncio.Task | None = None
 
     def _channel(self, group_id: int) -> str:
         return f"realtime:groups:{group_id}"
@@ -55,6 +75,7 @@ class ConnectionManager:
         group_id: int,
         websocket: WebSocket,
         subprotocol: str | None = None,
+        user_id: int | None = None,
     ) -> None:
         if subprotocol:
             await websocket.accept(subprotocol=subprotocol)
@@ -62,21 +83,97 @@ class ConnectionManager:
             await websocket.accept()
         async with self._lock:
             self._groups.setdefault(group_id, set()).add(websocket)
+            if user_id is not None:
+                with self._users_lock:
+                    users = self._group_users.setdefault(group_id, {})
+                    users[user_id] = users.get(user_id, 0) + 1
         await self._ensure_subscription(group_id)
+        if user_id is not None:
+            await self._mark_present(group_id, [user_id])
+            if self._redis_url and (self._presence_task is None or self._presence_task.done()):
+                self._presence_task = asyncio.create_task(self._presence_loop())
 
-    async def disconnect(self, group_id: int, websocket: WebSocket) -> None:
+    async def disconnect(self, group_id: int, websocket: WebSocket, user_id: int | None = None) -> None:
         should_stop = False
+        user_gone = False
         async with self._lock:
+            if user_id is not None:
+                with self._users_lock:
+                    users = self._group_users.get(group_id, {})
+                    remaining = users.get(user_id, 0) - 1
+                    if remaining > 0:
+                        users[user_id] = remaining
+                    elif users.pop(user_id, None) is not None:
+                        user_gone = True
+                        if not users:
+                            self._group_users.pop(group_id, None)
             connections = self._groups.get(group_id)
-            if not connections:
-                return
-            connections.discard(websocket)
-            if not connections:
-                self._groups.pop(group_id, None)
-                should_stop = True
+            if connections:
+                connections.discard(websocket)
+                if not connections:
+                    self._groups.pop(group_id, None)
+                    should_stop = True
+        if user_gone:
+            await self._clear_present(group_id, user_id)
         if should_stop:
             await self._stop_subscription(group_id)
 
+    def _presence_key(self, group_id: int) -> str:
+        return f"realtime:presence:{group_id}"
+
+    async def _mark_present(self, group_id: int, user_ids: list[int]) -> None:
+        if not self._redis_url or not user_ids:
+            return
+        try:
+            redis_client = await self._get_redis()
+            key = self._presence_key(group_id)
+            now = time.time()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(key, "-inf", now)
+                pipe.zadd(key, {f"{user_id}:{self._instance_id}": now + PRESENCE_TTL_SECONDS for user_id in user_ids})
+                pipe.expire(key, PRESENCE_TTL_SECONDS)
+                await pipe.execute()
+        except Exception:
+            return
+
+    async def _clear_present(self, group_id: int, user_id: int) -> None:
+        if not self._redis_url:
+            return
+        try:
+            redis_client = await self._get_redis()
+            await redis_client.zrem(self._presence_key(group_id), f"{user_id}:{self._instance_id}")
+        except Exception:
+            return
+
+    async def _presence_loop(self) -> None:
+        while self._group_users:
+            await asyncio.sleep(PRESENCE_REFRESH_SECONDS)
+            with self._users_lock:
+                snapshot = [(group_id, list(users)) for group_id, users in self._group_users.items()]
+            for group_id, user_ids in snapshot:
+                await self._mark_present(group_id, user_ids)
+
+    def connected_user_ids(self, group_id: int) -> set[int]:
+        """Users with an open socket for the group on any instance.
+
+        Sync so push fan-out can call it from worker threads.
+        """
+        with self._users_lock:
+            connected = set(self._group_users.get(group_id, {}))
+        if not self._redis_url:
+            return connected
+        try:
+            if self._redis_sync is None:
+                self._redis_sync = redis.Redis.from_url(self._redis_url, decode_responses=True)
+            members = self._redis_sync.zrangebyscore(self._presence_key(group_id), time.time(), "+inf")
+        except Exception:
+            return connected
+        for member in members:
+            user_part = member.split(":", 1)[0]
+            if user_part.isdigit():
+                connected.add(int(user_part))
+        return connected
+
     async def _broadcast_local(self, group_id: int, payload: dict) -> None:
         message = json.dumps(payload, default=str)
         connections = list(self._groups.get(group_id, set()))
@@ -146,6 +243,60 @@ class ConnectionManager:
         await self._broadcast_local(group_id, payload)
         await self._publish(group_id, payload)
 
+    def set_typing(self, group_id: int, user_id: int, is_typing: bool) -> None:
+        """Record a typing update; frames are emitted by the tick loop, not per call."""
+        users = self._typing.get(group_id)
+        if is_typing:
+            expires_at = time.monotonic() + settings.REALTIME_TYPING_TTL_SECONDS
+            users = self._typing.setdefault(group_id, {})
+            if user_id not in users:
+                self._typing_dirty.add(group_id)
+            users[user_id] = expires_at
+        elif users and users.pop(user_id, None) is not None:
+            self._typing_dirty.add(group_id)
+        if self._typing_dirty and (self._typing_task is None or self._typing_task.done()):
+            self._typing_task = asyncio.create_task(self._typing_loop())
+
+    def clear_typing(self, group_id: int, user_id: int) -> None:
+        self.set_typing(group_id, user_id, False)
+
+    def _expire_typing(self, now: float) -> None:
+        for group_id, users in list(self._typing.items()):
+            expired = [user_id for user_id, expires_at in users.items() if expires_at <= now]
+            for user_id in expired:
+                users.pop(user_id, None)
+            if expired:
+                self._typing_dirty.add(group_id)
+            if not users:
+                self._typing.pop(group_id, None)
+
+    def _typing_delta(self, group_id: int) -> dict[str, bool]:
+        current = set(self._typing.get(group_id, {}))
+        announced = self._typing_announced.get(group_id, set())
+        delta = {str(user_id): True for user_id in current - announced}
+        delta.update({str(user_id): False for user_id in announced - current})
+        if current:
+            self._typing_announced[group_id] = current
+        else:
+            self._typing_announced.pop(group_id, None)
+        return delta
+
+    async def _typing_loop(self) -> None:
+        interval = settings.REALTIME_TYPING_TICK_MS / 1000.0
+        while self._typing or self._typing_dirty:
+            await asyncio.sleep(interval)
+            self._expire_typing(time.monotonic())
+            dirty = list(self._typing_dirty)
+            self._typing_dirty.clear()
+            for group_id in dirty:
+                delta = self._typing_delta(group_id)
+                if not delta:
+                    continue
+                try:
+                    await self.broadcast(group_id, {"type": "typing", "users": delta})
+                except Exception:
+                    continue
+
 
 realtime_manager = ConnectionManager(redis_url=settings.REDIS_URL)
 
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Postgres advisory lock key held by the scheduler leader ("spls").
+SCHEDULER_LOCK_KEY = 0x73706C73
+
+SCHEDULER_LEADER = Gauge(
+    "splendoura_scheduler_leader",
+    "1 in the worker currently running scheduled maintenance tasks.",
+    multiprocess_mode="livesum",
+)
+SCHEDULER_TASK_RUNS_TOTAL = Counter(
+    "splendoura_scheduler_task_runs_total",
+    "Scheduled task runs by task and result.",
+    ["task", "result"],
+)
+
+
+@dataclass
+class _PeriodicTask:
+    name: str
+    func: Callable[[], None]
+    interval_seconds: float
+
+
+class LeaderScheduler:
+    """Runs periodic maintenance tasks in exactly one worker process.
+
+    Every worker polls for a Postgres session-level advisory lock held on a
+    dedicated autocommit connection; the holder is the leader and runs due
+    tasks in a thread, the others keep retrying and take over if the leader
+    exits or its connection drops. A new leader runs every task right away.
+    Other databases (local SQLite) have a single process, which always leads.
+    """
+
+    def __init__(self, *, tick_seconds: float = 60.0, lock_key: int = SCHEDULER_LOCK_KEY) -> None:
+        self._tick = tick_seconds
+        self._lock_key = lock_key
+        self._tasks: dict[str, _PeriodicTask] = {}
+        self._last_run: dict[str, float] = {}
+        self._lock_connection: Connection | None = None
+        self._runner: asyncio.Task | None = None
+        # Serialises a tick still running in its thread with the release on stop.
+        self._mutex = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    def periodic(self, name: str, *, interval_seconds: float) -> Callable[[Callable[[], None]], Callable[[], None]]:
+        def register(func: Callable[[], None]) -> Callable[[], None]:
+            self._tasks[name] = _PeriodicTask(name=name, func=func, interval_seconds=interval_seconds)
+            return func
+
+        return register
+
+    async def start(self) -> None:
+        if self.running or not settings.SCHEDULER_ENABLED:
+            return
+        self._runner = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._runner.cancel()
+        await asyncio.gather(self._runner, return_exceptions=True)
+        self._runner = None
+        await asyncio.to_thread(self._release)
+
+    def _is_leader(self) -> bool:
+        if engine.dialect.name != "postgresql":
+            return True
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                logger.warning("scheduler_leadership_lost")
+                self._lock_connection.invalidate()
+                self._lock_connection = None
+                SCHEDULER_LEADER.set(0)
+        connection = None
+        try:
+            connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self._lock_key}
+            ).scalar()
+        except Exception:
+            logger.exception("scheduler_lock_failed")
+            if connection is not None:
+                connection.invalidate()
+            return False
+        if not acquired:
+            connection.close()
+            return False
+        self._lock_connection = connection
+        self._last_run.clear()
+        SCHEDULER_LEADER.set(1)
+        logger.info("scheduler_leadership_acquired")
+        return True
+
+    def _release(self) -> None:
+        with self._mutex:
+            self._release_locked()
+
+    def _release_locked(self) -> None:
+        if self._lock_connection is None:
+            return
+        try:
+            self._lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._lock_key})
+            self._lock_connection.close()
+        except Exception:
+            # A broken connection has released the lock server-side already.
+            self._lock_connection.invalidate()
+        self._lock_connection = None
+        SCHEDULER_LEADER.set(0)
+
+    def _run_due(self) -> None:
+        now = time.monotonic()
+        for task in list(self._tasks.values()):
+            last_run = self._last_run.get(task.name)
+            if last_run is not None and now - last_run < task.interval_seconds:
+                continue
+            self._last_run[task.name] = now
+            try:
+                task.func()
+            except Exception:
+                SCHEDULER_TASK_RUNS_TOTAL.labels(task=task.name, result="error").inc()
+                logger.exception("scheduled_task_failed task=%s", task.name)
+            else:
+                SCHEDULER_TASK_RUNS_TOTAL.labels(task=task.name, result="ok").inc()
+
+    def _tick_once(self) -> None:
+        with self._mutex:
+            if self._is_leader():
+                self._run_due()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._tick_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("scheduler_tick_failed")
+            await asyncio.sleep(self._tick)
+
+
+scheduler = LeaderScheduler(tick_seconds=settings.SCHEDULER_TICK_SECONDS)
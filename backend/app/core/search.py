@@ -0,0 +1,270 @@
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from sqlalchemy import Float, and_, cast, func, literal, literal_column, or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.models.membership import JoinStatus
+
+# Rendered inline so the expression is textually the one indexed by
+# ix_group_messages_content_fts (migration b0c1d2e3f4a5); Postgres only uses
+# an expression index for an identical expression. Changing the config needs
+# a migration that rebuilds that index with the new value.
+_TS_CONFIG = literal_column("'simple'")
+# Groups kept in the fallback index per process before the least recently
+# searched one is dropped (and reloaded from the database on its next search).
+_FALLBACK_MAX_GROUPS = 256
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_HIGHLIGHT_START = "<b>"
+_HIGHLIGHT_STOP = "</b>"
+_SNIPPET_WORDS = 24
+
+
+def _tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def searchable_group_ids(db: Session, user_id: int) -> list[int]:
+    """Groups whose chat history the user may read (approved member or creator)."""
+    member_rows = (
+        db.query(models.Membership.group_id)
+        .join(models.Group, models.Group.id == models.Membership.group_id)
+        .filter(
+            models.Membership.user_id == user_id,
+            models.Membership.join_status == JoinStatus.APPROVED,
+            models.Membership.deleted_at.is_(None),
+            models.Group.deleted_at.is_(None),
+        )
+        .all()
+    )
+    creator_rows = (
+        db.query(models.Group.id)
+        .filter(models.Group.creator_id == user_id, models.Group.deleted_at.is_(None))
+        .all()
+    )
+    return sorted({row[0] for row in member_rows} | {row[0] for row in creator_rows})
+
+
+def _highlight_snippet(content: str, terms: set[str]) -> str:
+    words = content.split()
+    if not words:
+        return ""
+    first_hit = 0
+    for index, word in enumerate(words):
+        if any(token in terms for token in _tokenize(word)):
+            first_hit = index
+            break
+    start = max(first_hit - _SNIPPET_WORDS // 3, 0)
+    window = words[start : start + _SNIPPET_WORDS]
+    highlighted = [
+        f"{_HIGHLIGHT_START}{word}{_HIGHLIGHT_STOP}"
+        if any(token in terms for token in _tokenize(word))
+        else word
+        for word in window
+    ]
+    snippet = " ".join(highlighted)
+    if start > 0:
+        snippet = f"... {snippet}"
+    if start + _SNIPPET_WORDS < len(words):
+        snippet = f"{snippet} ..."
+    return snippet
+
+
+class MessageSearchIndex:
+    """In-process inverted index used when Postgres full-text search is unavailable.
+
+    Meant for local development and tests on SQLite only: each process loads
+    a group's history on its first search and only learns about messages
+    created in that same process via ``add``. Up to ``max_groups`` groups are
+    kept, least recently searched first out. Deleted messages are filtered
+    when results are loaded from the database.
+    """
+
+    def __init__(self, *, max_groups: int = _FALLBACK_MAX_GROUPS) -> None:
+        self._max_groups = max(1, max_groups)
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self._message_groups: dict[int, int] = {}
+        self._message_tokens: dict[int, tuple[int, tuple[str, ...]]] = {}
+        self._loaded_groups: OrderedDict[int, set[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, message_id: int, group_id: int, content: str | None) -> None:
+        tokens = _tokenize(content)
+        if not tokens:
+            return
+        counts = Counter(tokens)
+        self._message_groups[message_id] = group_id
+        self._message_tokens[message_id] = (len(tokens), tuple(counts))
+        self._loaded_groups[group_id].add(message_id)
+        for token, count in counts.items():
+            self._postings[token][message_id] = count
+
+    def _evict(self, group_id: int) -> None:
+        for message_id in self._loaded_groups.pop(group_id, ()):
+            self._message_groups.pop(message_id, None)
+            _, tokens = self._message_tokens.pop(message_id, (0, ()))
+            for token in tokens:
+                posting = self._postings.get(token)
+                if posting is None:
+                    continue
+                posting.pop(message_id, None)
+                if not posting:
+                    del self._postings[token]
+
+    def add(self, message: models.GroupMessage) -> None:
+        with self._lock:
+            if message.group_id in self._loaded_groups:
+                self._index(message.id, message.group_id, message.content)
+
+    def _ensure_groups(self, db: Session, group_ids: list[int]) -> None:
+        with self._lock:
+            for group_id in group_ids:
+                if group_id in self._loaded_groups:
+                    self._loaded_groups.move_to_end(group_id)
+            missing = [group_id for group_id in group_ids if group_id not in self._loaded_groups]
+        if not missing:
+            return
+        rows = (
+            db.query(models.GroupMessage.id, models.GroupMessage.group_id, models.GroupMessage.content)
+            .filter(
+                models.GroupMessage.group_id.in_(missing),
+                models.GroupMessage.content.is_not(None),
+            )
+            .all()
+        )
+        with self._lock:
+            for group_id in missing:
+                self._loaded_groups.setdefault(group_id, set())
+            for message_id, group_id, content in rows:
+                self._index(message_id, group_id, content)
+            # The groups being searched are the most recent, so they are never the ones dropped.
+            while len(self._loaded_groups) > max(self._max_groups, len(group_ids)):
+                self._evict(next(iter(self._loaded_groups)))
+
+    def search(self, db: Session, group_ids: list[int], terms: list[str]) -> list[tuple[float, int]]:
+        self._ensure_groups(db, group_ids)
+        allowed = set(group_ids)
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not postings or any(not posting for posting in postings):
+                return []
+            candidates = set.intersection(*(set(posting) for posting in postings))
+            scored: list[tuple[float, int]] = []
+            for message_id in candidates:
+                if self._message_groups.get(message_id) not in allowed:
+                    continue
+                hits = sum(posting[message_id] for posting in postings)
+                length = self._message_tokens.get(message_id, (1, ()))[0] or 1
+                scored.append((round(hits / length, 6), message_id))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return scored
+
+
+message_search_index = MessageSearchIndex()
+
+
+def _search_postgres(
+    db: Session,
+    *,
+    group_ids: list[int],
+    query: str,
+    cursor: tuple[float, int] | None,
+    limit: int,
+) -> list[tuple[models.GroupMessage, float, str]]:
+    config = _TS_CONFIG
+    document = func.to_tsvector(config, func.coalesce(models.GroupMessage.content, ""))
+    ts_query = func.websearch_to_tsquery(config, query)
+    # ts_rank returns real; compare as double precision so the cursor rank,
+    # which round-trips through JSON as a Python float, matches the row exactly.
+    rank = cast(func.ts_rank(document, ts_query), Float(precision=53))
+    headline = func.ts_headline(
+        config,
+        models.GroupMessage.content,
+        ts_query,
+        f"StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_STOP}, MaxWords={_SNIPPET_WORDS}, MinWords=8",
+    )
+    ranked = (
+        db.query(models.GroupMessage.id.label("id"), rank.label("rank"))
+        .filter(
+            models.GroupMessage.group_id.in_(group_ids),
+            models.GroupMessage.deleted_at.is_(None),
+            document.op("@@")(ts_query),
+        )
+        .subquery()
+    )
+    rows_query = db.query(models.GroupMessage, ranked.c.rank, headline).join(
+        ranked, ranked.c.id == models.GroupMessage.id
+    )
+    if cursor:
+        cursor_rank, cursor_id = cursor
+        cursor_rank_value = literal(cursor_rank, Float(precision=53))
+        rows_query = rows_query.filter(
+            or_(
+                ranked.c.rank < cursor_rank_value,
+                and_(ranked.c.rank == cursor_rank_value, ranked.c.id < cursor_id),
+            )
+        )
+    rows = rows_query.order_by(ranked.c.rank.desc(), ranked.c.id.desc()).limit(limit).all()
+    return [(message, float(row_rank or 0.0), snippet or "") for message, row_rank, snippet in rows]
+
+
+def _search_fallback(
+    db: Session,
+    *,
+    group_ids: list[int],
+    query: str,
+    cursor: tuple[float, int] | None,
+    limit: int,
+) -> list[tuple[models.GroupMessage, float, str]]:
+    terms = list(dict.fromkeys(_tokenize(query)))
+    if not terms:
+        return []
+    scored = message_search_index.search(db, group_ids, terms)
+    if cursor:
+        scored = [item for item in scored if item < cursor]
+    results: list[tuple[models.GroupMessage, float, str]] = []
+    term_set = set(terms)
+    # Over-fetch in chunks so deleted messages don't shorten the page.
+    offset = 0
+    while len(results) < limit and offset < len(scored):
+        chunk = scored[offset : offset + limit * 2]
+        offset += len(chunk)
+        messages = {
+            message.id: message
+            for message in db.query(models.GroupMessage).filter(
+                models.GroupMessage.id.in_([message_id for _, message_id in chunk]),
+                models.GroupMessage.deleted_at.is_(None),
+            )
+        }
+        for score, message_id in chunk:
+            message = messages.get(message_id)
+            if message is None:
+                continue
+            results.append((message, score, _highlight_snippet(message.content or "", term_set)))
+            if len(results) >= limit:
+                break
+    return results
+
+
+def search_messages(
+    db: Session,
+    *,
+    user_id: int,
+    query: str,
+    group_id: int | None = None,
+    cursor: tuple[float, int] | None = None,
+    limit: int = 20,
+) -> list[tuple[models.GroupMessage, float, str]]:
+    """Return ``(message, rank, snippet)`` tuples ordered by rank, then id, descending."""
+    group_ids = searchable_group_ids(db, user_id)
+    if group_id is not None:
+        group_ids = [value for value in group_ids if value == group_id]
+    if not group_ids or not query.strip():
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, group_ids=group_ids, query=query, cursor=cursor, limit=limit)
+    return _search_fallback(db, group_ids=group_ids, query=query, cursor=cursor, limit=limit)
@@ -66,6 +66,22 @@ def create_refresh_token(
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=REFRESH_ALGORITHM)
 
 
+def create_profile_token(subject: Union[str, Any], *, expires_delta: timedelta) -> str:
+    """Token for the X-Profile-Token header, which opts one request into profiling."""
+    now = datetime.now(timezone.utc)
+    to_encode = {
+        "exp": now + expires_delta,
+        "iat": now,
+        "nbf": now,
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "sub": str(subject),
+        "type": "profile",
+        "jti": create_token_id(),
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
 def decode_token(token: str, *, expected_type: str | None = None) -> dict[str, Any]:
     payload = jwt.decode(
         token,
@@ -1,14 +1,110 @@
 import io
+import json
+import logging
 import mimetypes
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterator
 from urllib.parse import quote
 
 import httpx
+import redis
 from PIL import Image, ImageOps
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds its size limit while being read."""
+
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client_lock = threading.Lock()
+_sync_client: httpx.Client | None = None
+# Runs thumbnail uploads alongside the original on the shared sync client.
+_upload_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="storage-upload")
+
+
+def _http2_enabled() -> bool:
+    if not settings.SUPABASE_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=30,
+    )
+
+
+def get_storage_client() -> httpx.Client:
+    """Shared keep-alive client for Supabase storage calls from sync code."""
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                timeout=httpx.Timeout(60, connect=10),
+                transport=httpx.HTTPTransport(
+                    http2=_http2_enabled(), limits=_client_limits(), retries=1
+                ),
+            )
+        return _sync_client
+
+
+def close_storage_client() -> None:
+    global _sync_client
+    with _client_lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+
+
+def _retry_delay(attempt: int) -> float:
+    return min(settings.SUPABASE_HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt), 8.0)
+
+
+def _send(
+    method: str,
+    url: str,
+    *,
+    headers: dict[str, str],
+    json: dict | None = None,
+    content: bytes | None = None,
+    content_factory: Callable[[], Iterator[bytes]] | None = None,
+) -> httpx.Response:
+    """Send a storage request, retrying transport errors, 429 and 5xx with backoff.
+
+    Streaming bodies are passed as ``content_factory`` so each attempt gets a
+    fresh iterator.
+    """
+    client = get_storage_client()
+    attempts = settings.SUPABASE_HTTP_RETRIES + 1
+    for attempt in range(attempts):
+        body = content_factory() if content_factory else content
+        try:
+            response = client.request(method, url, headers=headers, json=json, content=body)
+        except httpx.TransportError:
+            if attempt + 1 >= attempts:
+                raise
+        else:
+            if response.status_code not in _RETRY_STATUSES or attempt + 1 >= attempts:
+                return response
+        time.sleep(_retry_delay(attempt))
+    raise RuntimeError("unreachable")
+
 
 def _supabase_headers() -> dict[str, str]:
     service_key = settings.SUPABASE_SERVICE_ROLE_KEY or ""
@@ -25,7 +121,7 @@ def build_public_url(object_key: str) -> str:
     return f"{base_url}/storage/v1/object/public/{bucket}/{encoded_key}"
 
 
-def create_signed_url(object_key: str, *, expires_in: int | None = None) -> str:
+def _sign_target(object_key: str, expires_in: int | None) -> tuple[str, dict]:
     if not supabase_storage_enabled():
         raise RuntimeError("Supabase storage is not configured.")
     base_url = (settings.SUPABASE_URL or "").rstrip("/")
@@ -33,13 +129,11 @@ def create_signed_url(object_key: str, *, expires_in: int | None = None) -> str:
     encoded_key = quote(object_key, safe="/")
     sign_url = f"{base_url}/storage/v1/object/sign/{bucket}/{encoded_key}"
     payload = {"expiresIn": expires_in or settings.SUPABASE_SIGNED_URL_EXPIRE_SECONDS}
+    return sign_url, payload
 
-    with httpx.Client(timeout=20) as client:
-        response = client.post(sign_url, json=payload, headers=_supabase_headers())
-        if response.status_code >= 400:
-            raise RuntimeError(f"Supabase sign failed: {response.status_code} {response.text}")
-        data = response.json()
 
+def _absolute_signed_url(data: dict) -> str:
+    base_url = (settings.SUPABASE_URL or "").rstrip("/")
     signed_path = data.get("signedURL") or data.get("signedUrl") or ""
     if not signed_path:
         raise RuntimeError("Supabase sign failed: missing signed URL")
@@ -52,6 +146,168 @@ def create_signed_url(object_key: str, *, expires_in: int | None = None) -> str:
     return f"{base_url}{signed_path}"
 
 
+def create_signed_url(object_key: str, *, expires_in: int | None = None) -> str:
+    sign_url, payload = _sign_target(object_key, expires_in)
+    response = _send("POST", sign_url, json=payload, headers=_supabase_headers())
+    if response.status_code >= 400:
+        raise RuntimeError(f"Supabase sign failed: {response.status_code} {response.text}")
+    return _absolute_signed_url(response.json())
+
+
+def create_signed_urls(object_keys: list[str], *, expires_in: int | None = None) -> dict[str, str]:
+    """Sign many objects with one call to Supabase's bulk ``/object/sign/{bucket}`` API.
+
+    Keys Supabase reports as errors (e.g. missing objects) are left out.
+    """
+    if not supabase_storage_enabled():
+        raise RuntimeError("Supabase storage is not configured.")
+    if not object_keys:
+        return {}
+    base_url = (settings.SUPABASE_URL or "").rstrip("/")
+    bucket = settings.SUPABASE_STORAGE_BUCKET or ""
+    payload = {
+        "expiresIn": expires_in or settings.SUPABASE_SIGNED_URL_EXPIRE_SECONDS,
+        "paths": object_keys,
+    }
+    response = _send(
+        "POST",
+        f"{base_url}/storage/v1/object/sign/{bucket}",
+        json=payload,
+        headers=_supabase_headers(),
+    )
+    if response.status_code >= 400:
+        raise RuntimeError(f"Supabase sign failed: {response.status_code} {response.text}")
+    signed: dict[str, str] = {}
+    for item in response.json() or []:
+        path = item.get("path")
+        if not path or item.get("error"):
+            continue
+        try:
+            signed[path] = _absolute_signed_url(item)
+        except RuntimeError:
+            continue
+    return signed
+
+
+class SignedUrlCache:
+    """Signed URLs reused until shortly before they expire.
+
+    Entries are shared through Redis when ``REDIS_URL`` is set so every worker
+    hands out the same URL (which also lets browsers and the CDN cache the
+    object); otherwise each process keeps a bounded LRU.
+    """
+
+    def __init__(self, *, redis_url: str | None = None, max_entries: int = 5000) -> None:
+        self._redis_url = redis_url
+        self._redis: redis.Redis | None = None
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(object_key: str) -> str:
+        return f"storage:signed:{settings.SUPABASE_STORAGE_BUCKET}:{object_key}"
+
+    def _get_redis(self) -> redis.Redis | None:
+        if not self._redis_url:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(self._redis_url, decode_responses=True)
+        return self._redis
+
+    def get_many(self, object_keys: list[str]) -> dict[str, tuple[str, float]]:
+        """Return ``{object_key: (signed_url, expires_at)}`` for cached keys."""
+        now = time.time()
+        found: dict[str, tuple[str, float]] = {}
+        client = self._get_redis()
+        if client is not None:
+            try:
+                values = client.mget([self._key(key) for key in object_keys])
+            except Exception:
+                logger.exception("signed_url_cache_read_failed")
+                values = [None] * len(object_keys)
+            for object_key, raw in zip(object_keys, values):
+                if not raw:
+                    continue
+                entry = json.loads(raw)
+                if entry["expires_at"] > now:
+                    found[object_key] = (entry["url"], entry["expires_at"])
+            return found
+        with self._lock:
+            for object_key in object_keys:
+                entry = self._entries.get(object_key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    self._entries.pop(object_key, None)
+                    continue
+                self._entries.move_to_end(object_key)
+                found[object_key] = entry
+        return found
+
+    def set_many(self, urls: dict[str, str], *, ttl: int) -> float:
+        expires_at = time.time() + ttl
+        client = self._get_redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                for object_key, url in urls.items():
+                    pipe.set(
+                        self._key(object_key),
+                        json.dumps({"url": url, "expires_at": expires_at}),
+                        ex=ttl,
+                    )
+                pipe.execute()
+            except Exception:
+                logger.exception("signed_url_cache_write_failed")
+            return expires_at
+        with self._lock:
+            for object_key, url in urls.items():
+                self._entries[object_key] = (url, expires_at)
+                self._entries.move_to_end(object_key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return expires_at
+
+
+signed_url_cache = SignedUrlCache(redis_url=settings.REDIS_URL)
+
+
+def get_signed_urls(object_keys: list[str]) -> dict[str, tuple[str, int]]:
+    """Return ``{object_key: (signed_url, seconds_left)}``, signing only uncached keys.
+
+    Cached URLs are handed out until ``SUPABASE_SIGNED_URL_CACHE_MARGIN_SECONDS``
+    before they expire, so clients always receive at least that much validity.
+    """
+    keys = list(dict.fromkeys(object_keys))
+    expire_seconds = settings.SUPABASE_SIGNED_URL_EXPIRE_SECONDS
+    ttl = expire_seconds - settings.SUPABASE_SIGNED_URL_CACHE_MARGIN_SECONDS
+    now = time.time()
+    results: dict[str, tuple[str, int]] = {}
+    cached = signed_url_cache.get_many(keys) if ttl > 0 else {}
+    for object_key, (url, expires_at) in cached.items():
+        results[object_key] = (url, int(expires_at - now) + settings.SUPABASE_SIGNED_URL_CACHE_MARGIN_SECONDS)
+    missing = [key for key in keys if key not in results]
+    if not missing:
+        return results
+    if len(missing) == 1:
+        fresh = {missing[0]: create_signed_url(missing[0], expires_in=expire_seconds)}
+    else:
+        fresh = create_signed_urls(missing, expires_in=expire_seconds)
+    if ttl > 0 and fresh:
+        signed_url_cache.set_many(fresh, ttl=ttl)
+    for object_key, url in fresh.items():
+        results[object_key] = (url, expire_seconds)
+    return results
+
+
+def get_signed_url(object_key: str) -> tuple[str, int]:
+    signed = get_signed_urls([object_key])
+    if object_key not in signed:
+        raise RuntimeError("Supabase sign failed: missing signed URL")
+    return signed[object_key]
+
+
 def supabase_storage_enabled() -> bool:
     return bool(
         settings.SUPABASE_URL
@@ -76,25 +332,61 @@ def _guess_extension(filename: str | None, content_type: str | None) -> str:
     return guessed or ""
 
 
-def upload_bytes_to_supabase(
+def file_size(fileobj: BinaryIO) -> int:
+    position = fileobj.tell()
+    size = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(position)
+    return size
+
+
+def iter_file_chunks(
+    fileobj: BinaryIO,
+    *,
+    max_bytes: int | None = None,
+    chunk_size: int | None = None,
+) -> Iterator[bytes]:
+    """Yield ``fileobj`` in chunks, raising ``UploadTooLargeError`` past ``max_bytes``."""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    total = 0
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise UploadTooLargeError(f"upload exceeds {max_bytes} bytes")
+        yield chunk
+
+
+def read_file_limited(fileobj: BinaryIO, *, max_bytes: int) -> bytes:
+    return b"".join(iter_file_chunks(fileobj, max_bytes=max_bytes))
+
+
+def copy_file_limited(fileobj: BinaryIO, destination: BinaryIO, *, max_bytes: int) -> int:
+    written = 0
+    for chunk in iter_file_chunks(fileobj, max_bytes=max_bytes):
+        destination.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _upload_target(
     *,
     prefix: str,
     filename: str | None,
     content_type: str | None,
-    data: bytes,
-    bucket: str | None = None,
-    public: bool | None = None,
-    cache_control: str | None = None,
-) -> str:
+    bucket: str | None,
+    cache_control: str | None,
+) -> tuple[str, str, str, dict[str, str]]:
     if not (settings.SUPABASE_URL and settings.SUPABASE_SERVICE_ROLE_KEY):
         raise RuntimeError("Supabase storage is not configured.")
-    base_url = (settings.SUPABASE_URL or "").rstrip("/")
     bucket = bucket or settings.SUPABASE_STORAGE_BUCKET or ""
     if not bucket:
         raise RuntimeError("Supabase storage bucket is not configured.")
     ext = _guess_extension(filename, content_type)
     object_key = f"{prefix}/{uuid.uuid4().hex}{ext}" if prefix else f"{uuid.uuid4().hex}{ext}"
     encoded_key = quote(object_key, safe="/")
+    base_url = (settings.SUPABASE_URL or "").rstrip("/")
     upload_url = f"{base_url}/storage/v1/object/{bucket}/{encoded_key}"
 
     headers = {
@@ -104,20 +396,110 @@ def upload_bytes_to_supabase(
     }
     if cache_control:
         headers["cache-control"] = cache_control
+    return bucket, encoded_key, upload_url, headers
 
-    with httpx.Client(timeout=60) as client:
-        response = client.post(upload_url, content=data, headers=headers)
-        if response.status_code >= 400:
-            response = client.put(upload_url, content=data, headers=headers)
-        if response.status_code >= 400:
-            raise RuntimeError(f"Supabase upload failed: {response.status_code} {response.text}")
 
+def _uploaded_object_url(*, bucket: str, encoded_key: str, public: bool | None) -> str:
+    base_url = (settings.SUPABASE_URL or "").rstrip("/")
     is_public = settings.SUPABASE_STORAGE_PUBLIC if public is None else public
     if is_public:
         return f"{base_url}/storage/v1/object/public/{bucket}/{encoded_key}"
     return f"/api/v1/storage/{encoded_key}"
 
 
+def upload_bytes_to_supabase(
+    *,
+    prefix: str,
+    filename: str | None,
+    content_type: str | None,
+    data: bytes,
+    bucket: str | None = None,
+    public: bool | None = None,
+    cache_control: str | None = None,
+) -> str:
+    bucket, encoded_key, upload_url, headers = _upload_target(
+        prefix=prefix,
+        filename=filename,
+        content_type=content_type,
+        bucket=bucket,
+        cache_control=cache_control,
+    )
+
+    response = _send("POST", upload_url, content=data, headers=headers)
+    if response.status_code >= 400:
+        response = _send("PUT", upload_url, content=data, headers=headers)
+    if response.status_code >= 400:
+        raise RuntimeError(f"Supabase upload failed: {response.status_code} {response.text}")
+
+    return _uploaded_object_url(bucket=bucket, encoded_key=encoded_key, public=public)
+
+
+def upload_many_bytes_to_supabase(
+    items: list[dict],
+    *,
+    bucket: str | None = None,
+    public: bool | None = None,
+    cache_control: str | None = None,
+) -> list[str]:
+    """Upload several objects concurrently; ``items`` hold prefix, filename, content_type, data.
+
+    Returns URLs in the order of ``items``.
+    """
+    futures = [
+        _upload_executor.submit(
+            upload_bytes_to_supabase,
+            bucket=bucket,
+            public=public,
+            cache_control=cache_control,
+            **item,
+        )
+        for item in items
+    ]
+    return [future.result() for future in futures]
+
+
+def upload_file_to_supabase(
+    *,
+    prefix: str,
+    filename: str | None,
+    content_type: str | None,
+    fileobj: BinaryIO,
+    max_bytes: int,
+    bucket: str | None = None,
+    public: bool | None = None,
+    cache_control: str | None = None,
+) -> str:
+    """Stream a file object to Supabase in chunks without loading it into memory.
+
+    The file must be seekable (``UploadFile.file`` or a spool file) so the
+    PUT fallback can re-read it from the start.
+    """
+    start = fileobj.tell()
+    size = file_size(fileobj) - start
+    if size > max_bytes:
+        raise UploadTooLargeError(f"upload exceeds {max_bytes} bytes")
+    bucket, encoded_key, upload_url, headers = _upload_target(
+        prefix=prefix,
+        filename=filename,
+        content_type=content_type,
+        bucket=bucket,
+        cache_control=cache_control,
+    )
+    headers["Content-Length"] = str(size)
+
+    def body() -> Iterator[bytes]:
+        fileobj.seek(start)
+        return iter_file_chunks(fileobj, max_bytes=max_bytes)
+
+    response = _send("POST", upload_url, content_factory=body, headers=headers)
+    if response.status_code >= 400:
+        response = _send("PUT", upload_url, content_factory=body, headers=headers)
+    if response.status_code >= 400:
+        raise RuntimeError(f"Supabase upload failed: {response.status_code} {response.text}")
+
+    return _uploaded_object_url(bucket=bucket, encoded_key=encoded_key, public=public)
+
+
 def normalize_group_image_bytes(image_bytes: bytes, *, target_size: int = 1024) -> tuple[bytes, str]:
     if target_size <= 0:
         raise ValueError("target_size must be positive")
@@ -168,6 +550,14 @@ def upload_public_image_with_thumbnail(
         raise RuntimeError("Supabase public storage bucket is not configured.")
     bucket = settings.SUPABASE_PUBLIC_STORAGE_BUCKET or ""
     cache_control = settings.SUPABASE_PUBLIC_STORAGE_CACHE_CONTROL
+    # Build and upload the thumbnail while the original is uploading.
+    thumb_future = _upload_executor.submit(
+        _upload_public_thumbnail,
+        prefix=prefix,
+        data=data,
+        bucket=bucket,
+        cache_control=cache_control,
+    )
     full_url = upload_bytes_to_supabase(
         prefix=prefix,
         filename=filename,
@@ -177,15 +567,25 @@ def upload_public_image_with_thumbnail(
         public=True,
         cache_control=cache_control,
     )
+    return full_url, thumb_future.result()
+
+
+def _upload_public_thumbnail(
+    *,
+    prefix: str,
+    data: bytes,
+    bucket: str,
+    cache_control: str | None,
+) -> str | None:
     thumb = _create_thumbnail_bytes(
         data,
         max_size=settings.SUPABASE_PUBLIC_THUMBNAIL_MAX_SIZE,
     )
     if not thumb:
-        return full_url, None
+        return None
     thumb_bytes, thumb_type = thumb
     thumb_prefix = f"{prefix}/thumbs" if prefix else "thumbs"
-    thumb_url = upload_bytes_to_supabase(
+    return upload_bytes_to_supabase(
         prefix=thumb_prefix,
         filename="thumb.jpg",
         content_type=thumb_type,
@@ -194,7 +594,6 @@ def upload_public_image_with_thumbnail(
         public=True,
         cache_control=cache_control,
     )
-    return full_url, thumb_url
 
 
 def upload_public_bytes_to_supabase(
@@ -217,3 +616,25 @@ def upload_public_bytes_to_supabase(
         public=True,
         cache_control=cache_control,
     )
+
+
+def upload_public_file_to_supabase(
+    *,
+    prefix: str,
+    filename: str | None,
+    content_type: str | None,
+    fileobj: BinaryIO,
+    max_bytes: int,
+) -> str:
+    if not supabase_public_storage_enabled():
+        raise RuntimeError("Supabase public storage bucket is not configured.")
+    return upload_file_to_supabase(
+        prefix=prefix,
+        filename=filename,
+        content_type=content_type,
+        fileobj=fileobj,
+        max_bytes=max_bytes,
+        bucket=settings.SUPABASE_PUBLIC_STORAGE_BUCKET or "",
+        public=True,
+        cache_control=settings.SUPABASE_PUBLIC_STORAGE_CACHE_CONTROL,
+    )
@@ -1,7 +1,8 @@
 # backend/app/crud/crud_group.py
-from datetime import datetime, timezone
+from datetime import datetime
 from sqlalchemy import and_, exists, or_
 from sqlalchemy.orm import Session
+from app.core.pagination import cursor_timestamp, cursor_timestamp_value
 from app.models.group import AppliesTo, Group, GroupRequirement
 from app.models.direct_thread import DirectThread
 from app.models.swipe_history import SwipeAction, SwipeHistory, SwipeTargetType
@@ -96,15 +97,15 @@ class CRUDGroup:
                 query = query.filter(GroupRequirement.min_age <= min_age)
             if max_age is not None:
                 query = query.filter(GroupRequirement.max_age >= max_age)
-        query = query.order_by(Group.created_at.desc(), Group.id.desc())
+        created_at = cursor_timestamp(db, Group.created_at)
+        query = query.order_by(created_at.desc(), Group.id.desc())
         if cursor:
-            cursor_created_at, cursor_id = cursor
-            if cursor_created_at.tzinfo is None:
-                cursor_created_at = cursor_created_at.replace(tzinfo=timezone.utc)
+            cursor_created_at = cursor_timestamp_value(db, cursor[0])
+            cursor_id = cursor[1]
             query = query.filter(
                 or_(
-                    Group.created_at < cursor_created_at,
-                    and_(Group.created_at == cursor_created_at, Group.id < cursor_id),
+                    created_at < cursor_created_at,
+                    and_(created_at == cursor_created_at, Group.id < cursor_id),
                 )
             )
             return query.limit(limit).all()
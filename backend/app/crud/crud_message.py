@@ -0,0 +1,72 @@
+from sqlalchemy import literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.message import GroupMessage, GroupMessageRead
+
+
+class CRUDMessageRead:
+    def mark_read(
+        self,
+        db: Session,
+        *,
+        group_id: int,
+        user_id: int,
+        message_ids: list[int] | None = None,
+        up_to_id: int | None = None,
+    ) -> list[int]:
+        """Record read receipts in one statement and return the newly inserted message ids.
+
+        ``message_ids`` marks explicit messages; ``up_to_id`` marks every message
+        from other members in the group with an id at or below the marker, so
+        clients can debounce receipts while scrolling.
+        """
+        conditions = []
+        if message_ids:
+            conditions.append(GroupMessage.id.in_(message_ids))
+        if up_to_id is not None:
+            conditions.append((GroupMessage.id <= up_to_id) & (GroupMessage.sender_id != user_id))
+        if not conditions:
+            return []
+        source = select(GroupMessage.id, literal(user_id)).where(
+            GroupMessage.group_id == group_id,
+            GroupMessage.deleted_at.is_(None),
+            or_(*conditions),
+        )
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            insert = postgresql.insert
+        elif dialect == "sqlite":
+            insert = sqlite.insert
+        else:
+            return self._mark_read_fallback(db, source=source, user_id=user_id)
+        statement = (
+            insert(GroupMessageRead)
+            .from_select(["message_id", "user_id"], source)
+            .on_conflict_do_nothing(index_elements=["message_id", "user_id"])
+            .returning(GroupMessageRead.message_id)
+        )
+        new_ids = [row[0] for row in db.execute(statement)]
+        db.commit()
+        return new_ids
+
+    def _mark_read_fallback(self, db: Session, *, source, user_id: int) -> list[int]:
+        valid_ids = {row[0] for row in db.execute(source)}
+        if not valid_ids:
+            return []
+        existing = {
+            row[0]
+            for row in db.query(GroupMessageRead.message_id).filter(
+                GroupMessageRead.user_id == user_id,
+                GroupMessageRead.message_id.in_(list(valid_ids)),
+            )
+        }
+        new_ids = [message_id for message_id in valid_ids if message_id not in existing]
+        for message_id in new_ids:
+            db.add(GroupMessageRead(message_id=message_id, user_id=user_id))
+        if new_ids:
+            db.commit()
+        return new_ids
+
+
+message_read = CRUDMessageRead()
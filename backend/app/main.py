@@ -6,9 +6,18 @@ from sqlalchemy import text
 import sentry_sdk
 from sentry_sdk.integrations.starlette import StarletteIntegration
 from app.api.v1.api import api_router
+from app.core import event_handlers  # noqa: F401  (registers domain event handlers)
 from app.core.config import settings
+from app.core.email import mail_queue
+from app.core.images import image_processing_pool
+from app.core.jobs import job_queue
+from app.core.moderation import moderation_service
 from app.core.observability import register_observability
+from app.core.profiler import register_request_profiling
+from app.core.push import push_dispatcher
+from app.core.scheduler import scheduler
 from app.core.security import get_password_hash
+from app.core.storage import close_storage_client
 from app.db.session import engine
 from app.db.session import SessionLocal
 from app.models import base
@@ -33,6 +42,7 @@ app = FastAPI(
     version="1.0.0"
 )
 register_observability(app)
+register_request_profiling(app)
 
 # CRITICAL: Configure CORS so your Next.js frontend (localhost:3000) 
 # can make requests to this FastAPI server (localhost:8000)
@@ -58,7 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Next-Cursor", "X-Request-ID"],
+    expose_headers=["X-Next-Cursor", "X-Next-After-Cursor", "X-Has-More", "X-Request-ID"],
 )
 
 if settings.REQUIRE_STRONG_SECRET_KEY:
@@ -82,6 +92,58 @@ def check_database_connection() -> None:
     except Exception as exc:
         print(f"Database connection failed: {exc}")
 
+@app.on_event("startup")
+async def start_job_queue() -> None:
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue() -> None:
+    await job_queue.stop()
+
+@app.on_event("startup")
+def start_mail_queue() -> None:
+    mail_queue.start()
+
+@app.on_event("shutdown")
+def stop_mail_queue() -> None:
+    mail_queue.stop()
+
+@app.on_event("startup")
+async def start_push_dispatcher() -> None:
+    await push_dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_push_dispatcher() -> None:
+    await push_dispatcher.stop()
+
+@app.on_event("startup")
+async def start_scheduler() -> None:
+    await scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler() -> None:
+    await scheduler.stop()
+
+@app.on_event("shutdown")
+def shutdown_storage_client() -> None:
+    close_storage_client()
+
+@app.on_event("startup")
+def start_image_processing_pool() -> None:
+    image_processing_pool.start()
+
+@app.on_event("shutdown")
+def stop_image_processing_pool() -> None:
+    image_processing_pool.stop()
+
+@app.on_event("startup")
+def start_moderation_service() -> None:
+    moderation_service.start()
+
+@app.on_event("shutdown")
+def stop_moderation_service() -> None:
+    moderation_service.stop()
+
 @app.get("/")
 def root():
     return {"message": "SocialSync API is running", "docs": "/docs"}
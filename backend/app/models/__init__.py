@@ -14,6 +14,7 @@ from .group_extras import (
 )
 from .membership import Membership
 from .push_token import UserPushToken
+from .push_outbox import PushOutbox
 from .report import Report
 from .message import GroupMessage, GroupMessageRead
 from .media import MediaBlob
@@ -22,3 +23,9 @@ from .swipe_history import SwipeHistory
 from .direct_thread import DirectThread
 from .auth_session import UserRefreshSession
 from .request_event import RequestEvent
+from .request_rollup import (
+    RequestIpRollup,
+    RequestIpUserRollup,
+    RequestLatencyRollup,
+    RequestRouteRollup,
+)
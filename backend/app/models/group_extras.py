@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import JSON, Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.models.base import Base, SoftDeleteMixin, TimestampMixin
 
@@ -17,6 +17,8 @@ class GroupMedia(Base, TimestampMixin, SoftDeleteMixin):
     uploader_id = Column(Integer, ForeignKey("users.id"), index=True)
     url = Column(String, nullable=False)
     thumb_url = Column(String, nullable=True)
+    # {"thumb"|"medium"|"full": {"width", "height", "jpeg", "webp", ...}}
+    variants = Column(JSON, nullable=True)
     media_type = Column(
         Enum(GroupMediaType, values_callable=lambda x: [e.value for e in x], name="groupmediatype")
     )
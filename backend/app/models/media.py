@@ -1,5 +1,5 @@
-from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy.orm import deferred, relationship
 from app.models.base import Base, SoftDeleteMixin, TimestampMixin
 
 
@@ -9,7 +9,12 @@ class MediaBlob(Base, TimestampMixin, SoftDeleteMixin):
     id = Column(Integer, primary_key=True)
     content_type = Column(String, nullable=False)
     filename = Column(String, nullable=True)
-    data = Column(LargeBinary, nullable=False)
+    # SHA-256 of the bytes; the key in the blob store (app.core.blob_store).
+    content_hash = Column(String(64), index=True, nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+    # Legacy in-database bytes, only set on rows not yet moved by
+    # scripts/migrate_media_blobs_to_store.py. Never loaded unless accessed.
+    data = deferred(Column(LargeBinary, nullable=True))
     created_by = Column(Integer, ForeignKey("users.id"), index=True, nullable=True)
 
     creator = relationship("User")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, JSON, String, Text, UniqueConstraint, func
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.models.base import Base, SoftDeleteMixin, TimestampMixin
 
@@ -12,6 +12,9 @@ class MessageType(str, enum.Enum):
 
 class GroupMessage(Base, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "group_messages"
+    __table_args__ = (
+        Index("ix_group_messages_group_created_id", "group_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     group_id = Column(Integer, ForeignKey("groups.id"), index=True)
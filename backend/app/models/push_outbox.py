@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+PUSH_STATUS_PENDING = "pending"
+PUSH_STATUS_SENDING = "sending"
+PUSH_STATUS_SENT = "sent"
+PUSH_STATUS_DELIVERED = "delivered"
+PUSH_STATUS_FAILED = "failed"
+PUSH_STATUS_EXPIRED = "expired"
+
+
+class PushOutbox(Base):
+    """One Expo push message per device token, delivered by ``PushDispatcher``.
+
+    ``pending`` rows are claimed when ``next_attempt_at`` has passed and
+    stay ``sending`` (retried at ``next_attempt_at``) until Expo accepts or
+    rejects them; ``sent`` rows hold an
+    Expo ticket id until the receipt is checked. Rows sharing a
+    ``collapse_key`` fold into one pending push per token, counted in
+    ``coalesced_count``.
+    """
+
+    __tablename__ = "push_outbox"
+    __table_args__ = (
+        Index("ix_push_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+        Index("ix_push_outbox_status_sent_at", "status", "sent_at"),
+        Index("ix_push_outbox_collapse_key_created_at", "collapse_key", "created_at"),
+        Index(
+            "uq_push_outbox_pending_collapse",
+            "collapse_key",
+            "token",
+            unique=True,
+            postgresql_where=text("status = 'pending' AND collapse_key IS NOT NULL"),
+            sqlite_where=text("status = 'pending' AND collapse_key IS NOT NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    token: Mapped[str] = mapped_column(String(255), nullable=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    data: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    collapse_key: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    coalesced_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=PUSH_STATUS_PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now()
+    )
+    ticket_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    error: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now()
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now(), server_default=func.now()
+    )
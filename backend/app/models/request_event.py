@@ -7,6 +7,13 @@ from app.models.base import Base
 
 
 class RequestEvent(Base):
+    """Raw request log written by the observability middleware.
+
+    On Postgres the migrations turn this into a table range-partitioned by
+    day on ``created_at`` (primary key ``(id, created_at)``), with partitions
+    managed by ``maintain_request_events``; ``id`` stays unique on its own.
+    """
+
     __tablename__ = "request_events"
     __table_args__ = (
         Index("ix_request_events_created_at", "created_at"),
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+ROLLUP_MINUTE = "minute"
+ROLLUP_HOUR = "hour"
+
+
+class RequestRouteRollup(Base):
+    """Request counts and latency totals per route for one minute or hour bucket.
+
+    Rows are only ever incremented by the request-event flush
+    (``app.core.analytics.record_request_rollups``), so dashboards read a
+    number of rows bounded by routes x buckets rather than by traffic.
+    """
+
+    __tablename__ = "request_route_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "bucket_start", "method", "route", name="uq_request_route_rollups_bucket"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    granularity: Mapped[str] = mapped_column(String(8), nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    method: Mapped[str] = mapped_column(String(16), nullable=False)
+    route: Mapped[str] = mapped_column(String(512), nullable=False)
+    requests: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors_4xx: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors_5xx: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_ms_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class RequestLatencyRollup(Base):
+    """Latency sketch per route and bucket: request counts per log-scale latency bin.
+
+    Bins come from ``app.core.analytics.latency_bin``; summing counts per bin
+    across buckets and routes merges sketches, and percentiles are read off
+    the merged bins.
+    """
+
+    __tablename__ = "request_latency_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "bucket_start", "route", "bin", name="uq_request_latency_rollups_bucket"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    granularity: Mapped[str] = mapped_column(String(8), nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    route: Mapped[str] = mapped_column(String(512), nullable=False)
+    bin: Mapped[int] = mapped_column(Integer, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class RequestIpRollup(Base):
+    """Hourly request counts per client IP."""
+
+    __tablename__ = "request_ip_rollups"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "client_ip", name="uq_request_ip_rollups_bucket"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    client_ip: Mapped[str] = mapped_column(String(64), nullable=False)
+    requests: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors_4xx: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors_5xx: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_ms_sum: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class RequestIpUserRollup(Base):
+    """Distinct (client IP, user) pairs seen per hour, for unique-user counts per IP."""
+
+    __tablename__ = "request_ip_user_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "bucket_start", "client_ip", "user_id", name="uq_request_ip_user_rollups_bucket"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    client_ip: Mapped[str] = mapped_column(String(64), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -26,7 +26,7 @@ from .token import (
     PasswordResetConfirm,
 )
 from .report import Report, ReportCreate
-from .message import GroupMessage, GroupMessageCreate, GroupMessageReadRequest
+from .message import GroupMessage, GroupMessageCreate, GroupMessageReadRequest, GroupMessageSearchResult
 from .match_request import (
     MatchRequest,
     MatchRequestCreate,
@@ -38,4 +38,6 @@ from .match_request import (
 from .inbox import InboxMessage, InboxThread
 from .swipe import SwipeCreate
 from .notifications import NotificationUser, NotificationGroup, GroupNotification, MatchNotification
-from .analytics import AnalyticsOverview, AnalyticsTopPath, AnalyticsIpUsage
+from .analytics import AnalyticsOverview, AnalyticsTopPath, AnalyticsIpUsage, AnalyticsTimeseriesPoint
+from .profiling import ProfileToken
+from .storage import SignedUrl, SignedUrlBatchRequest
@@ -9,6 +9,9 @@ class AnalyticsTopPath(BaseModel):
     errors_4xx: int
     errors_5xx: int
     avg_latency_ms: float | None = None
+    p50_latency_ms: float | None = None
+    p95_latency_ms: float | None = None
+    p99_latency_ms: float | None = None
 
 
 class AnalyticsIpUsage(BaseModel):
@@ -29,6 +32,20 @@ class AnalyticsOverview(BaseModel):
     total_5xx: int
     error_rate: float
     avg_latency_ms: float | None = None
+    p50_latency_ms: float | None = None
+    p95_latency_ms: float | None = None
+    p99_latency_ms: float | None = None
     active_refresh_sessions: int
     top_paths: list[AnalyticsTopPath]
     top_ips: list[AnalyticsIpUsage]
+
+
+class AnalyticsTimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    requests: int
+    errors_4xx: int
+    errors_5xx: int
+    avg_latency_ms: float | None = None
+    p50_latency_ms: float | None = None
+    p95_latency_ms: float | None = None
+    p99_latency_ms: float | None = None
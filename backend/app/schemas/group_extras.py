@@ -10,6 +10,7 @@ class GroupMedia(BaseModel):
     uploader_id: int
     url: str
     thumb_url: Optional[str] = None
+    variants: Optional[dict] = None
     media_type: GroupMediaType
     is_cover: bool
     created_at: datetime
@@ -21,4 +21,15 @@ class GroupMessage(GroupMessageCreate):
 
 
 class GroupMessageReadRequest(BaseModel):
-    message_ids: list[int]
+    message_ids: list[int] = Field(default_factory=list)
+    up_to_id: int | None = None
+
+
+class GroupMessageSearchResult(BaseModel):
+    id: int
+    group_id: int
+    sender_id: int
+    content: str | None = None
+    snippet: str
+    rank: float
+    created_at: datetime
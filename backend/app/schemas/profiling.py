@@ -0,0 +1,9 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class ProfileToken(BaseModel):
+    header: str
+    token: str
+    expires_at: datetime
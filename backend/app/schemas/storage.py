@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+
+
+class SignedUrlBatchRequest(BaseModel):
+    object_keys: list[str] = Field(..., min_length=1, max_length=100)
+
+
+class SignedUrl(BaseModel):
+    object_key: str
+    signed_url: str
+    expires_in: int
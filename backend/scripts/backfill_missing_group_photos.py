@@ -6,6 +6,7 @@ from PIL import Image, ImageDraw, ImageFont
 from sqlalchemy import and_, exists
 
 from app import models
+from app.core.blob_store import create_media_blob
 from app.core.storage import (
     supabase_public_storage_enabled,
     supabase_storage_enabled,
@@ -14,7 +15,6 @@ from app.core.storage import (
 )
 from app.db.session import SessionLocal
 from app.models.group_extras import GroupMediaType
-from app.models.media import MediaBlob
 
 
 PLACEHOLDER_TEXT = "No group photo at the moment."
@@ -136,14 +136,13 @@ def backfill_group_cover(db, *, group: models.Group, jpeg_bytes: bytes) -> None:
             public=False,
         )
     else:
-        blob = MediaBlob(
+        blob = create_media_blob(
+            db,
             content_type=content_type,
             filename=filename,
             data=jpeg_bytes,
             created_by=group.creator_id,
         )
-        db.add(blob)
-        db.flush()
         url = f"/api/v1/media/{blob.id}"
 
     db.add(
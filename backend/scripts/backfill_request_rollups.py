@@ -0,0 +1,126 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from app.core.analytics import record_request_rollups
+from app.db.session import SessionLocal
+from app.models.request_event import RequestEvent
+from app.models.request_rollup import ROLLUP_MINUTE, RequestRouteRollup
+
+
+def _parse_timestamp(value: str) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid ISO timestamp: {value}") from exc
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def backfill_rollups(*, before: datetime, after_id: int, batch_size: int, apply: bool) -> None:
+    """Roll up events created before ``before`` with an id above ``after_id``.
+
+    ``before`` is when live rollups started (the deploy time), not an hour
+    boundary: events earlier in that first hour were never rolled up and are
+    added to the same buckets. Progress is reported as the last processed id,
+    which ``--after-id`` resumes from.
+    """
+    db = SessionLocal()
+    try:
+        first_live_minute = (
+            db.query(func.min(RequestRouteRollup.bucket_start))
+            .filter(RequestRouteRollup.granularity == ROLLUP_MINUTE)
+            .scalar()
+        )
+        if first_live_minute is not None:
+            if first_live_minute.tzinfo is None:
+                first_live_minute = first_live_minute.replace(tzinfo=timezone.utc)
+            # Events after this minute were rolled up by the live flush already.
+            if before > first_live_minute + timedelta(minutes=1):
+                raise SystemExit(
+                    f"--before {before.isoformat()} is after live rollups began "
+                    f"({first_live_minute.isoformat()}); those events would be counted twice."
+                )
+
+        pending = db.query(RequestEvent).filter(RequestEvent.created_at < before)
+        total = pending.filter(RequestEvent.id > after_id).count()
+        if total == 0:
+            print("No request events to backfill.")
+            return
+        if not apply:
+            print(
+                f"Dry run: would roll up {total} request events created before "
+                f"{before.isoformat()} with id > {after_id}."
+            )
+            return
+
+        done = 0
+        last_id = after_id
+        try:
+            while True:
+                batch = (
+                    pending.filter(RequestEvent.id > last_id)
+                    .order_by(RequestEvent.id)
+                    .limit(batch_size)
+                    .all()
+                )
+                if not batch:
+                    break
+                record_request_rollups(
+                    db,
+                    [
+                        {
+                            "method": event.method,
+                            "path": event.path,
+                            "route": event.route,
+                            "status_code": event.status_code,
+                            "duration_ms": event.duration_ms,
+                            "client_ip": event.client_ip,
+                            "user_id": event.user_id,
+                            "created_at": event.created_at,
+                        }
+                        for event in batch
+                    ],
+                )
+                db.commit()
+                last_id = batch[-1].id
+                done += len(batch)
+                db.expunge_all()
+                print(f"Rolled up {done}/{total} request events (last id {last_id}).")
+        except BaseException:
+            db.rollback()
+            print(
+                "Interrupted. Resume with: python -m scripts.backfill_request_rollups "
+                f"--before {before.isoformat()} --after-id {last_id} --apply"
+            )
+            raise
+        print(f"Done. Rolled up {done} request events (last id {last_id}).")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build request analytics rollups from request_events recorded before rollups existed."
+    )
+    parser.add_argument(
+        "--before",
+        type=_parse_timestamp,
+        required=True,
+        help="ISO timestamp when live rollups started (the deploy time); only older events are rolled up.",
+    )
+    parser.add_argument(
+        "--after-id",
+        type=int,
+        default=0,
+        help="Resume after this request event id, as printed by an interrupted run (default: 0).",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Events per transaction (default: 5000).")
+    parser.add_argument("--apply", action="store_true", help="Apply changes (default is dry run).")
+    args = parser.parse_args()
+
+    backfill_rollups(before=args.before, after_id=args.after_id, batch_size=args.batch_size, apply=args.apply)
+
+
+if __name__ == "__main__":
+    main()
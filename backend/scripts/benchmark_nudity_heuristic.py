@@ -0,0 +1,80 @@
+import argparse
+import io
+import random
+import time
+
+from PIL import Image
+
+from app.core.moderation import _estimate_nudity_score_bytes
+
+
+def _reference_score(image_bytes: bytes) -> float:
+    """Original per-pixel implementation; tests/test_nudity_heuristic.py checks equivalence."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        image.thumbnail((96, 96))
+        pixels = list(image.getdata())
+        if not pixels:
+            return 0.0
+        skin = 0
+        for r, g, b in pixels:
+            max_c = max(r, g, b)
+            min_c = min(r, g, b)
+            if (
+                r > 95
+                and g > 40
+                and b > 20
+                and (max_c - min_c) > 15
+                and abs(r - g) > 15
+                and r > g
+                and r > b
+            ):
+                skin += 1
+        return skin / len(pixels)
+    except Exception:
+        return 0.0
+
+
+def _random_image_bytes(rng: random.Random, size: tuple[int, int]) -> bytes:
+    # Bias towards skin-like colours so both branches of the mask are exercised.
+    base = (rng.randint(90, 255), rng.randint(30, 200), rng.randint(10, 180))
+    image = Image.new("RGB", size, base)
+    pixels = image.load()
+    for _ in range(size[0] * size[1] // 4):
+        x = rng.randrange(size[0])
+        y = rng.randrange(size[1])
+        pixels[x, y] = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _time_per_call(func, samples: list[bytes], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for image_bytes in samples:
+            func(image_bytes)
+    return (time.perf_counter() - started) / (repeat * len(samples))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time the vectorized skin-tone heuristic against the original per-pixel loop."
+    )
+    parser.add_argument("--images", type=int, default=50, help="Number of random images (default: 50).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (default: 5).")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sizes = [(96, 96), (320, 240), (1024, 768), (1, 1), (97, 3)]
+    samples = [_random_image_bytes(rng, sizes[index % len(sizes)]) for index in range(args.images)]
+
+    reference = _time_per_call(_reference_score, samples, args.repeat)
+    vectorized = _time_per_call(_estimate_nudity_score_bytes, samples, args.repeat)
+    print(f"reference:  {reference * 1000:.3f} ms/image")
+    print(f"vectorized: {vectorized * 1000:.3f} ms/image ({reference / vectorized:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
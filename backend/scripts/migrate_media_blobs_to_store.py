@@ -0,0 +1,71 @@
+import argparse
+
+from sqlalchemy.orm import undefer
+
+from app.core.blob_store import get_blob_store
+from app.db.session import SessionLocal
+from app.models.media import MediaBlob
+
+
+def migrate_blobs(*, batch_size: int, keep_data: bool, apply: bool) -> None:
+    db = SessionLocal()
+    store = get_blob_store()
+    try:
+        pending = db.query(MediaBlob).filter(MediaBlob.content_hash.is_(None), MediaBlob.data.isnot(None))
+        total = pending.count()
+        if total == 0:
+            print("No media blobs left in the database.")
+            return
+        if not apply:
+            print(f"Dry run: would move {total} media blobs to the blob store.")
+            return
+
+        moved = 0
+        total_bytes = 0
+        last_id = 0
+        while True:
+            # Keyset batches so the loop does not depend on rows dropping out of the filter.
+            batch = (
+                pending.filter(MediaBlob.id > last_id)
+                .options(undefer(MediaBlob.data))
+                .order_by(MediaBlob.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            for blob in batch:
+                data = bytes(blob.data)
+                blob.content_hash = store.put(data)
+                blob.size_bytes = len(data)
+                if not keep_data:
+                    blob.data = None
+                moved += 1
+                total_bytes += len(data)
+            last_id = batch[-1].id
+            db.commit()
+            db.expunge_all()
+            print(f"Moved {moved}/{total} blobs ({total_bytes / (1024 * 1024):.1f} MiB).")
+        print(f"Done. Moved {moved} media blobs to the blob store.")
+        if not keep_data:
+            print("Run VACUUM (FULL) media_blobs to return the freed space to the OS.")
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move MediaBlob bytes from the database into the blob store.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per transaction (default: 100).")
+    parser.add_argument(
+        "--keep-data",
+        action="store_true",
+        help="Write files and hashes but leave the bytes in the database.",
+    )
+    parser.add_argument("--apply", action="store_true", help="Apply changes (default is dry run).")
+    args = parser.parse_args()
+
+    migrate_blobs(batch_size=args.batch_size, keep_data=args.keep_data, apply=args.apply)
+
+
+if __name__ == "__main__":
+    main()
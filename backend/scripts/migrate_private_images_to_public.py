@@ -11,6 +11,7 @@ import httpx
 from PIL import Image
 from sqlalchemy.orm import Session
 
+from app.core.blob_store import read_media_blob
 from app.core.config import settings
 from app.core.storage import (
     supabase_public_storage_enabled,
@@ -130,7 +131,7 @@ def _download_bytes(session: Session, url: str) -> tuple[bytes, str, str] | None
         if not blob:
             return None
         filename = blob.filename or f"{blob_id}.bin"
-        return bytes(blob.data), blob.content_type, filename
+        return read_media_blob(blob), blob.content_type, filename
     if url.startswith("/uploads/"):
         file_path = _resolve_upload_path(url)
         if not file_path.exists():
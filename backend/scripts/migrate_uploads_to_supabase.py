@@ -7,6 +7,7 @@ from typing import Any
 
 from sqlalchemy.orm import Session
 
+from app.core.blob_store import read_media_blob
 from app.core.config import settings
 from app.core.storage import supabase_storage_enabled, upload_bytes_to_supabase
 from app.db.session import SessionLocal
@@ -74,7 +75,7 @@ def migrate_url(
             prefix=prefix,
             filename=blob.filename,
             content_type=blob.content_type,
-            data=bytes(blob.data),
+            data=read_media_blob(blob),
         )
         cache[url] = new_url
         return new_url
@@ -12,6 +12,7 @@ from PIL import Image
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.core.blob_store import create_media_blob, read_media_blob
 from app.core.config import settings
 from app.core.storage import (
     normalize_group_image_bytes,
@@ -123,7 +124,7 @@ def _download_bytes(session: Session, url: str) -> tuple[bytes, str, str] | None
         if not blob:
             return None
         filename = blob.filename or f"{blob_id}.bin"
-        return bytes(blob.data), blob.content_type, filename
+        return read_media_blob(blob), blob.content_type, filename
 
     if url.startswith("/uploads/"):
         path = _resolve_upload_path(url)
@@ -275,14 +276,13 @@ def normalize_group_images(
                 )
                 new_thumb_url = None
             else:
-                blob = MediaBlob(
+                blob = create_media_blob(
+                    session,
                     content_type=normalized_type,
                     filename=upload_name,
                     data=normalized_bytes,
                     created_by=item.uploader_id,
                 )
-                session.add(blob)
-                session.flush()
                 new_url = f"/api/v1/media/{blob.id}"
                 new_thumb_url = None
         except Exception as exc:
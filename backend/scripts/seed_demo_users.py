@@ -10,9 +10,9 @@ from typing import Any
 import httpx
 from PIL import Image, ImageEnhance, ImageOps
 
+from app.core.blob_store import create_media_blob
 from app.core.security import get_password_hash
 from app.db.session import SessionLocal
-from app.models.media import MediaBlob
 from app.models.user import Gender, User, VerificationStatus
 
 
@@ -376,13 +376,13 @@ def _fetch_avatar(seed: str) -> dict[str, Any] | None:
 
 
 def _store_media(db, image_bytes: bytes, content_type: str, filename: str) -> str:
-    blob = MediaBlob(
+    blob = create_media_blob(
+        db,
         content_type=content_type or "image/jpeg",
         filename=filename,
         data=image_bytes,
+        created_by=None,
     )
-    db.add(blob)
-    db.flush()
     return f"/api/v1/media/{blob.id}"
 
 
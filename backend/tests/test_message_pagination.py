@@ -0,0 +1,111 @@
+"""Keyset paging through chat history when many messages share one second.
+
+SQLite stores ``CURRENT_TIMESTAMP`` defaults without a fraction and Python
+datetimes with microseconds; following ``X-Next-Cursor`` must still move on
+to the next page instead of returning the same one.
+
+Run from backend/ with ``python -m pytest --rootdir=tests tests``.
+"""
+
+import os
+from datetime import datetime, timezone
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.api.v1.endpoints.messages import list_messages
+from app.models.base import Base
+from app.models.user import Gender
+
+PAGE_SIZE = 2
+MESSAGE_COUNT = 7
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _seed(db) -> tuple[models.User, int, list[int]]:
+    user = models.User(
+        email="pager@example.com",
+        hashed_password="x",
+        full_name="Pager",
+        age=30,
+        gender=Gender.OTHER,
+    )
+    db.add(user)
+    db.flush()
+    group = models.Group(creator_id=user.id, title="Trip", description="Weekend trip")
+    db.add(group)
+    db.flush()
+    messages = [
+        models.GroupMessage(group_id=group.id, sender_id=user.id, content=f"message {index}")
+        for index in range(MESSAGE_COUNT)
+    ]
+    db.add_all(messages)
+    db.commit()
+    ids = [message.id for message in messages]
+    # Same second in both stored forms: CURRENT_TIMESTAMP text and a Python value.
+    db.execute(text("UPDATE group_messages SET created_at = '2026-10-19 12:00:41'"))
+    db.execute(
+        text("UPDATE group_messages SET created_at = '2026-10-19 12:00:41.000000' WHERE id = :id"),
+        {"id": ids[2]},
+    )
+    db.commit()
+    db.expire_all()
+    return user, group.id, ids
+
+
+def _page(db, user, group_id, **params) -> tuple[list[int], Response]:
+    response = Response()
+    messages = list_messages(
+        response=response,
+        db=db,
+        id=group_id,
+        limit=PAGE_SIZE,
+        current_user=user,
+        **{"since": None, "before": None, "cursor": None, "after": None, **params},
+    )
+    return [message["id"] if isinstance(message, dict) else message.id for message in messages], response
+
+
+def test_older_pages_follow_cursor_through_tied_timestamps(db):
+    user, group_id, ids = _seed(db)
+    seen: list[int] = []
+    cursor = None
+    for _ in range(MESSAGE_COUNT + 2):
+        page, response = _page(db, user, group_id, cursor=cursor)
+        seen = page + seen
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ids
+
+
+def test_forward_pages_follow_after_cursor_through_tied_timestamps(db):
+    user, group_id, ids = _seed(db)
+    seen: list[int] = []
+    params = {"after": None, "since": datetime(2026, 10, 19, 12, 0, 40, tzinfo=timezone.utc)}
+    for _ in range(MESSAGE_COUNT + 2):
+        page, response = _page(db, user, group_id, **params)
+        seen.extend(page)
+        after = response.headers.get("X-Next-After-Cursor")
+        if not after:
+            assert "X-Has-More" not in response.headers
+            break
+        params = {"after": after}
+    assert seen == ids
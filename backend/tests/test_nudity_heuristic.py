@@ -0,0 +1,59 @@
+"""The vectorized skin-tone heuristic must score exactly like the original loop.
+
+Timing lives in ``scripts/benchmark_nudity_heuristic.py``, which also holds
+the reference implementation compared against here.
+
+Run from backend/ with ``python -m pytest --rootdir=tests tests``.
+"""
+
+import io
+import os
+import random
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from PIL import Image
+
+from app.core.moderation import _estimate_nudity_score_bytes
+from scripts.benchmark_nudity_heuristic import _reference_score
+
+MODES = ("RGB", "L", "RGBA", "P", "CMYK")
+SIZES = ((1, 1), (97, 3), (3, 97), (96, 96), (101, 77), (640, 481))
+
+
+def _image_bytes(rng: random.Random, mode: str, size: tuple[int, int], fmt: str) -> bytes:
+    # Bias towards skin-like colours so both branches of the mask are exercised.
+    image = Image.new("RGB", size, (rng.randint(90, 255), rng.randint(30, 200), rng.randint(10, 180)))
+    pixels = image.load()
+    for _ in range(max(1, size[0] * size[1] // 4)):
+        pixels[rng.randrange(size[0]), rng.randrange(size[1])] = (
+            rng.randrange(256),
+            rng.randrange(256),
+            rng.randrange(256),
+        )
+    if mode == "RGBA":
+        image.putalpha(rng.randrange(256))
+    elif mode != "RGB":
+        image = image.convert(mode)
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def _cases():
+    rng = random.Random(7)
+    for mode in MODES:
+        fmt = "JPEG" if mode == "CMYK" else "PNG"
+        for size in SIZES:
+            yield pytest.param(_image_bytes(rng, mode, size, fmt), id=f"{mode}-{size[0]}x{size[1]}")
+
+
+@pytest.mark.parametrize("image_bytes", list(_cases()))
+def test_vectorized_score_matches_reference(image_bytes):
+    assert _estimate_nudity_score_bytes(image_bytes) == _reference_score(image_bytes)
+
+
+@pytest.mark.parametrize("image_bytes", [b"", b"not an image"], ids=["empty", "garbage"])
+def test_undecodable_bytes_score_zero(image_bytes):
+    assert _estimate_nudity_score_bytes(image_bytes) == _reference_score(image_bytes) == 0.0
@@ -0,0 +1,120 @@
+"""Paging through message search with tied ranks must not repeat or loop.
+
+Runs against SQLite (in-process index) always, and against Postgres
+full-text search when TEST_DATABASE_URL points at a disposable Postgres
+database (its tables are created and dropped by the test).
+
+Run from backend/ with ``python -m pytest --rootdir=tests tests``.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.core.pagination import decode_rank_cursor, encode_rank_cursor
+from app.core.search import MessageSearchIndex, message_search_index, search_messages
+from app.models.base import Base
+from app.models.user import Gender
+
+PAGE_SIZE = 3
+MESSAGE_COUNT = 10
+
+
+def _engines():
+    yield pytest.param(
+        create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool),
+        id="sqlite",
+    )
+    url = os.getenv("TEST_DATABASE_URL")
+    marks = []
+    if not url or not url.startswith("postgresql"):
+        marks.append(pytest.mark.skip(reason="TEST_DATABASE_URL is not a Postgres URL"))
+    yield pytest.param(url, id="postgresql", marks=marks)
+
+
+@pytest.fixture(params=list(_engines()))
+def db(request):
+    engine = request.param if not isinstance(request.param, str) else create_engine(request.param)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+def _seed(db) -> tuple[int, set[int]]:
+    user = models.User(
+        email="searcher@example.com",
+        hashed_password="x",
+        full_name="Searcher",
+        age=30,
+        gender=Gender.OTHER,
+    )
+    db.add(user)
+    db.flush()
+    group = models.Group(creator_id=user.id, title="Trip", description="Weekend trip")
+    db.add(group)
+    db.flush()
+    # Identical content gives every message the same rank.
+    messages = [
+        models.GroupMessage(group_id=group.id, sender_id=user.id, content="meet at the station")
+        for _ in range(MESSAGE_COUNT)
+    ]
+    db.add_all(messages)
+    db.commit()
+    message_search_index.__init__()
+    return user.id, {message.id for message in messages}
+
+
+def test_tied_ranks_page_without_duplicates(db):
+    user_id, expected_ids = _seed(db)
+    seen: list[int] = []
+    cursor = None
+    for _ in range(MESSAGE_COUNT + 2):
+        results = search_messages(
+            db,
+            user_id=user_id,
+            query="station",
+            cursor=decode_rank_cursor(cursor),
+            limit=PAGE_SIZE,
+        )
+        if not results:
+            break
+        seen.extend(message.id for message, _, _ in results)
+        last_message, last_rank, _ = results[-1]
+        # Round-trip through the opaque cursor exactly as the endpoint does.
+        next_cursor = encode_rank_cursor(last_rank, last_message.id)
+        assert next_cursor != cursor
+        cursor = next_cursor
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected_ids
+
+
+def test_fallback_index_keeps_a_bounded_number_of_groups(db):
+    if db.get_bind().dialect.name == "postgresql":
+        pytest.skip("the in-process index is the SQLite fallback")
+    user_id, _ = _seed(db)
+    group_ids = []
+    for index in range(3):
+        group = models.Group(creator_id=user_id, title=f"Group {index}", description="More trips")
+        db.add(group)
+        db.flush()
+        db.add(models.GroupMessage(group_id=group.id, sender_id=user_id, content="meet at the station"))
+        group_ids.append(group.id)
+    db.commit()
+    index = MessageSearchIndex(max_groups=2)
+    for group_id in group_ids:
+        assert len(index.search(db, [group_id], ["station"])) == 1
+    assert list(index._loaded_groups) == group_ids[1:]
+    # The evicted group is reloaded on its next search.
+    assert len(index.search(db, [group_ids[0]], ["station"])) == 1
+    assert list(index._loaded_groups) == [group_ids[2], group_ids[0]]
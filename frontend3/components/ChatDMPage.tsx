@@ -98,6 +98,7 @@ export default function ChatDMPage() {
   const pendingPrependRef = useRef<{ prevScrollTop: number; prevScrollHeight: number } | null>(null);
   const hasInitialScrollRef = useRef(false);
   const allMessagesRef = useRef<GroupMessage[]>([]);
+  const nextCursorRef = useRef<string | null>(null);
   const pendingReadIdsRef = useRef<Set<number>>(new Set());
   const wsRef = useRef<WebSocket | null>(null);
 
@@ -120,11 +121,16 @@ export default function ChatDMPage() {
 
   const flushPendingReads = useCallback(() => {
     const pending = pendingReadIdsRef.current;
-    if (pending.size === 0) return;
-    const ids = Array.from(pending);
+    if (pending.size === 0 || !accessToken || !groupId) return;
+    const upToId = Math.max(...Array.from(pending));
     pending.clear();
-    void markMessagesRead(ids);
-  }, [markMessagesRead]);
+    // Scrolled to the bottom: everything up to the newest pending id has been seen.
+    void apiFetch(`/groups/${groupId}/messages/read`, {
+      method: "POST",
+      token: accessToken,
+      body: JSON.stringify({ up_to_id: upToId }),
+    });
+  }, [accessToken, groupId]);
 
   const scrollToBottom = useCallback(
     (behavior: ScrollBehavior = "smooth") => {
@@ -162,10 +168,11 @@ export default function ChatDMPage() {
         return;
       }
       const data: GroupMessage[] = await res.json();
+      nextCursorRef.current = res.headers.get("X-Next-Cursor");
       writeMessageCache(groupId, data);
       allMessagesRef.current = data;
       setMessages(data);
-      setHasMore(data.length === PAGE_SIZE);
+      setHasMore(Boolean(nextCursorRef.current));
       setShowNewPill(false);
       setNewMessageCount(0);
 
@@ -197,14 +204,13 @@ export default function ChatDMPage() {
       prevScrollHeight: container.scrollHeight,
     };
 
-    const oldest = allMessagesRef.current[0];
-    const before = oldest?.created_at;
-    const beforeParam = before ? `&before=${encodeURIComponent(before)}` : "";
+    const cursor = nextCursorRef.current;
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
 
     void (async () => {
       try {
         const res = await apiFetch(
-          `/groups/${groupId}/messages?limit=${PAGE_SIZE}${beforeParam}`,
+          `/groups/${groupId}/messages?limit=${PAGE_SIZE}${cursorParam}`,
           { token: accessToken }
         );
         if (!res.ok) {
@@ -212,13 +218,14 @@ export default function ChatDMPage() {
           return;
         }
         const older: GroupMessage[] = await res.json();
+        nextCursorRef.current = res.headers.get("X-Next-Cursor");
         if (older.length === 0) {
           setHasMore(false);
           return;
         }
         allMessagesRef.current = [...older, ...allMessagesRef.current];
         setMessages((prev) => [...older, ...prev]);
-        setHasMore(older.length === PAGE_SIZE);
+        setHasMore(Boolean(nextCursorRef.current));
         writeMessageCache(groupId, allMessagesRef.current);
       } catch {
         setHasMore(false);
@@ -473,6 +480,18 @@ export default function ChatDMPage() {
       if (payload.type === "message:new" && payload.message) {
         ingestMessage(payload.message);
       }
+      if (payload.type === "message:update" && payload.message) {
+        const updated = payload.message;
+        allMessagesRef.current = allMessagesRef.current.map((message) =>
+          message.id === updated.id ? { ...message, ...updated } : message
+        );
+        if (groupId) {
+          writeMessageCache(groupId, allMessagesRef.current);
+        }
+        setMessages((prev) =>
+          prev.map((message) => (message.id === updated.id ? { ...message, ...updated } : message))
+        );
+      }
     };
 
     socket.onclose = () => {
@@ -82,6 +82,75 @@ function readCache(storageKey: string) {
   return entry.url;
 }
 
+type SignedUrlItem = {
+  object_key: string;
+  signed_url?: string;
+  expires_in?: number;
+};
+
+type PendingSignBatch = {
+  token: string;
+  waiters: Map<string, Array<(entry: CacheEntry | null) => void>>;
+};
+
+// Keys requested within this window are signed together via POST /storage/signed.
+const SIGN_BATCH_DELAY_MS = 10;
+const SIGN_BATCH_MAX_KEYS = 100;
+let pendingSignBatch: PendingSignBatch | null = null;
+
+async function flushSignBatch(batch: PendingSignBatch) {
+  const keys = Array.from(batch.waiters.keys());
+  const resolved = new Map<string, CacheEntry>();
+  for (let index = 0; index < keys.length; index += SIGN_BATCH_MAX_KEYS) {
+    const chunk = keys.slice(index, index + SIGN_BATCH_MAX_KEYS);
+    try {
+      const res = await apiFetch("/storage/signed", {
+        method: "POST",
+        token: batch.token,
+        body: JSON.stringify({ object_keys: chunk }),
+      });
+      if (!res.ok) continue;
+      const items: SignedUrlItem[] = await res.json();
+      items.forEach((item) => {
+        if (!item.signed_url) return;
+        const expiresIn = Number(item.expires_in) || 0;
+        resolved.set(item.object_key, {
+          url: item.signed_url,
+          expiresAt: Date.now() + Math.max(expiresIn - 60, 30) * 1000,
+        });
+      });
+    } catch {
+      // unresolved keys fall back to the raw URL
+    }
+  }
+  batch.waiters.forEach((callbacks, key) => {
+    const entry = resolved.get(key) || null;
+    callbacks.forEach((callback) => callback(entry));
+  });
+}
+
+function requestSignedUrl(storageKey: string, token: string) {
+  return new Promise<CacheEntry | null>((resolve) => {
+    if (pendingSignBatch && pendingSignBatch.token !== token) {
+      const stale = pendingSignBatch;
+      pendingSignBatch = null;
+      void flushSignBatch(stale);
+    }
+    if (!pendingSignBatch) {
+      const batch: PendingSignBatch = { token, waiters: new Map() };
+      pendingSignBatch = batch;
+      setTimeout(() => {
+        if (pendingSignBatch !== batch) return;
+        pendingSignBatch = null;
+        void flushSignBatch(batch);
+      }, SIGN_BATCH_DELAY_MS);
+    }
+    const callbacks = pendingSignBatch.waiters.get(storageKey) || [];
+    callbacks.push(resolve);
+    pendingSignBatch.waiters.set(storageKey, callbacks);
+  });
+}
+
 export function useSignedMediaUrl(rawUrl?: string | null) {
   const { accessToken } = useAuth();
   const [resolvedUrl, setResolvedUrl] = useState<string | null>(null);
@@ -118,23 +187,15 @@ export function useSignedMediaUrl(rawUrl?: string | null) {
     const requestId = ++requestIdRef.current;
     (async () => {
       try {
-        const res = await apiFetch(`/storage/signed/${storageKey}`, { token: accessToken });
-        if (!res.ok) {
-          setResolvedUrl(resolveMediaUrl(value));
-          return;
-        }
-        const data: { signed_url?: string; expires_in?: number } = await res.json();
-        const signedUrl = data.signed_url || "";
-        if (!signedUrl) {
+        const entry = await requestSignedUrl(storageKey, accessToken);
+        if (!entry) {
           setResolvedUrl(resolveMediaUrl(value));
           return;
         }
-        const expiresIn = Number(data.expires_in) || 0;
-        const expiresAt = Date.now() + Math.max(expiresIn - 60, 30) * 1000;
-        SIGNED_URL_CACHE.set(storageKey, { url: signedUrl, expiresAt });
-        persistCacheEntry(storageKey, { url: signedUrl, expiresAt });
+        SIGNED_URL_CACHE.set(storageKey, entry);
+        persistCacheEntry(storageKey, entry);
         if (requestIdRef.current === requestId) {
-          setResolvedUrl(signedUrl);
+          setResolvedUrl(entry.url);
         }
       } catch {
         setResolvedUrl(resolveMediaUrl(value));
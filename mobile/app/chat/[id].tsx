@@ -12,6 +12,8 @@ import {
   SafeAreaView,
   ScrollView,
   StyleSheet,
+  type NativeScrollEvent,
+  type NativeSyntheticEvent,
   Text,
   TextInput,
   View,
@@ -60,6 +62,12 @@ type MessageListItem =
   | { type: "single"; message: GroupMessage }
   | { type: "gallery"; messages: GroupMessage[] };
 
+const PAGE_SIZE = 50;
+const TOP_FETCH_THRESHOLD = 80;
+// The server drops a typing indicator after REALTIME_TYPING_TTL_SECONDS (6s);
+// refresh it well inside that while keystrokes keep coming.
+const TYPING_REFRESH_MS = 3000;
+
 export const options = {
   headerStyle: { backgroundColor: "#ffffff", height: 3 },
   headerBackTitleVisible: false,
@@ -78,6 +86,8 @@ export default function ChatThreadScreen() {
   const [status, setStatus] = useState<string | null>(null);
   const [isSending, setIsSending] = useState(false);
   const [isLoadingMessages, setIsLoadingMessages] = useState(false);
+  const [hasMore, setHasMore] = useState(false);
+  const [isFetchingOlder, setIsFetchingOlder] = useState(false);
   const [isRecording, setIsRecording] = useState(false);
   const [recording, setRecording] = useState<Audio.Recording | null>(null);
   const [playingId, setPlayingId] = useState<number | null>(null);
@@ -91,7 +101,11 @@ export default function ChatThreadScreen() {
   const wsRef = useRef<WebSocket | null>(null);
   const typingTimeoutRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const typingActiveRef = useRef(false);
+  const typingSentAtRef = useRef(0);
   const soundRef = useRef<Audio.Sound | null>(null);
+  const scrollRef = useRef<ScrollView | null>(null);
+  const nextCursorRef = useRef<string | null>(null);
+  const hasInitialScrollRef = useRef(false);
 
   const groupId = useMemo(() => Number(params.id), [params.id]);
   const isVerified = user?.verification_status === "verified";
@@ -135,10 +149,15 @@ export default function ChatThreadScreen() {
   const loadMessages = useCallback(async () => {
     if (!accessToken || !groupId) return;
     setIsLoadingMessages(true);
-    const res = await apiFetch(`/groups/${groupId}/messages`, { token: accessToken });
+    const res = await apiFetch(`/groups/${groupId}/messages?limit=${PAGE_SIZE}`, {
+      token: accessToken,
+    });
     if (res.ok) {
       const data: GroupMessage[] = await res.json();
+      nextCursorRef.current = res.headers.get("X-Next-Cursor");
+      hasInitialScrollRef.current = false;
       setMessages(data);
+      setHasMore(Boolean(nextCursorRef.current));
       const unreadIds = data
         .filter((message) => message.sender_id !== user?.id)
         .map((message) => message.id);
@@ -151,6 +170,49 @@ export default function ChatThreadScreen() {
     setIsLoadingMessages(false);
   }, [accessToken, groupId, markMessagesRead, user?.id]);
 
+  const loadOlderMessages = useCallback(async () => {
+    const cursor = nextCursorRef.current;
+    if (!accessToken || !groupId || isFetchingOlder || !cursor) return;
+    setIsFetchingOlder(true);
+    try {
+      const res = await apiFetch(
+        `/groups/${groupId}/messages?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`,
+        { token: accessToken }
+      );
+      if (!res.ok) {
+        setHasMore(false);
+        return;
+      }
+      const older: GroupMessage[] = await res.json();
+      nextCursorRef.current = res.headers.get("X-Next-Cursor");
+      setMessages((prev) => {
+        const known = new Set(prev.map((message) => message.id));
+        return [...older.filter((message) => !known.has(message.id)), ...prev];
+      });
+      setHasMore(Boolean(nextCursorRef.current) && older.length > 0);
+    } catch {
+      setHasMore(false);
+    } finally {
+      setIsFetchingOlder(false);
+    }
+  }, [accessToken, groupId, isFetchingOlder]);
+
+  const handleMessagesScroll = useCallback(
+    (event: NativeSyntheticEvent<NativeScrollEvent>) => {
+      if (!hasInitialScrollRef.current || !hasMore) return;
+      if (event.nativeEvent.contentOffset.y <= TOP_FETCH_THRESHOLD) {
+        void loadOlderMessages();
+      }
+    },
+    [hasMore, loadOlderMessages]
+  );
+
+  const handleMessagesContentSizeChange = useCallback(() => {
+    if (hasInitialScrollRef.current || messages.length === 0) return;
+    scrollRef.current?.scrollToEnd({ animated: false });
+    hasInitialScrollRef.current = true;
+  }, [messages.length]);
+
   useEffect(() => {
     loadGroup();
   }, [loadGroup]);
@@ -214,6 +276,7 @@ export default function ChatThreadScreen() {
         type?: string;
         user_id?: number;
         is_typing?: boolean;
+        users?: Record<string, boolean>;
         message?: GroupMessage;
         message_ids?: number[];
       };
@@ -233,7 +296,23 @@ export default function ChatThreadScreen() {
           void markMessagesRead([nextMessage.id]);
         }
       }
-      if (payload.type === "typing" && payload.user_id) {
+      if (payload.type === "message:update" && payload.message) {
+        const updated = payload.message;
+        setMessages((prev) =>
+          prev.map((message) => (message.id === updated.id ? { ...message, ...updated } : message))
+        );
+      }
+      if (payload.type === "typing" && payload.users) {
+        const updates = payload.users;
+        setTypingUsers((prev) => {
+          const next = { ...prev };
+          Object.entries(updates).forEach(([id, isTyping]) => {
+            if (Number(id) === user?.id) return;
+            next[Number(id)] = Boolean(isTyping);
+          });
+          return next;
+        });
+      } else if (payload.type === "typing" && payload.user_id) {
         if (payload.user_id === user?.id) return;
         setTypingUsers((prev) => ({
           ...prev,
@@ -289,9 +368,11 @@ export default function ChatThreadScreen() {
       }
       return;
     }
-    if (!typingActiveRef.current) {
+    const now = Date.now();
+    if (!typingActiveRef.current || now - typingSentAtRef.current >= TYPING_REFRESH_MS) {
       sendTyping(true);
       typingActiveRef.current = true;
+      typingSentAtRef.current = now;
     }
     if (typingTimeoutRef.current) {
       clearTimeout(typingTimeoutRef.current);
@@ -661,7 +742,19 @@ export default function ChatThreadScreen() {
               </View>
             </View>
 
-            <ScrollView contentContainerStyle={styles.messages}>
+            <ScrollView
+              ref={scrollRef}
+              contentContainerStyle={styles.messages}
+              onScroll={handleMessagesScroll}
+              onContentSizeChange={handleMessagesContentSizeChange}
+              scrollEventThrottle={100}
+              maintainVisibleContentPosition={{ minIndexForVisible: 0 }}
+            >
+              {messages.length > 0 && hasMore ? (
+                <Text style={styles.historyLabel}>
+                  {isFetchingOlder ? "Loading earlier messages..." : "Scroll up for earlier messages"}
+                </Text>
+              ) : null}
               {isLoadingMessages ? (
                 <ActivityIndicator size="large" color="#2563eb" />
               ) : messages.length === 0 ? (
@@ -1230,6 +1323,11 @@ const styles = StyleSheet.create({
     textAlign: "center",
     color: "#94a3b8",
   },
+  historyLabel: {
+    textAlign: "center",
+    fontSize: 12,
+    color: "#94a3b8",
+  },
   composerSection: {
     transform: [{ translateY: 17 }],
   },